@@ -269,16 +269,16 @@ class CentaurLauncher:
         
         def deploy():
             try:
-                # Run deployment scripts
+                # Run deployment scripts as modules so they import src
                 scripts = [
-                    'scripts/deploy_n8n_workflows.py',
-                    'scripts/populate_rag_system.py',
-                    'scripts/end_to_end_integration.py'
+                    'scripts.deploy_n8n_workflows',
+                    'scripts.populate_rag_system',
+                    'scripts.end_to_end_integration'
                 ]
                 
                 for script in scripts:
                     self.log_message(f"⚡ Executing {script}...")
-                    result = subprocess.run([sys.executable, script], 
+                    result = subprocess.run([sys.executable, '-m', script], 
                                           capture_output=True, text=True)
                     
                     if result.returncode == 0:
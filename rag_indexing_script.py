@@ -1,20 +1,71 @@
-import os
 import weaviate
 
-def index_knowledge_sources(weaviate_url, sources):
+from src.rag_system.indexer import FileManifest, iter_files, read_changes
+
+MANIFEST_PATH = "data/rag/knowledge_sources_manifest.json"
+
+
+def delete_file_objects(client, file_path):
+    """Delete every KnowledgeSource object indexed from file_path"""
+    client.batch.delete_objects(
+        class_name="KnowledgeSource",
+        where={
+            "path": ["file_path"],
+            "operator": "Equal",
+            "valueText": file_path
+        }
+    )
+
+
+def collect_failures(failed_paths):
+    """Batch callback recording the file_path of every object Weaviate rejected"""
+    def callback(results):
+        for result in results or []:
+            if result.get("result", {}).get("errors"):
+                failed_paths.add(result["properties"]["file_path"])
+    return callback
+
+
+def index_knowledge_sources(weaviate_url, sources, manifest_path=MANIFEST_PATH,
+                            max_workers=4, window_size=32):
     client = weaviate.Client(weaviate_url)
-    for source in sources:
-        for root, _, files in os.walk(source):
-            for file in files:
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+    manifest = FileManifest(manifest_path)
+    counts = {"touched": 0, "errors": 0}
+
+    candidates, removed, unchanged = manifest.diff(iter_files(sources))
+
+    for file_path in removed:
+        delete_file_objects(client, file_path)
+        manifest.remove(file_path)
+        print(f"Removed: {file_path}")
+    manifest.save()
+
+    failed_paths = set()
+    client.batch.configure(callback=collect_failures(failed_paths))
+
+    for changed in read_changes(manifest, candidates, max_workers, window_size, counts):
+        failed_paths.clear()
+        with client.batch as batch:
+            for file in changed:
+                if not file.is_new:
+                    delete_file_objects(client, file.path)
                 obj = {
-                    'file_path': file_path,
-                    'content': content
+                    'file_path': file.path,
+                    'content': file.content
                 }
-                client.data_object.create(obj, "KnowledgeSource")
-                print(f"Indexed: {file_path}")
+                batch.add_data_object(obj, "KnowledgeSource")
+        # Failed files stay out of the manifest so the next run retries them
+        for file in changed:
+            if file.path in failed_paths:
+                counts["errors"] += 1
+                print(f"Failed: {file.path}")
+                continue
+            manifest.set(file.path, file.record)
+            print(f"Indexed: {file.path}")
+        manifest.save()
+
+    print(f"Unchanged: {unchanged + counts['touched']}, removed: {len(removed)}, "
+          f"errors: {counts['errors']}")
 
 if __name__ == "__main__":
     # Update with your actual Weaviate instance URL
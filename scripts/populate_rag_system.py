@@ -14,6 +14,7 @@ import google.generativeai as genai
 from typing import List, Dict, Any
 import requests
 import time
+from src.rag_system.indexer import FileManifest, read_changes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,6 +26,9 @@ class CentaurRAGPopulator:
         """Initialize RAG system with Weaviate and Gemini integration"""
         self.weaviate_url = os.getenv('WEAVIATE_URL', 'http://localhost:8080')
         self.gemini_api_key = os.getenv('GOOGLE_API_KEY')
+        self.manifest = FileManifest(os.getenv(
+            'CENTAUR_DOC_MANIFEST', 'data/rag/centaur_documentation_manifest.json'
+        ))
         
         # Configure Gemini
         if self.gemini_api_key:
@@ -52,6 +56,10 @@ class CentaurRAGPopulator:
         try:
             self.weaviate_client.schema.delete_all()
             logger.info("🧹 Cleared existing schema")
+            
+            # Everything indexed so far went with the schema
+            self.manifest.clear()
+            self.manifest.save()
         except Exception as e:
             logger.warning(f"Schema cleanup warning: {e}")
         
@@ -279,48 +287,88 @@ class CentaurRAGPopulator:
             }
         ]
         
-        indexed_count = 0
-        for doc_info in doc_files:
+        # Only new or changed files are read and re-indexed
+        doc_info_by_path = {
+            str(Path(doc_info["path"])): doc_info for doc_info in doc_files
+        }
+        existing_paths = []
+        for path in doc_info_by_path:
+            if Path(path).exists():
+                existing_paths.append(path)
+            else:
+                logger.warning(f"⚠️ File not found: {path}")
+        
+        candidates, removed, unchanged = self.manifest.diff(existing_paths)
+        counts = {"touched": 0, "errors": 0}
+        indexed_count = unchanged
+        
+        # Files dropped from disk or from doc_files take their objects with them
+        for path in removed:
             try:
-                file_path = Path(doc_info["path"])
-                if not file_path.exists():
-                    logger.warning(f"⚠️ File not found: {file_path}")
-                    continue
-                
-                # Read file content
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Extract title from file
-                title = self._extract_title(content, file_path.name)
-                
-                # Create document object
-                doc_object = {
-                    "title": title,
-                    "content": content,
-                    "doc_type": doc_info["doc_type"],
-                    "category": doc_info["category"],
-                    "tags": self._generate_tags(content, doc_info["category"]),
-                    "file_path": str(file_path),
-                    "last_updated": datetime.now().isoformat(),
-                    "importance_score": doc_info["importance"]
-                }
-                
-                # Index in Weaviate
-                result = self.weaviate_client.data_object.create(
-                    doc_object,
-                    "CentaurDocumentation"
-                )
-                
-                logger.info(f"✅ Indexed: {file_path.name} -> {result}")
-                indexed_count += 1
-                
+                self._delete_indexed_file(path)
+                self.manifest.remove(path)
+                logger.info(f"🗑️ Removed: {path}")
             except Exception as e:
-                logger.error(f"❌ Failed to index {doc_info['path']}: {e}")
+                logger.error(f"❌ Failed to remove {path}: {e}")
+        if removed:
+            self.manifest.save()
+        
+        for changed in read_changes(self.manifest, candidates, counts=counts):
+            for file in changed:
+                doc_info = doc_info_by_path[file.path]
+                try:
+                    file_path = Path(file.path)
+                    content = file.content
+                    
+                    if not file.is_new:
+                        self._delete_indexed_file(file.path)
+                    
+                    # Extract title from file
+                    title = self._extract_title(content, file_path.name)
+                    
+                    # Create document object
+                    doc_object = {
+                        "title": title,
+                        "content": content,
+                        "doc_type": doc_info["doc_type"],
+                        "category": doc_info["category"],
+                        "tags": self._generate_tags(content, doc_info["category"]),
+                        "file_path": str(file_path),
+                        "last_updated": datetime.now().isoformat(),
+                        "importance_score": doc_info["importance"]
+                    }
+                    
+                    # Index in Weaviate
+                    result = self.weaviate_client.data_object.create(
+                        doc_object,
+                        "CentaurDocumentation"
+                    )
+                    
+                    self.manifest.set(file.path, file.record)
+                    logger.info(f"✅ Indexed: {file_path.name} -> {result}")
+                    indexed_count += 1
+                    
+                except Exception as e:
+                    logger.error(f"❌ Failed to index {doc_info['path']}: {e}")
+            
+            self.manifest.save()
         
+        indexed_count += counts["touched"]
+        logger.info(f"⏭️ Skipped {unchanged + counts['touched']} unchanged documents")
         logger.info(f"📊 Successfully indexed {indexed_count}/{len(doc_files)} documents")
         return indexed_count
     
+    def _delete_indexed_file(self, file_path: str):
+        """Delete the CentaurDocumentation objects indexed from file_path"""
+        self.weaviate_client.batch.delete_objects(
+            class_name="CentaurDocumentation",
+            where={
+                "path": ["file_path"],
+                "operator": "Equal",
+                "valueText": file_path
+            }
+        )
+    
     def populate_coordination_patterns(self):
         """Populate initial coordination patterns based on successful implementations"""
         logger.info("🔄 Populating coordination patterns")
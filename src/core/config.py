@@ -7,7 +7,57 @@ from typing import List, Optional
 from pydantic import BaseSettings, Field
 
 
-class Settings(BaseSettings):
+class RAGSettings(BaseSettings):
+    """
+    RAG system and Gemini settings
+    
+    Loadable on their own, so the RAG API does not require the database
+    URLs and API keys of the rest of the application.
+    """
+    
+    google_ai_api_key: Optional[str] = Field(default=None, env="GOOGLE_AI_API_KEY")
+    
+    # Gemini Configuration
+    gemini_model: str = Field(default="gemini-pro", env="GEMINI_MODEL")
+    gemini_requests_per_minute: Optional[float] = Field(
+        default=None, env="GEMINI_REQUESTS_PER_MINUTE"
+    )
+    gemini_tokens_per_minute: Optional[float] = Field(
+        default=None, env="GEMINI_TOKENS_PER_MINUTE"
+    )
+    gemini_response_cache_path: Optional[str] = Field(
+        default=None, env="GEMINI_RESPONSE_CACHE_PATH"
+    )
+    gemini_response_cache_size: int = Field(
+        default=10000, env="GEMINI_RESPONSE_CACHE_SIZE"
+    )
+    gemini_response_cache_ttl: Optional[float] = Field(
+        default=604800.0, env="GEMINI_RESPONSE_CACHE_TTL"
+    )
+    gemini_cache_nonzero_temperature: bool = Field(
+        default=False, env="GEMINI_CACHE_NONZERO_TEMPERATURE"
+    )
+    
+    # RAG System Configuration
+    rag_chunk_size: int = Field(default=1000, env="RAG_CHUNK_SIZE")
+    rag_chunk_overlap: int = Field(default=200, env="RAG_CHUNK_OVERLAP")
+    rag_similarity_threshold: float = Field(default=0.7, env="RAG_SIMILARITY_THRESHOLD")
+    rag_max_results: int = Field(default=10, env="RAG_MAX_RESULTS")
+    rag_embedding_executor: str = Field(default="thread", env="RAG_EMBEDDING_EXECUTOR")
+    rag_embedding_workers: int = Field(default=1, env="RAG_EMBEDDING_WORKERS")
+    rag_query_cache_size: int = Field(default=1024, env="RAG_QUERY_CACHE_SIZE")
+    rag_query_cache_ttl: float = Field(default=300.0, env="RAG_QUERY_CACHE_TTL")
+    rag_allow_hashing_fallback: bool = Field(
+        default=True, env="RAG_ALLOW_HASHING_FALLBACK"
+    )
+    
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        case_sensitive = False
+
+
+class Settings(RAGSettings):
     """Application settings"""
     
     # Core Application Settings
@@ -28,7 +78,6 @@ class Settings(BaseSettings):
     # AI Model Configuration
     claude_model: str = Field(default="claude-3-opus-20240229", env="CLAUDE_MODEL")
     openai_model: str = Field(default="gpt-4-turbo-preview", env="OPENAI_MODEL")
-    gemini_model: str = Field(default="gemini-pro", env="GEMINI_MODEL")
     
     # n8n Configuration
     n8n_host: str = Field(default="localhost", env="N8N_HOST")
@@ -60,12 +109,6 @@ class Settings(BaseSettings):
     task_timeout: int = Field(default=3600, env="TASK_TIMEOUT")  # 1 hour
     coordination_check_interval: int = Field(default=30, env="COORDINATION_CHECK_INTERVAL")
     
-    # RAG System Configuration
-    rag_chunk_size: int = Field(default=1000, env="RAG_CHUNK_SIZE")
-    rag_chunk_overlap: int = Field(default=200, env="RAG_CHUNK_OVERLAP")
-    rag_similarity_threshold: float = Field(default=0.7, env="RAG_SIMILARITY_THRESHOLD")
-    rag_max_results: int = Field(default=10, env="RAG_MAX_RESULTS")
-    
     # Performance Configuration
     max_workers: int = Field(default=4, env="MAX_WORKERS")
     worker_timeout: int = Field(default=30, env="WORKER_TIMEOUT")
@@ -76,11 +119,6 @@ class Settings(BaseSettings):
     enable_debug_logging: bool = Field(default=True, env="ENABLE_DEBUG_LOGGING")
     save_interaction_logs: bool = Field(default=True, env="SAVE_INTERACTION_LOGS")
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
-    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._validate_configuration()
@@ -6,9 +6,23 @@ This module provides advanced Retrieval-Augmented Generation capabilities
 with vector database search and Gemini 2.5 Pro integration.
 
 Key Components:
-- Core: Vector database and embedding engine
+- Core: Vector database (float32/fp16/SQ8/PQ storage) and embedding engine
+- Storage: Segment-based, memory-mapped knowledge base persistence
+- Embedding Cache: Content-addressed LRU + on-disk embedding cache
+- Hashing: Deterministic, dependency-free feature-hashing embedder
+- Batching: Micro-batching of concurrent query embeddings
+- Query Cache: Version-invalidated LRU/TTL cache of search results and contexts
+- Indexer: Incremental, manifest-driven indexing of directory trees
+- Chunking: Streaming token/sentence/markdown/code-aware document chunker
+- Lexical: BM25 inverted index for hybrid lexical + vector retrieval
+- Filters: Per-type/per-tag label bitmaps pushed down into vector search
+- Ranking: Rank fusion and MMR diversification of retrieval results
+- Packing: Tokenizer-accurate, knapsack-based context window packing
 - Gemini Integration: Enhanced reasoning with Gemini 2.5 Pro
-- API: REST API interface for RAG system interaction
+- Semantic Cache: Reuse of answers to paraphrased queries
+- Rate Limiting: Token-bucket request/token budgets for Gemini calls
+- Response Cache: Persistent SQLite cache of Gemini responses by prompt hash
+- API: REST + Server-Sent Events streaming interface for RAG queries
 
 Usage:
     from rag_system import create_rag_system, create_gemini_rag_system
@@ -33,16 +47,34 @@ from .core import (
     RAGContext,
     DocumentType,
     EmbeddingModel,
-    create_rag_system
+    create_rag_system,
+    evaluate_quantization
 )
 
+from .storage import SegmentStore
+from .embedding_cache import EmbeddingCache
+from .hashing import HashingEmbedder
+from .batching import EmbeddingBatcher
+from .query_cache import QueryResultCache
+from .semantic_cache import SemanticCache
+from .rate_limit import TokenBucketRateLimiter
+from .response_cache import ResponseCache
+from .chunking import Chunk, ChunkingStrategy, DocumentChunker
+from .indexer import FileManifest, IncrementalIndexer
+from .lexical import BM25Index
+from .ranking import reciprocal_rank_fusion, maximal_marginal_relevance
+from .filters import MetadataFilterIndex
+from .packing import TokenCounter, RegexTokenCounter, TokenizerCounter, ContextPacker
+
 from .gemini_integration import (
     GeminiRAGIntegration,
     GeminiResponse,
     EnhancedRAGResult,
     GeminiModel,
     ResponseMode,
-    create_gemini_rag_system
+    create_gemini_rag_system,
+    format_sse,
+    stream_sse
 )
 
 __version__ = "1.0.0"
@@ -59,6 +91,38 @@ __all__ = [
     "DocumentType",
     "EmbeddingModel",
     "create_rag_system",
+    "evaluate_quantization",
+    
+    # Storage and caching
+    "SegmentStore",
+    "EmbeddingCache",
+    "HashingEmbedder",
+    "EmbeddingBatcher",
+    "QueryResultCache",
+    "SemanticCache",
+    "TokenBucketRateLimiter",
+    "ResponseCache",
+    
+    # Chunking
+    "Chunk",
+    "ChunkingStrategy",
+    "DocumentChunker",
+    
+    # Incremental indexing
+    "FileManifest",
+    "IncrementalIndexer",
+    
+    # Retrieval
+    "BM25Index",
+    "reciprocal_rank_fusion",
+    "maximal_marginal_relevance",
+    "MetadataFilterIndex",
+    
+    # Context packing
+    "TokenCounter",
+    "RegexTokenCounter",
+    "TokenizerCounter",
+    "ContextPacker",
     
     # Gemini integration
     "GeminiRAGIntegration",
@@ -66,7 +130,9 @@ __all__ = [
     "EnhancedRAGResult", 
     "GeminiModel",
     "ResponseMode",
-    "create_gemini_rag_system"
+    "create_gemini_rag_system",
+    "format_sse",
+    "stream_sse"
 ]
 
 # Module level convenience functions
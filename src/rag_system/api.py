@@ -0,0 +1,191 @@
+"""
+RAG System API Interface
+CENTAUR-013: RAG System + Gemini Integration
+
+Provides HTTP endpoints for:
+- Enhanced RAG + Gemini queries
+- Streamed answers over Server-Sent Events (retrieval metadata first,
+  then answer chunks as they are generated, then citations and confidence)
+- RAG system statistics
+"""
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import logging
+
+from src.core.config import RAGSettings
+from .core import DocumentType, create_rag_system
+from .gemini_integration import (
+    GeminiRAGIntegration,
+    ResponseMode,
+    create_gemini_rag_system,
+    stream_sse
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="RAG System API",
+    description="AI Qube Centaur Ecosystem RAG + Gemini Interface",
+    version="1.0.0",
+    docs_url="/docs",
+    redoc_url="/redoc"
+)
+
+# Enable CORS for cross-origin requests
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Global Gemini RAG integration instance
+gemini_rag: Optional[GeminiRAGIntegration] = None
+
+# Pydantic models for API requests
+class QueryRequest(BaseModel):
+    """Request model for enhanced queries"""
+    query: str
+    response_mode: str = ResponseMode.REASONING.value  # ResponseMode enum value
+    doc_types: Optional[List[str]] = None  # DocumentType enum values
+    max_sources: int = 5
+
+def _get_integration() -> GeminiRAGIntegration:
+    """Initialized integration, or 503 while it is unavailable"""
+    if gemini_rag is None:
+        raise HTTPException(status_code=503, detail="RAG system not initialized")
+    return gemini_rag
+
+def _parse_request(request: QueryRequest) -> Dict[str, Any]:
+    """Validate enum values of a query request"""
+    try:
+        doc_types = None
+        if request.doc_types:
+            doc_types = [DocumentType(value) for value in request.doc_types]
+        return {
+            "response_mode": ResponseMode(request.response_mode),
+            "doc_types": doc_types,
+            "max_sources": request.max_sources
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize RAG system and Gemini integration on startup"""
+    global gemini_rag
+    try:
+        settings = RAGSettings()
+        rag = create_rag_system(
+            chunk_size=settings.rag_chunk_size,
+            chunk_overlap=settings.rag_chunk_overlap,
+            embedding_executor=settings.rag_embedding_executor,
+            embedding_workers=settings.rag_embedding_workers,
+            query_cache_size=settings.rag_query_cache_size,
+            query_cache_ttl=settings.rag_query_cache_ttl,
+            allow_hashing_fallback=settings.rag_allow_hashing_fallback
+        )
+        document_count = await rag.load_knowledge_base()
+        gemini_rag = create_gemini_rag_system(
+            rag,
+            settings.google_ai_api_key,
+            settings.gemini_model,
+            requests_per_minute=settings.gemini_requests_per_minute,
+            tokens_per_minute=settings.gemini_tokens_per_minute,
+            response_cache_path=settings.gemini_response_cache_path,
+            response_cache_size=settings.gemini_response_cache_size,
+            response_cache_ttl=settings.gemini_response_cache_ttl,
+            cache_nonzero_temperature=settings.gemini_cache_nonzero_temperature
+        )
+        logger.info(f"RAG System API started with {document_count} documents")
+    except Exception as e:
+        logger.error(f"Failed to initialize RAG system: {e}")
+        raise
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cleanup on shutdown"""
+    global gemini_rag
+    logger.info("RAG System API shutting down")
+    if gemini_rag is not None:
+        gemini_rag.close()
+        gemini_rag = None
+
+@app.get("/")
+async def root():
+    """Root endpoint with API information"""
+    return {
+        "service": "RAG System API",
+        "version": "1.0.0",
+        "status": "operational",
+        "timestamp": datetime.now().isoformat(),
+        "endpoints": {
+            "health": "/health",
+            "query": "/query",
+            "stream": "/query/stream",
+            "stats": "/stats"
+        }
+    }
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    integration = _get_integration()
+    stats = integration.rag_system.vector_db.get_stats()
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "gemini_available": integration.gemini_client is not None,
+        "documents": stats.get("total_documents", 0)
+    }
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    """Answer a query once the whole response is generated"""
+    integration = _get_integration()
+    result = await integration.enhanced_query(request.query, **_parse_request(request))
+    return {
+        "query": result.query,
+        "answer": result.enhanced_answer,
+        "confidence": result.confidence_score,
+        "reasoning_chain": result.reasoning_chain,
+        "source_citations": result.source_citations,
+        "model": result.gemini_response.model,
+        "timestamp": result.timestamp.isoformat()
+    }
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Answer a query as a Server-Sent Events stream
+    
+    Emits ``retrieval``, then ``chunk`` events while the answer is being
+    generated, then ``done`` (or ``error``); see
+    ``GeminiRAGIntegration.enhanced_query_stream`` for the payloads.
+    """
+    integration = _get_integration()
+    options = _parse_request(request)
+    return StreamingResponse(
+        stream_sse(integration, request.query, **options),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/stats")
+async def get_stats():
+    """RAG system, cache and rate limiter statistics"""
+    return _get_integration().get_stats()
+
+# Development server startup
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info")
@@ -0,0 +1,202 @@
+"""
+Embedding Batching Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Dynamic micro-batching of concurrent embedding requests:
+- A request is dispatched at once when no batch is being embedded; while
+  one is, requests queue until it finishes, for at most ``max_wait_ms`` or
+  until ``max_batch_size`` are waiting
+- Each batch is embedded with one ``aencode_batch`` call and every caller's
+  future is resolved with its own row
+- Queue depth and batch size histograms for tuning
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Fixed-bucket histogram of non-negative values"""
+    
+    def __init__(self, buckets: Sequence[int] = DEFAULT_BUCKETS):
+        """
+        Initialize histogram
+        
+        Args:
+            buckets: Inclusive upper bounds of the buckets, ascending; larger
+                values fall into an overflow bucket
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def observe(self, value: int):
+        """Record one value"""
+        index = int(np.searchsorted(self.buckets, value, side='left'))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Bucket counts keyed by upper bound, plus count, mean and max"""
+        labels = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max
+        }
+
+
+class _BatchQueue:
+    """Queued requests, flush timer and running batches of one event loop"""
+    
+    def __init__(self):
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.in_flight = 0
+        self.tasks: set = set()  # Strong references to running batches
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batches
+    
+    Each event loop gets its own queue, so one batcher can serve
+    successive loops (e.g. repeated ``asyncio.run``). Model inference runs
+    in the engine's worker pool, so batches keep forming while earlier ones
+    are being embedded.
+    """
+    
+    def __init__(self,
+                 engine: Any,
+                 max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0):
+        """
+        Initialize batcher
+        
+        Args:
+            engine: EmbeddingEngine exposing ``aencode_batch``
+            max_batch_size: Requests embedded together at most
+            max_wait_ms: Longest a request waits for others to join its batch
+                while another batch is being embedded
+        """
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        
+        self._queues: "weakref.WeakKeyDictionary[Any, _BatchQueue]" = (
+            weakref.WeakKeyDictionary()
+        )
+        
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+        self.queue_depth = Histogram()
+        self.batch_sizes = Histogram()
+    
+    async def encode(self, text: str) -> np.ndarray:
+        """
+        Embed one text as part of the next batch
+        
+        The request is dispatched at once when no batch is being embedded;
+        otherwise it waits for the running batch, ``max_wait_ms`` or a full
+        batch, whichever comes first.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = _BatchQueue()
+        
+        future = loop.create_future()
+        queue.pending.append((text, future))
+        self.requests += 1
+        self.queue_depth.observe(len(queue.pending))
+        
+        if queue.in_flight == 0 or len(queue.pending) >= self.max_batch_size:
+            self._flush(queue)
+        elif queue.timer is None:
+            queue.timer = loop.call_later(self.max_wait, self._flush, queue)
+        
+        return await future
+    
+    def _flush(self, queue: _BatchQueue):
+        """Dispatch up to max_batch_size queued requests as one batch"""
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        # Callers that gave up (e.g. timed out) are not embedded
+        queue.pending = [
+            (text, future) for text, future in queue.pending if not future.done()
+        ]
+        if not queue.pending:
+            return
+        
+        batch = queue.pending[:self.max_batch_size]
+        queue.pending = queue.pending[self.max_batch_size:]
+        
+        loop = asyncio.get_running_loop()
+        queue.in_flight += 1
+        task = loop.create_task(self._run(queue, batch))
+        queue.tasks.add(task)
+        task.add_done_callback(queue.tasks.discard)
+        
+        if len(queue.pending) >= self.max_batch_size:
+            self._flush(queue)
+        elif queue.pending:
+            queue.timer = loop.call_later(self.max_wait, self._flush, queue)
+    
+    async def _run(self, queue: _BatchQueue, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed one batch, resolve its futures and dispatch what queued meanwhile"""
+        self.batches += 1
+        self.batch_sizes.observe(len(batch))
+        
+        try:
+            embeddings = await self.engine.aencode_batch([text for text, _ in batch])
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Batched embedding of {len(batch)} requests failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            queue.in_flight -= 1
+            if queue.in_flight == 0:
+                self._flush(queue)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        queues = list(self._queues.values())
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "failures": self.failures,
+            "mean_batch_size": self.batch_sizes.snapshot()["mean"],
+            "pending": sum(len(queue.pending) for queue in queues),
+            "in_flight_batches": sum(queue.in_flight for queue in queues),
+            "queue_depth": self.queue_depth.snapshot(),
+            "batch_size": self.batch_sizes.snapshot()
+        }
@@ -0,0 +1,238 @@
+"""
+Document Chunking Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Generator-based chunking for RAG ingestion:
+- Token, sentence, markdown-heading and code-aware boundaries
+- Chunks are packed up to ``chunk_size`` characters with ``chunk_overlap``
+  characters carried over at unit boundaries
+- Character spans into the parent document so adjacent chunks can be
+  merged back without duplicating the overlap
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator, List, Optional, Pattern, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\S+\s*')
+LINE_PATTERN = re.compile(r'[^\n]*\n|[^\n]+$')
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?](?=\s)|\n\s*\n|$)\s*', re.DOTALL)
+HEADING_PATTERN = re.compile(r'^#{1,6}[ \t]+.*$', re.MULTILINE)
+CODE_BLOCK_PATTERN = re.compile(
+    r'(?:async\s+def|def|class|function|export|func|fn|impl|struct|interface|'
+    r'public|private|protected)\b'
+)
+
+CODE_EXTENSIONS = {
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".java", ".go", ".rs", ".c", ".h",
+    ".cpp", ".hpp", ".cs", ".rb", ".php", ".kt", ".swift", ".scala", ".sh"
+}
+MARKDOWN_EXTENSIONS = {".md", ".markdown", ".rst"}
+
+# (start, end) character offsets into the chunked text
+Span = Tuple[int, int]
+# (section title, unit spans) of a section chunks never cross
+Section = Tuple[Optional[str], Iterator[Span]]
+
+
+class ChunkingStrategy(Enum):
+    """Boundaries chunks are allowed to break at"""
+    TOKEN = "token"
+    SENTENCE = "sentence"
+    MARKDOWN = "markdown"
+    CODE = "code"
+
+
+@dataclass
+class Chunk:
+    """Contiguous slice of a parent document"""
+    content: str
+    index: int
+    start: int
+    end: int
+    section: Optional[str] = None
+
+
+def select_strategy(source: Optional[str] = None,
+                    is_code: bool = False) -> ChunkingStrategy:
+    """
+    Pick a chunking strategy from the document source and type
+    
+    Args:
+        source: Document source (file name or path)
+        is_code: Whether the document is known to be source code
+    
+    Returns:
+        Chunking strategy
+    """
+    suffix = ""
+    if source and "." in source.rsplit("/", 1)[-1]:
+        suffix = "." + source.rsplit(".", 1)[-1].lower()
+    
+    if is_code or suffix in CODE_EXTENSIONS:
+        return ChunkingStrategy.CODE
+    if suffix in MARKDOWN_EXTENSIONS:
+        return ChunkingStrategy.MARKDOWN
+    return ChunkingStrategy.SENTENCE
+
+
+class DocumentChunker:
+    """
+    Streaming document chunker
+    
+    The text is first split into units at natural boundaries for the chosen
+    strategy; units longer than ``chunk_size`` are refined at line, then
+    word, then character level. Consecutive units are packed greedily into
+    chunks, and trailing units that start within ``chunk_overlap``
+    characters of a chunk's end are repeated at the start of the next one.
+    """
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        """
+        Initialize chunker
+        
+        Args:
+            chunk_size: Maximum chunk length in characters
+            chunk_overlap: Characters of context repeated between chunks
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                "chunk_overlap must be non-negative and smaller than chunk_size"
+            )
+        
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    
+    def chunk(
+        self,
+        text: str,
+        strategy: ChunkingStrategy = ChunkingStrategy.SENTENCE
+    ) -> Iterator[Chunk]:
+        """
+        Split text into chunks
+        
+        Args:
+            text: Document text
+            strategy: Boundary strategy
+        
+        Yields:
+            Chunks in document order
+        """
+        index = 0
+        for section, spans in self._sections(text, strategy):
+            for start, end in self._pack(spans):
+                yield Chunk(
+                    content=text[start:end],
+                    index=index,
+                    start=start,
+                    end=end,
+                    section=section
+                )
+                index += 1
+    
+    def _sections(self,
+                  text: str,
+                  strategy: ChunkingStrategy) -> Iterator[Section]:
+        """Yield (section title, unit spans) pairs; chunks never cross sections"""
+        if strategy == ChunkingStrategy.TOKEN:
+            yield None, self._units(text, WORD_PATTERN, 0, len(text), [])
+        elif strategy == ChunkingStrategy.SENTENCE:
+            yield None, self._units(
+                text, SENTENCE_PATTERN, 0, len(text), [WORD_PATTERN]
+            )
+        elif strategy == ChunkingStrategy.MARKDOWN:
+            for title, start, end in self._markdown_sections(text):
+                yield title, self._units(
+                    text, SENTENCE_PATTERN, start, end, [WORD_PATTERN]
+                )
+        elif strategy == ChunkingStrategy.CODE:
+            yield None, self._code_units(text)
+        else:
+            raise ValueError(f"Unsupported chunking strategy: {strategy}")
+    
+    def _markdown_sections(self, text: str) -> Iterator[Tuple[Optional[str], int, int]]:
+        """Yield (heading, start, end) for each heading-delimited section"""
+        title: Optional[str] = None
+        start = 0
+        for match in HEADING_PATTERN.finditer(text):
+            if text[start:match.start()].strip():
+                yield title, start, match.start()
+            title = match.group().lstrip("#").strip()
+            start = match.start()
+        if text[start:].strip():
+            yield title, start, len(text)
+    
+    def _code_units(self, text: str) -> Iterator[Span]:
+        """Yield top-level definition blocks, keeping decorators with their target"""
+        block_start = 0
+        previous_decorator = False
+        
+        for match in LINE_PATTERN.finditer(text):
+            line = match.group()
+            is_decorator = line.startswith("@")
+            starts_block = is_decorator or CODE_BLOCK_PATTERN.match(line) is not None
+            
+            if starts_block and not previous_decorator and match.start() > block_start:
+                yield from self._refine(
+                    text, block_start, match.start(), [LINE_PATTERN, WORD_PATTERN]
+                )
+                block_start = match.start()
+            if line.strip():
+                previous_decorator = is_decorator
+        
+        if block_start < len(text):
+            yield from self._refine(
+                text, block_start, len(text), [LINE_PATTERN, WORD_PATTERN]
+            )
+    
+    def _units(self,
+               text: str,
+               pattern: Pattern,
+               start: int,
+               end: int,
+               finer: List[Pattern]) -> Iterator[Span]:
+        """Yield spans of pattern matches in [start, end), refining oversized ones"""
+        for match in pattern.finditer(text, start, end):
+            if match.end() > match.start():
+                yield from self._refine(text, match.start(), match.end(), finer)
+    
+    def _refine(self,
+                text: str,
+                start: int,
+                end: int,
+                finer: List[Pattern]) -> Iterator[Span]:
+        """Split a span longer than chunk_size at successively finer boundaries"""
+        if end - start <= self.chunk_size:
+            yield start, end
+        elif finer:
+            yield from self._units(text, finer[0], start, end, finer[1:])
+        else:
+            for offset in range(start, end, self.chunk_size):
+                yield offset, min(offset + self.chunk_size, end)
+    
+    def _pack(self, spans: Iterator[Span]) -> Iterator[Span]:
+        """Greedily pack unit spans into chunk spans with overlap"""
+        window: List[Span] = []
+        
+        for start, end in spans:
+            if window and end - window[0][0] > self.chunk_size:
+                chunk_end = window[-1][1]
+                yield window[0][0], chunk_end
+                
+                # Carry trailing units into the next chunk as overlap
+                overlap_start = chunk_end - self.chunk_overlap
+                window = [span for span in window if span[0] >= overlap_start]
+                while window and end - window[0][0] > self.chunk_size:
+                    window.pop(0)
+            window.append((start, end))
+        
+        if window:
+            yield window[0][0], window[-1][1]
@@ -19,12 +19,17 @@ import json
 import logging
 import numpy as np
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any, Tuple, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Tuple, Union, Iterable, Callable
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from enum import Enum
 import hashlib
+import os
 import pickle
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Vector database and embedding imports (will be installed via requirements)
 try:
@@ -41,16 +46,43 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     logging.warning("SentenceTransformers not available")
 
+from .storage import SegmentStore, MANIFEST_FILE
+from .embedding_cache import EmbeddingCache
+from .hashing import HashingEmbedder
+from .chunking import ChunkingStrategy, DocumentChunker, select_strategy
+from .lexical import BM25Index, tokenize
+from .ranking import maximal_marginal_relevance, reciprocal_rank_fusion
+from .filters import MetadataFilterIndex
+from .snippets import extract_snippet
+from .batching import EmbeddingBatcher
+from .query_cache import QueryResultCache, normalize_query
+from .packing import (
+    CachedTokenCounter,
+    ContextPacker,
+    PackItem,
+    TokenCounter,
+    create_token_counter,
+    trim_to_tokens
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upsert keys merged into near-duplicate documents, kept next to the store
+SOURCE_ALIASES_FILE = "source_aliases.json"
+
+# Disables the feature-hashing fallback when false (mirrors
+# Settings.rag_allow_hashing_fallback)
+HASHING_FALLBACK_ENV = "RAG_ALLOW_HASHING_FALLBACK"
+
 
 class EmbeddingModel(Enum):
     """Supported embedding models"""
     SENTENCE_BERT = "all-MiniLM-L6-v2"
     OPENAI_ADA = "text-embedding-ada-002"
     GEMINI_EMBEDDING = "gemini-pro-embedding"
+    HASHING = "feature-hashing"
     CUSTOM = "custom"
 
 
@@ -91,6 +123,7 @@ class SearchResult:
     relevance_rank: int
     context_snippet: str
     highlighted_terms: List[str]
+    highlight_spans: List[Tuple[int, int]] = field(default_factory=list)
 
 
 @dataclass
@@ -109,39 +142,93 @@ class VectorDatabase:
     """
     Vector database for semantic search and retrieval
     Supports FAISS for high-performance similarity search
+    
+    Every document is assigned a stable 64-bit label that is never reused.
+    Removed documents become tombstones that are filtered at search time
+    until ``compact`` rebuilds the index without them.
+    
+    With a quantized ``storage`` mode the index holds fp16, 8-bit scalar or
+    product-quantized codes. Full-precision vectors then live only in the
+    row matrix (memory-mapped from the snapshot after ``load``), documents
+    no longer carry their own embedding, and the top candidates are
+    re-scored exactly against the full-precision rows.
     """
     
-    def __init__(self, 
+    STORAGE_MODES = ("float32", "fp16", "sq8", "pq")
+    
+    def __init__(self,
                  dimension: int = 384,
                  index_type: str = "flat",
-                 metric: str = "cosine"):
+                 metric: str = "cosine",
+                 compaction_threshold: float = 0.2,
+                 auto_compact: bool = True,
+                 training_threshold: int = 10000,
+                 nlist: Optional[int] = None,
+                 nprobe: int = 8,
+                 hnsw_m: int = 32,
+                 ef_search: int = 64,
+                 storage: str = "float32",
+                 rerank_factor: int = 4,
+                 pq_m: Optional[int] = None):
         """
         Initialize vector database
         
+        IVF and HNSW indexes start out as an exact flat index. Once
+        ``training_threshold`` live vectors have been buffered the target
+        index is trained (IVF) or built (HNSW) and swapped in transparently.
+        
         Args:
             dimension: Vector embedding dimension
             index_type: FAISS index type (flat, ivf, hnsw)
             metric: Distance metric (cosine, euclidean, inner_product)
+            compaction_threshold: Dead-row ratio that triggers compaction
+            auto_compact: Compact in a background thread once the
+                threshold is passed
+            training_threshold: Vectors to buffer before building IVF/HNSW
+            nlist: IVF list count (chosen from corpus size when None)
+            nprobe: Default IVF lists probed per query
+            hnsw_m: HNSW graph degree
+            ef_search: Default HNSW search depth
+            storage: Vector storage in the index (float32, fp16, sq8, pq);
+                sq8 and pq are trained once ``training_threshold`` vectors
+                are buffered
+            rerank_factor: Candidates per result re-scored at full
+                precision for quantized storage (1 disables re-ranking)
+            pq_m: PQ sub-quantizers, i.e. bytes per vector (chosen from
+                the dimension when None)
         """
+        if storage not in self.STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage}")
+        
         self.dimension = dimension
         self.index_type = index_type
         self.metric = metric
+        self.compaction_threshold = compaction_threshold
+        self.auto_compact = auto_compact
+        self.training_threshold = training_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.storage = storage
+        self.rerank_factor = max(1, rerank_factor)
+        self.pq_m = pq_m or self._choose_pq_m(dimension)
+        
+        # Index type and storage currently serving queries; IVF/HNSW and
+        # trained codecs buffer in a float32 flat index first
+        self.active_index_type = "flat"
+        self.active_storage = "fp16" if storage == "fp16" else "float32"
         
         # Initialize FAISS index if available
         if FAISS_AVAILABLE:
-            if index_type == "flat":
-                if metric == "cosine":
-                    self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine
-                else:
-                    self.index = faiss.IndexFlatL2(dimension)  # L2 for euclidean
-            elif index_type == "ivf":
-                quantizer = faiss.IndexFlatL2(dimension)
-                self.index = faiss.IndexIVFFlat(quantizer, dimension, 100)
-            else:
-                self.index = faiss.IndexHNSWFlat(dimension, 32)
+            self.index = self._create_index("flat", storage=self.active_storage)
         else:
             self.index = None
             logger.warning("FAISS not available, using numpy-based fallback")
+            if storage != "float32":
+                logger.warning(
+                    f"{storage} storage requires FAISS, storing float32 rows"
+                )
         
         # Document storage
         self.documents: Dict[str, Document] = {}
@@ -149,125 +236,887 @@ class VectorDatabase:
         self.index_to_id: Dict[int, str] = {}
         self.next_index = 0
         
+        # Labels of removed documents still present in the FAISS index
+        self._tombstones: set = set()
+        self._lock = threading.RLock()
+        
+        # Per-type/per-tag label bitmaps for pre-filtered search
+        self.filters = MetadataFilterIndex()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self.compactions = 0
+        
+        # Contiguous matrix backing the numpy fallback search and holding the
+        # full-precision vectors for quantized storage. Rows are stored
+        # pre-normalized for cosine so a query is a single matrix-vector
+        # product.
+        self._matrix = np.zeros((0, dimension), dtype='float32')
+        self._sq_norms = np.zeros(0, dtype='float32')
+        self._row_ids = np.empty(0, dtype=object)
+        self._row_labels = np.zeros(0, dtype='int64')
+        self._live_rows = np.zeros(0, dtype=bool)
+        self._row_count = 0
+        self._id_to_row: Dict[str, int] = {}
+        
+        # Index file backing a memory-mapped index loaded by ``load``
+        self._mapped_index_file: Optional[Path] = None
+        
         logger.info(f"Vector database initialized: {dimension}D, {index_type}, {metric}")
     
+    def _faiss_metric(self) -> int:
+        """FAISS metric matching the configured similarity metric"""
+        if self.metric in ("cosine", "inner_product"):
+            return faiss.METRIC_INNER_PRODUCT  # Inner product for cosine
+        return faiss.METRIC_L2  # L2 for euclidean
+    
+    @property
+    def _owns_vectors(self) -> bool:
+        """Whether full-precision vectors live in the row matrix, not on documents"""
+        return self.index is None or self.storage != "float32"
+    
+    @staticmethod
+    def _choose_pq_m(dimension: int) -> int:
+        """Largest sub-quantizer count dividing dimension with >= 8 dims each"""
+        candidates = range(1, max(1, dimension // 8) + 1)
+        return max(m for m in candidates if dimension % m == 0)
+    
+    @staticmethod
+    def _choose_nlist(num_vectors: int) -> int:
+        """Pick an IVF list count from the corpus size"""
+        # ~4*sqrt(n) lists, keeping at least 39 training points per centroid
+        nlist = int(4 * np.sqrt(num_vectors))
+        return max(1, min(nlist, num_vectors // 39))
+    
+    def _create_index(self,
+                      index_type: str,
+                      nlist: Optional[int] = None,
+                      storage: str = "float32"):
+        """Create an empty ID-mapped FAISS index of the given type and storage"""
+        metric = self._faiss_metric()
+        dimension = self.dimension
+        qtype = None
+        if storage in ("fp16", "sq8"):
+            qtype = (
+                faiss.ScalarQuantizer.QT_fp16 if storage == "fp16"
+                else faiss.ScalarQuantizer.QT_8bit
+            )
+        
+        if index_type == "ivf":
+            if metric == faiss.METRIC_INNER_PRODUCT:
+                quantizer = faiss.IndexFlatIP(dimension)
+            else:
+                quantizer = faiss.IndexFlatL2(dimension)
+            if qtype is not None:
+                base = faiss.IndexIVFScalarQuantizer(
+                    quantizer, dimension, nlist or 1, qtype, metric
+                )
+            elif storage == "pq":
+                base = faiss.IndexIVFPQ(
+                    quantizer, dimension, nlist or 1, self.pq_m, 8, metric
+                )
+            else:
+                base = faiss.IndexIVFFlat(quantizer, dimension, nlist or 1, metric)
+        elif index_type == "hnsw":
+            if qtype is not None:
+                base = faiss.IndexHNSWSQ(dimension, qtype, self.hnsw_m, metric)
+            elif storage == "pq":
+                base = faiss.IndexHNSWPQ(dimension, self.pq_m, self.hnsw_m, 8, metric)
+            else:
+                base = faiss.IndexHNSWFlat(dimension, self.hnsw_m, metric)
+        elif qtype is not None:
+            base = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+        elif storage == "pq":
+            base = faiss.IndexPQ(dimension, self.pq_m, 8, metric)
+        elif metric == faiss.METRIC_INNER_PRODUCT:
+            base = faiss.IndexFlatIP(dimension)
+        else:
+            base = faiss.IndexFlatL2(dimension)
+        
+        return faiss.IndexIDMap2(base)
+    
+    def _build_index(self,
+                     index_type: str,
+                     embeddings: np.ndarray,
+                     labels: np.ndarray,
+                     storage: str = "float32"):
+        """Create, train if needed, and fill an index of the given type"""
+        nlist = None
+        if index_type == "ivf":
+            nlist = self.nlist or self._choose_nlist(len(embeddings))
+        
+        index = self._create_index(index_type, nlist, storage)
+        if not index.is_trained:
+            index.train(embeddings)
+        if len(embeddings):
+            index.add_with_ids(embeddings, labels)
+        return index
+    
+    def _search_params(self,
+                       nprobe: Optional[int],
+                       ef_search: Optional[int],
+                       selector=None):
+        """Per-query search parameters for the active index type"""
+        if self.active_index_type == "ivf":
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe, sel=selector)
+        if self.active_index_type == "hnsw":
+            return faiss.SearchParametersHNSW(
+                efSearch=ef_search or self.ef_search, sel=selector
+            )
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+    
+    def _needs_training_migration(self) -> bool:
+        """Check whether the flat buffer should be promoted to the target index"""
+        promotes_type = (
+            self.active_index_type != self.index_type
+            and self.index_type in ("ivf", "hnsw")
+        )
+        return (
+            self.index is not None
+            and (promotes_type or self.active_storage != self.storage)
+            and len(self.documents) >= self.training_threshold
+        )
+    
     def add_document(self, document: Document) -> bool:
         """
         Add document with embedding to the vector database
         
         Args:
             document: Document with embedding
-            
+        
         Returns:
             bool: Success status
         """
+        return self.add_documents([document]) == 1
+    
+    def add_documents(self, documents: List[Document]) -> int:
+        """
+        Add a batch of documents with a single index insertion
+        
+        Embeddings are stacked into one float32 matrix, normalized in a
+        single vectorized pass and handed to the index with one ``add`` call.
+        
+        Args:
+            documents: Documents with embeddings
+        
+        Returns:
+            int: Number of documents added
+        """
         try:
-            if document.embedding is None:
-                logger.error(f"Document {document.id} has no embedding")
-                return False
-            
-            # Normalize embedding for cosine similarity
-            if self.metric == "cosine":
-                embedding = document.embedding / np.linalg.norm(document.embedding)
-            else:
-                embedding = document.embedding
+            unique: Dict[str, Document] = {}
+            for document in documents:
+                if document.embedding is None:
+                    logger.error(f"Document {document.id} has no embedding")
+                    continue
+                unique[document.id] = document
             
-            # Add to FAISS index
-            if self.index is not None:
-                self.index.add(embedding.reshape(1, -1).astype('float32'))
+            if not unique:
+                return 0
             
-            # Store document and mappings
-            self.documents[document.id] = document
-            self.id_to_index[document.id] = self.next_index
-            self.index_to_id[self.next_index] = document.id
-            self.next_index += 1
+            batch = list(unique.values())
+            embeddings = self._stack_embeddings(batch)
             
-            logger.debug(f"Added document {document.id} to vector database")
-            return True
+            with self._lock:
+                # Re-adding an existing ID replaces the previous vector
+                for document in batch:
+                    if document.id in self.documents:
+                        self._discard(document.id)
+                
+                labels = np.arange(
+                    self.next_index, self.next_index + len(batch), dtype='int64'
+                )
+                
+                # Add to FAISS index
+                if self.index is not None:
+                    self._ensure_writable()
+                    self.index.add_with_ids(embeddings, labels)
+                if self._owns_vectors:
+                    self._append_rows(
+                        embeddings, [document.id for document in batch], labels
+                    )
+                
+                # Store documents and mappings
+                for document, label in zip(batch, labels.tolist()):
+                    if self.storage != "float32":
+                        # The row matrix holds the only full-precision copy
+                        document.embedding = None
+                    self.documents[document.id] = document
+                    self.id_to_index[document.id] = label
+                    self.index_to_id[label] = document.id
+                self.filters.add(labels, batch)
+                self.next_index += len(batch)
+                
+                if self._needs_training_migration():
+                    self._rebuild_index(self.index_type, self.storage)
             
+            logger.debug(f"Added {len(batch)} documents to vector database")
+            return len(batch)
+        
         except Exception as e:
-            logger.error(f"Failed to add document {document.id}: {e}")
-            return False
+            logger.error(f"Failed to add {len(documents)} documents: {e}")
+            return 0
+    
+    def _stack_embeddings(self, documents: List[Document]) -> np.ndarray:
+        """Stack document embeddings into a contiguous float32 matrix"""
+        embeddings = np.vstack([
+            np.asarray(document.embedding, dtype='float32').reshape(1, -1)
+            for document in documents
+        ])
+        
+        # Normalize embeddings for cosine similarity
+        if self.metric == "cosine":
+            embeddings = self._normalize(embeddings)
+        
+        return np.ascontiguousarray(embeddings, dtype='float32')
+    
+    def _full_vectors(self, doc_ids: List[str]) -> np.ndarray:
+        """Full-precision (normalized for cosine) vectors of indexed documents"""
+        if not self._owns_vectors:
+            return self._stack_embeddings(
+                [self.documents[doc_id] for doc_id in doc_ids]
+            )
+        rows = np.fromiter(
+            (self._id_to_row[doc_id] for doc_id in doc_ids),
+            dtype=np.int64,
+            count=len(doc_ids)
+        )
+        return np.ascontiguousarray(self._matrix[rows], dtype='float32')
+    
+    def _append_rows(self,
+                     embeddings: np.ndarray,
+                     doc_ids: List[str],
+                     labels: np.ndarray):
+        """Append rows to the fallback matrix, growing it geometrically"""
+        start = self._row_count
+        end = start + len(doc_ids)
+        
+        if end > self._matrix.shape[0]:
+            capacity = max(end, 2 * self._matrix.shape[0], 1024)
+            matrix = np.zeros((capacity, self.dimension), dtype='float32')
+            matrix[:start] = self._matrix[:start]
+            sq_norms = np.zeros(capacity, dtype='float32')
+            sq_norms[:start] = self._sq_norms[:start]
+            row_ids = np.empty(capacity, dtype=object)
+            row_ids[:start] = self._row_ids[:start]
+            row_labels = np.zeros(capacity, dtype='int64')
+            row_labels[:start] = self._row_labels[:start]
+            live_rows = np.zeros(capacity, dtype=bool)
+            live_rows[:start] = self._live_rows[:start]
+            
+            self._matrix = matrix
+            self._sq_norms = sq_norms
+            self._row_ids = row_ids
+            self._row_labels = row_labels
+            self._live_rows = live_rows
+        
+        self._matrix[start:end] = embeddings
+        self._sq_norms[start:end] = np.einsum('ij,ij->i', embeddings, embeddings)
+        self._row_ids[start:end] = doc_ids
+        self._row_labels[start:end] = labels
+        self._live_rows[start:end] = True
+        for row, doc_id in enumerate(doc_ids, start):
+            self._id_to_row[doc_id] = row
+        self._row_count = end
+    
+    def _search_matrix(
+        self,
+        queries: np.ndarray,
+        k: int,
+        threshold: float,
+        selection: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Brute-force top-k over the fallback matrix for a matrix of queries"""
+        rows = self._row_count
+        matrix = self._matrix[:rows]
+        
+        if self.metric in ("cosine", "inner_product"):
+            scores = queries @ matrix.T
+        else:
+            # Negative euclidean distance from ||x||^2 - 2x.q + ||q||^2
+            sq_dist = (
+                self._sq_norms[:rows][None, :]
+                - 2.0 * (queries @ matrix.T)
+                + np.einsum('ij,ij->i', queries, queries)[:, None]
+            )
+            scores = -np.sqrt(np.maximum(sq_dist, 0.0))
+        
+        live = self._live_rows[:rows]
+        if selection is not None:
+            live = live & self.filters.contains(selection, self._row_labels[:rows])
+        scores = np.where(live[None, :], scores, -np.inf)
+        
+        k = min(k, rows)
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        if k < rows:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(rows), (len(queries), rows))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        keep = (top_scores >= threshold) & np.isfinite(top_scores)
+        
+        return [
+            [
+                (doc_id, float(score))
+                for doc_id, score in zip(
+                    self._row_ids[top[i][keep[i]]], top_scores[i][keep[i]]
+                )
+            ]
+            for i in range(len(queries))
+        ]
+    
+    def _rerank(self,
+                query: np.ndarray,
+                results: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Re-score candidates against their full-precision vectors"""
+        if not results:
+            return results
+        
+        doc_ids = [doc_id for doc_id, _ in results]
+        vectors = self._full_vectors(doc_ids)
+        if self.metric in ("cosine", "inner_product"):
+            scores = vectors @ query
+            order = np.argsort(-scores, kind='stable')
+        else:
+            # Squared L2 distance, as reported by the FAISS index
+            scores = np.einsum('ij,ij->i', vectors - query, vectors - query)
+            order = np.argsort(scores, kind='stable')
+        return [(doc_ids[i], float(scores[i])) for i in order]
+    
+    @staticmethod
+    def _normalize(embeddings: np.ndarray) -> np.ndarray:
+        """L2-normalize the rows of an embedding matrix"""
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
     
-    def search(self, 
-               query_embedding: np.ndarray, 
+    def search(self,
+               query_embedding: np.ndarray,
                k: int = 10,
-               threshold: float = 0.7) -> List[Tuple[str, float]]:
+               threshold: float = 0.7,
+               nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None,
+               doc_types: Optional[List[DocumentType]] = None,
+               tags: Optional[List[str]] = None) -> List[Tuple[str, float]]:
         """
         Search for similar documents
         
+        Type and tag filters are resolved to a label bitmap up front and
+        applied inside the search, so filtered queries need no over-fetch.
+        
         Args:
             query_embedding: Query vector
             k: Number of results to return
             threshold: Minimum similarity threshold
-            
+            nprobe: IVF lists to probe for this query
+            ef_search: HNSW search depth for this query
+            doc_types: Only return documents of these types
+            tags: Only return documents carrying at least one of these tags
+        
         Returns:
             List of (document_id, similarity_score) tuples
         """
+        query = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+        return self.search_batch(
+            query, k, threshold, nprobe, ef_search, doc_types, tags
+        )[0]
+    
+    def search_batch(self,
+                     query_embeddings: np.ndarray,
+                     k: int = 10,
+                     threshold: float = 0.7,
+                     nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None,
+                     doc_types: Optional[List[DocumentType]] = None,
+                     tags: Optional[List[str]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Search for similar documents for several queries at once
+        
+        All queries go to the index in one FAISS call (or one matrix
+        product in the numpy fallback), sharing one filter bitmap.
+        
+        Args:
+            query_embeddings: Query matrix, one row per query
+            k: Number of results per query
+            threshold: Minimum similarity threshold
+            nprobe: IVF lists to probe
+            ef_search: HNSW search depth
+            doc_types: Only return documents of these types
+            tags: Only return documents carrying at least one of these tags
+        
+        Returns:
+            One list of (document_id, similarity_score) tuples per query
+        """
+        queries = np.asarray(query_embeddings, dtype='float32')
+        if queries.size:
+            queries = queries.reshape(-1, queries.shape[-1])
+        else:
+            queries = queries.reshape(0, self.dimension)
+        empty = [[] for _ in range(len(queries))]
+        
         try:
-            if len(self.documents) == 0:
-                return []
+            if len(self.documents) == 0 or len(queries) == 0:
+                return empty
             
-            # Normalize query embedding for cosine similarity
+            # Normalize query embeddings for cosine similarity
             if self.metric == "cosine":
-                query = query_embedding / np.linalg.norm(query_embedding)
-            else:
-                query = query_embedding
+                queries = self._normalize(queries)
+            queries = np.ascontiguousarray(queries, dtype='float32')
             
-            if self.index is not None and FAISS_AVAILABLE:
-                # FAISS search
-                scores, indices = self.index.search(
-                    query.reshape(1, -1).astype('float32'), 
-                    min(k, len(self.documents))
-                )
+            with self._lock:
+                selection = None
+                if doc_types or tags:
+                    selection = self.filters.select(doc_types, tags)
+                    k = min(k, self.filters.count(selection))
+                    if k == 0:
+                        return empty
                 
-                results = []
-                for score, idx in zip(scores[0], indices[0]):
-                    if idx != -1 and score >= threshold:
-                        doc_id = self.index_to_id[idx]
-                        results.append((doc_id, float(score)))
-                
-                return results
-            else:
-                # Fallback numpy search
-                similarities = []
-                for doc_id, document in self.documents.items():
-                    if document.embedding is not None:
-                        if self.metric == "cosine":
-                            doc_embedding = document.embedding / np.linalg.norm(document.embedding)
-                            similarity = np.dot(query, doc_embedding)
-                        else:
-                            similarity = -np.linalg.norm(query - document.embedding)
+                if self.index is not None and FAISS_AVAILABLE:
+                    # Quantized scores only shortlist candidates for exact re-ranking
+                    rerank = self.active_storage != "float32" and self.rerank_factor > 1
+                    candidates = k * self.rerank_factor if rerank else k
+                    
+                    if selection is not None:
+                        # The selection already excludes tombstones
+                        fetch = candidates
+                        selector = faiss.IDSelectorBitmap(selection)
+                    else:
+                        # Over-fetch to cover tombstoned rows
+                        fetch = candidates + len(self._tombstones)
+                        selector = None
+                    
+                    scores, indices = self.index.search(
+                        queries,
+                        min(fetch, self.index.ntotal),
+                        params=self._search_params(nprobe, ef_search, selector)
+                    )
+                    
+                    batch_results = []
+                    for query, row_scores, row_indices in zip(queries, scores, indices):
+                        results = []
+                        for score, idx in zip(row_scores, row_indices):
+                            if idx == -1 or (not rerank and score < threshold):
+                                continue
+                            doc_id = self.index_to_id.get(int(idx))
+                            if doc_id is None:
+                                continue
+                            results.append((doc_id, float(score)))
+                            if len(results) >= candidates:
+                                break
                         
-                        if similarity >= threshold:
-                            similarities.append((doc_id, similarity))
-                
-                # Sort by similarity and return top k
-                similarities.sort(key=lambda x: x[1], reverse=True)
-                return similarities[:k]
-                
+                        if rerank:
+                            results = [
+                                (doc_id, score)
+                                for doc_id, score in self._rerank(query, results)
+                                if score >= threshold
+                            ][:k]
+                        batch_results.append(results)
+                    return batch_results
+                else:
+                    # Fallback numpy search
+                    return self._search_matrix(queries, k, threshold, selection)
+        
         except Exception as e:
             logger.error(f"Search failed: {e}")
-            return []
+            return empty
     
     def get_document(self, doc_id: str) -> Optional[Document]:
         """Get document by ID"""
         return self.documents.get(doc_id)
     
+    def get_embeddings(self, doc_ids: List[str]) -> np.ndarray:
+        """
+        L2-normalized embeddings of documents as one matrix
+        
+        Rows are gathered from the row matrix when it holds the vectors,
+        otherwise stacked from the stored documents. Unknown IDs get a zero
+        row.
+        
+        Args:
+            doc_ids: Document IDs
+        
+        Returns:
+            float32 matrix with one row per ID
+        """
+        embeddings = np.zeros((len(doc_ids), self.dimension), dtype='float32')
+        with self._lock:
+            if self._owns_vectors:
+                rows = np.array(
+                    [self._id_to_row.get(doc_id, -1) for doc_id in doc_ids],
+                    dtype=np.int64
+                )
+                found = rows >= 0
+                embeddings[found] = self._matrix[rows[found]]
+            else:
+                for i, doc_id in enumerate(doc_ids):
+                    document = self.documents.get(doc_id)
+                    if document is not None and document.embedding is not None:
+                        embedding = np.asarray(document.embedding, dtype='float32')
+                        embeddings[i] = embedding.reshape(-1)
+        
+        return self._normalize(embeddings)
+    
     def remove_document(self, doc_id: str) -> bool:
-        """Remove document from database"""
+        """
+        Remove document from database
+        
+        The vector is tombstoned immediately and physically dropped by the
+        next compaction.
+        """
         try:
-            if doc_id in self.documents:
-                del self.documents[doc_id]
-                # Note: FAISS doesn't support efficient removal, 
-                # would need index rebuild for production use
-                logger.debug(f"Removed document {doc_id}")
-                return True
-            return False
+            with self._lock:
+                if doc_id not in self.documents:
+                    return False
+                self._discard(doc_id)
+            
+            logger.debug(f"Removed document {doc_id}")
+            self._maybe_schedule_compaction()
+            return True
         except Exception as e:
             logger.error(f"Failed to remove document {doc_id}: {e}")
             return False
     
+    def _discard(self, doc_id: str):
+        """Drop a document and tombstone its vector (caller holds the lock)"""
+        del self.documents[doc_id]
+        label = self.id_to_index.pop(doc_id)
+        self.index_to_id.pop(label, None)
+        self.filters.remove(label)
+        
+        if self.index is not None:
+            self._tombstones.add(label)
+        if self._owns_vectors:
+            row = self._id_to_row.pop(doc_id)
+            self._live_rows[row] = False
+    
+    def dead_ratio(self) -> float:
+        """Fraction of indexed rows that belong to removed documents"""
+        total = self.index.ntotal if self.index is not None else self._row_count
+        if total == 0:
+            return 0.0
+        return (total - len(self.documents)) / total
+    
+    def _maybe_schedule_compaction(self):
+        """Start a background compaction once the dead-row ratio is too high"""
+        if not self.auto_compact or self.dead_ratio() <= self.compaction_threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        
+        self._compaction_thread = threading.Thread(
+            target=self.compact,
+            name="vector-db-compaction",
+            daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def compact(self) -> int:
+        """
+        Rebuild the index without tombstoned rows
+        
+        The FAISS index is rebuilt outside the lock from a snapshot of the
+        live documents; documents added or removed meanwhile are replayed
+        before the new index is swapped in.
+        
+        Returns:
+            int: Number of dead rows reclaimed
+        """
+        try:
+            if self.index is None:
+                return self._compact_matrix()
+            
+            with self._lock:
+                if not self._tombstones:
+                    return 0
+            
+            reclaimed = self._rebuild_index(self.active_index_type, self.active_storage)
+            if self._owns_vectors:
+                self._pack_rows()
+            self.compactions += 1
+            logger.info(f"Compacted vector index, reclaimed {reclaimed} dead rows")
+            return reclaimed
+        
+        except Exception as e:
+            logger.error(f"Compaction failed: {e}")
+            return 0
+    
+    def _rebuild_index(self, index_type: str, storage: str) -> int:
+        """
+        Rebuild the FAISS index from the live documents
+        
+        Used both for compaction and for promoting the flat training buffer
+        to an IVF/HNSW index and/or trained quantized storage. Returns the
+        number of dead rows dropped.
+        """
+        with self._lock:
+            snapshot_next = self.next_index
+            snapshot_tombstones = set(self._tombstones)
+            snapshot_ids = list(self.id_to_index)
+            labels = np.asarray(
+                [self.id_to_index[doc_id] for doc_id in snapshot_ids], dtype='int64'
+            )
+            before = self.index.ntotal
+            
+            # Row-matrix vectors are copied under the lock; document
+            # embeddings are immutable, so the documents are collected here
+            # (they may be removed meanwhile) and stacked outside it
+            embeddings = None
+            snapshot_documents = None
+            if self._owns_vectors:
+                embeddings = self._full_vectors(snapshot_ids)
+            else:
+                snapshot_documents = [
+                    self.documents[doc_id] for doc_id in snapshot_ids
+                ]
+        
+        if embeddings is None:
+            embeddings = self._stack_embeddings(snapshot_documents)
+        
+        if len(embeddings) < self.training_threshold:
+            # Not enough data to train, keep buffering in flat float32
+            index_type = "flat"
+            if storage != "fp16":
+                storage = "float32"
+        new_index = self._build_index(index_type, embeddings, labels, storage)
+        
+        with self._lock:
+            # Replay documents added after the snapshot was taken
+            added = [
+                (doc_id, label) for doc_id, label in self.id_to_index.items()
+                if label >= snapshot_next
+            ]
+            if added:
+                doc_ids, labels = zip(*added)
+                new_index.add_with_ids(
+                    self._full_vectors(list(doc_ids)),
+                    np.asarray(labels, dtype='int64')
+                )
+            
+            # Rows removed after the snapshot stay tombstoned
+            self._tombstones = {
+                label for label in self._tombstones - snapshot_tombstones
+                if label < snapshot_next
+            }
+            self.index = new_index
+            self._mapped_index_file = None
+            if index_type != self.active_index_type or storage != self.active_storage:
+                logger.info(
+                    f"Migrated vector index from "
+                    f"{self.active_index_type}/{self.active_storage} to "
+                    f"{index_type}/{storage} with {new_index.ntotal} vectors"
+                )
+            self.active_index_type = index_type
+            self.active_storage = storage
+            return before + len(added) - new_index.ntotal
+    
+    def _compact_matrix(self) -> int:
+        """Pack live rows of the fallback matrix"""
+        reclaimed = self._pack_rows()
+        if reclaimed:
+            self.compactions += 1
+            logger.info(f"Compacted fallback matrix, reclaimed {reclaimed} dead rows")
+        return reclaimed
+    
+    def _pack_rows(self) -> int:
+        """Move live rows of the row matrix to the front, returning rows freed"""
+        with self._lock:
+            rows = self._row_count
+            live = np.flatnonzero(self._live_rows[:rows])
+            reclaimed = rows - len(live)
+            if reclaimed == 0:
+                return 0
+            
+            count = len(live)
+            if not self._matrix.flags.writeable:
+                self._matrix = np.array(self._matrix)
+            self._matrix[:count] = self._matrix[live]
+            self._sq_norms[:count] = self._sq_norms[live]
+            self._row_ids[:count] = self._row_ids[live]
+            self._row_ids[count:rows] = None
+            self._row_labels[:count] = self._row_labels[live]
+            self._live_rows[:count] = True
+            self._live_rows[count:rows] = False
+            self._row_count = count
+            self._id_to_row = {
+                doc_id: row for row, doc_id in enumerate(self._row_ids[:count])
+            }
+        return reclaimed
+    
+    @staticmethod
+    def _id_checksum(doc_ids: Iterable[str]) -> str:
+        """Order-independent checksum of a set of document IDs"""
+        digest = hashlib.sha256()
+        for doc_id in sorted(doc_ids):
+            digest.update(doc_id.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def save(self, path: Union[str, Path]):
+        """
+        Serialize the index and its ID maps
+        
+        Args:
+            path: Directory to write the snapshot into
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        
+        with self._lock:
+            meta = {
+                "format": 1,
+                "dimension": self.dimension,
+                "metric": self.metric,
+                "index_type": self.index_type,
+                "active_index_type": self.active_index_type,
+                "storage": self.storage,
+                "active_storage": self.active_storage,
+                "backend": "faiss" if self.index is not None else "numpy",
+                "next_index": self.next_index,
+                "labels": self.id_to_index,
+                "tombstones": sorted(self._tombstones),
+                "checksum": self._id_checksum(self.id_to_index)
+            }
+            
+            if self.index is not None:
+                faiss.write_index(self.index, str(path / "index.faiss.tmp"))
+                os.replace(path / "index.faiss.tmp", path / "index.faiss")
+            if self._owns_vectors:
+                rows = self._row_count
+                np.save(path / "matrix.tmp.npy", self._matrix[:rows])
+                os.replace(path / "matrix.tmp.npy", path / "matrix.npy")
+                meta["row_ids"] = self._row_ids[:rows].tolist()
+                meta["live_rows"] = np.flatnonzero(self._live_rows[:rows]).tolist()
+            
+            # The meta file is written last and marks the snapshot complete
+            with open(path / "index_meta.json.tmp", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(path / "index_meta.json.tmp", path / "index_meta.json")
+        
+        logger.info(
+            f"Saved vector index with {len(self.documents)} documents to {path}"
+        )
+    
+    def load(self,
+             path: Union[str, Path],
+             documents: Dict[str, Document],
+             mmap: bool = True) -> bool:
+        """
+        Restore a snapshot written by ``save``
+        
+        The snapshot's ID maps are validated against ``documents`` with a
+        checksum; on any mismatch nothing is changed and False is returned
+        so the caller can rebuild the index instead.
+        
+        Args:
+            path: Snapshot directory
+            documents: Document store the snapshot must describe
+            mmap: Memory-map the index data instead of reading it
+        
+        Returns:
+            bool: True if the snapshot was loaded
+        """
+        path = Path(path)
+        meta_file = path / "index_meta.json"
+        
+        try:
+            if not meta_file.exists():
+                return False
+            
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            
+            backend = "faiss" if self.index is not None else "numpy"
+            if (meta["dimension"] != self.dimension
+                    or meta["metric"] != self.metric
+                    or meta["index_type"] != self.index_type
+                    or meta.get("storage", "float32") != self.storage
+                    or meta["backend"] != backend):
+                logger.warning(
+                    f"Index snapshot at {path} does not match "
+                    f"the database configuration"
+                )
+                return False
+            
+            labels = meta["labels"]
+            checksum = self._id_checksum(documents)
+            if checksum != meta["checksum"] or self._id_checksum(labels) != checksum:
+                logger.warning(
+                    f"Index snapshot at {path} does not match the document store"
+                )
+                return False
+            
+            if backend == "faiss":
+                index_file = path / "index.faiss"
+                flags = faiss.IO_FLAG_MMAP if mmap else 0
+                index = faiss.read_index(str(index_file), flags)
+            if backend == "numpy" or self.storage != "float32":
+                matrix = np.load(path / "matrix.npy", mmap_mode='r' if mmap else None)
+            
+            with self._lock:
+                self.documents = dict(documents)
+                self.id_to_index = {
+                    doc_id: int(label) for doc_id, label in labels.items()
+                }
+                self.index_to_id = {
+                    label: doc_id for doc_id, label in self.id_to_index.items()
+                }
+                self.next_index = meta["next_index"]
+                self._tombstones = set(meta["tombstones"])
+                self.active_index_type = meta["active_index_type"]
+                self.active_storage = meta.get("active_storage", "float32")
+                
+                if backend == "faiss":
+                    self.index = index
+                    self._mapped_index_file = index_file if mmap else None
+                if self._owns_vectors:
+                    if self.storage != "float32":
+                        # Serve full-precision vectors from the mapped matrix only
+                        for document in self.documents.values():
+                            document.embedding = None
+                    rows = len(matrix)
+                    self._matrix = matrix
+                    self._sq_norms = np.einsum(
+                        'ij,ij->i', matrix, matrix
+                    ).astype('float32')
+                    self._row_ids = np.empty(rows, dtype=object)
+                    self._row_ids[:] = meta["row_ids"]
+                    self._live_rows = np.zeros(rows, dtype=bool)
+                    self._live_rows[meta["live_rows"]] = True
+                    self._row_count = rows
+                    self._id_to_row = {
+                        self._row_ids[row]: row for row in meta["live_rows"]
+                    }
+                    self._row_labels = np.full(rows, -1, dtype='int64')
+                    for doc_id, row in self._id_to_row.items():
+                        self._row_labels[row] = self.id_to_index[doc_id]
+                
+                self.filters.clear()
+                if self.id_to_index:
+                    labels_in_order = list(self.id_to_index.items())
+                    self.filters.add(
+                        [label for _, label in labels_in_order],
+                        [self.documents[doc_id] for doc_id, _ in labels_in_order]
+                    )
+            
+            logger.info(
+                f"Loaded vector index with {len(self.documents)} documents from {path}"
+            )
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to load index snapshot from {path}: {e}")
+            return False
+    
+    def _ensure_writable(self):
+        """Read a memory-mapped index into memory before mutating it"""
+        # Flat and HNSW storage is copied on write; on-disk IVF lists are read-only
+        if self._mapped_index_file is not None and self.active_index_type == "ivf":
+            self.index = faiss.read_index(str(self._mapped_index_file))
+            self._mapped_index_file = None
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         return {
@@ -275,77 +1124,495 @@ class VectorDatabase:
             "dimension": self.dimension,
             "index_type": self.index_type,
             "metric": self.metric,
-            "faiss_available": FAISS_AVAILABLE
+            "faiss_available": FAISS_AVAILABLE,
+            "backend": "faiss" if self.index is not None else "numpy",
+            "indexed_vectors": (
+                self.index.ntotal if self.index is not None else self._row_count
+            ),
+            "tombstones": len(self._tombstones) if self.index is not None
+                          else self._row_count - len(self.documents),
+            "dead_ratio": self.dead_ratio(),
+            "compactions": self.compactions,
+            "active_index_type": (
+                self.active_index_type if self.index is not None else "numpy"
+            ),
+            "storage": self.storage,
+            "active_storage": (
+                self.active_storage if self.index is not None else "float32"
+            ),
+            "full_precision_rows": self._row_count if self._owns_vectors else 0,
+            "full_precision_mapped": isinstance(self._matrix, np.memmap),
+            "nlist": self._active_nlist(),
+            "filters": self.filters.get_stats()
         }
+    
+    def _active_nlist(self) -> Optional[int]:
+        """IVF list count of the active index, if any"""
+        if self.index is None or self.active_index_type != "ivf":
+            return None
+        return faiss.extract_index_ivf(self.index).nlist
+
+
+def evaluate_quantization(embeddings: np.ndarray,
+                          queries: Optional[np.ndarray] = None,
+                          k: int = 10,
+                          storage_modes: Iterable[str] = VectorDatabase.STORAGE_MODES,
+                          rerank_factors: Iterable[int] = (1, 4),
+                          **db_config) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k against index memory for each storage mode
+    
+    One database per storage mode is built over ``embeddings`` (quantized
+    storage is trained on the whole set) and its top-k results are compared
+    with exact brute-force results.
+    
+    Args:
+        embeddings: Corpus vectors, one row per document
+        queries: Query vectors (a sample of the corpus when None)
+        k: Result depth
+        storage_modes: Storage modes to measure
+        rerank_factors: Re-ranking depths to measure for quantized modes
+        **db_config: Extra VectorDatabase options (index_type, metric, ...)
+    
+    Returns:
+        One report row per (storage, rerank_factor) with recall_at_k,
+        index_bytes (serialized, including codebooks and ID map),
+        bytes_per_vector, code_bytes_per_vector, compression and query_ms
+    """
+    if not FAISS_AVAILABLE:
+        logger.warning("Quantization evaluation requires FAISS")
+        return []
+    
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    count, dimension = embeddings.shape
+    if queries is None:
+        rng = np.random.default_rng(0)
+        queries = embeddings[rng.choice(count, min(100, count), replace=False)]
+    queries = np.asarray(queries, dtype='float32').reshape(-1, dimension)
+    k = min(k, count)
+    
+    # Exact top-k
+    metric = db_config.get("metric", "cosine")
+    if metric == "cosine":
+        normalize = VectorDatabase._normalize
+        scores = normalize(queries) @ normalize(embeddings).T
+    elif metric == "inner_product":
+        scores = queries @ embeddings.T
+    else:
+        sq_norms = np.einsum('ij,ij->i', embeddings, embeddings)
+        scores = -(sq_norms[None, :] - 2.0 * queries @ embeddings.T)
+    top_k = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    truth = [set(row.tolist()) for row in top_k]
+    
+    timestamp = datetime.now(timezone.utc)
+    
+    report: List[Dict[str, Any]] = []
+    baseline_bytes = None
+    for storage in storage_modes:
+        config = {**db_config, "dimension": dimension, "storage": storage,
+                  "training_threshold": count, "auto_compact": False}
+        database = VectorDatabase(**config)
+        # Quantized databases release document embeddings, so build fresh ones
+        database.add_documents([
+            Document(
+                id=str(i),
+                content="",
+                doc_type=DocumentType.DOCUMENTATION,
+                metadata={},
+                timestamp=timestamp,
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ])
+        index_bytes = int(faiss.serialize_index(database.index).nbytes)
+        try:
+            code_bytes = int(faiss.downcast_index(database.index.index).sa_code_size())
+        except RuntimeError:
+            code_bytes = None  # Graph indexes have no standalone codec
+        if storage == "float32":
+            baseline_bytes = index_bytes
+        
+        for rerank_factor in (rerank_factors if storage != "float32" else (1,)):
+            database.rerank_factor = max(1, rerank_factor)
+            
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = database.search(query, k=k, threshold=-np.inf)
+                hits += len(expected & {int(doc_id) for doc_id, _ in results})
+            elapsed = time.perf_counter() - start
+            
+            report.append({
+                "storage": storage,
+                "active_storage": database.active_storage,
+                "rerank_factor": database.rerank_factor,
+                "recall_at_k": hits / (k * len(queries)),
+                "index_bytes": index_bytes,
+                "bytes_per_vector": index_bytes / count,
+                "code_bytes_per_vector": code_bytes,
+                "compression": baseline_bytes / index_bytes if baseline_bytes else None,
+                "full_precision_bytes": (
+                    count * dimension * 4 if storage != "float32" else 0
+                ),
+                "query_ms": 1000.0 * elapsed / len(queries)
+            })
+    
+    return report
+
+
+# Embedding model of a process-pool worker, loaded once by the initializer
+_worker_model = None
+
+
+def _load_worker_model(model_name: str):
+    """Process pool initializer: load the embedding model in the worker"""
+    global _worker_model
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _worker_dimension() -> int:
+    """Embedding dimension of the worker's model"""
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _worker_encode(texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode texts with the worker's model"""
+    embeddings = _worker_model.encode(
+        texts, batch_size=batch_size, convert_to_numpy=True
+    )
+    return np.asarray(embeddings, dtype='float32')
 
 
 class EmbeddingEngine:
     """
     Embedding generation engine with multiple model support
+    
+    Model inference can run off the event loop: ``aencode`` and
+    ``aencode_batch`` hand the work to a thread pool, and with the
+    ``process`` executor the model is loaded only in worker processes
+    (each loads it once) and awaiting callers submit to them directly.
+    
+    Models that are unavailable raise unless the deterministic
+    feature-hashing fallback is allowed (for tests and offline use); it can
+    also be selected directly with ``EmbeddingModel.HASHING``.
     """
     
-    def __init__(self, model_name: str = EmbeddingModel.SENTENCE_BERT.value):
-        """Initialize embedding engine with specified model"""
+    EXECUTORS = ("thread", "process")
+    
+    def __init__(self,
+                 model_name: str = EmbeddingModel.SENTENCE_BERT.value,
+                 cache_size: int = 10000,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 executor: str = "thread",
+                 max_workers: int = 1,
+                 allow_hashing_fallback: Optional[bool] = None):
+        """
+        Initialize embedding engine with specified model
+        
+        Args:
+            model_name: Embedding model to use
+            cache_size: Entries in the in-memory embedding cache (0 disables it)
+            cache_dir: Directory of the persistent embedding cache tier
+            executor: Where model inference runs for awaitable encodes:
+                "thread" (shared model) or "process" (one model per worker)
+            max_workers: Worker threads or processes
+            allow_hashing_fallback: Embed with feature hashing when the model
+                cannot be loaded; False raises RuntimeError instead (read from
+                ``RAG_ALLOW_HASHING_FALLBACK`` when None, on by default)
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown embedding executor: {executor}")
+        
         self.model_name = model_name
         self.model = None
         self.dimension = 384  # Default for sentence-bert
+        self.default_threshold = 0.7  # Mirrors Settings.rag_similarity_threshold
+        self.executor = executor
+        self.max_workers = max(1, max_workers)
+        if allow_hashing_fallback is None:
+            flag = os.getenv(HASHING_FALLBACK_ENV, "").lower()
+            allow_hashing_fallback = flag not in ("0", "false", "no")
+        self.allow_hashing_fallback = allow_hashing_fallback
+        self.hashing_fallback = False  # the model failed to load and hashing stands in
+        
+        # Worker pools are created on first use
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._model_in_workers = False
         
         self._initialize_model()
+        
+        self.cache: Optional[EmbeddingCache] = None
+        if cache_size > 0 or cache_dir is not None:
+            self.cache = EmbeddingCache(
+                model_name=self.model_name,
+                dimension=self.dimension,
+                max_memory_entries=cache_size,
+                cache_dir=cache_dir
+            )
     
     def _initialize_model(self):
         """Initialize the embedding model"""
         try:
             if self.model_name == EmbeddingModel.SENTENCE_BERT.value:
-                if SENTENCE_TRANSFORMERS_AVAILABLE:
+                if SENTENCE_TRANSFORMERS_AVAILABLE and self.executor == "process":
+                    self._start_worker_model()
+                elif SENTENCE_TRANSFORMERS_AVAILABLE:
                     self.model = SentenceTransformer(self.model_name)
                     self.dimension = self.model.get_sentence_embedding_dimension()
                     logger.info(f"Initialized SentenceTransformer: {self.model_name}")
                 else:
                     logger.error("SentenceTransformers not available")
-                    
+            
             elif self.model_name == EmbeddingModel.OPENAI_ADA.value:
                 # OpenAI API integration would go here
                 self.dimension = 1536  # ADA embedding size
                 logger.info("OpenAI Ada embeddings configured (API integration needed)")
-                
+            
             elif self.model_name == EmbeddingModel.GEMINI_EMBEDDING.value:
                 # Gemini embedding integration would go here  
                 self.dimension = 768  # Typical Gemini embedding size
                 logger.info("Gemini embeddings configured (API integration needed)")
-                
+            
+            elif self.model_name == EmbeddingModel.HASHING.value:
+                self.model = HashingEmbedder(self.dimension)
+                logger.info(
+                    f"Initialized feature-hashing embedder "
+                    f"({self.dimension} dimensions)"
+                )
+        
         except Exception as e:
             logger.error(f"Failed to initialize embedding model {self.model_name}: {e}")
-    
-    def encode(self, texts: Union[str, List[str]]) -> Union[np.ndarray, List[np.ndarray]]:
+        
+        if self.model is None and not self._model_in_workers:
+            if not self.allow_hashing_fallback:
+                raise RuntimeError(
+                    f"No embedding model available for {self.model_name} "
+                    f"and the feature-hashing fallback is disabled"
+                )
+            logger.warning(
+                f"No embedding model available for {self.model_name}, falling back to "
+                f"feature-hashing embeddings (similarity threshold "
+                f"{HashingEmbedder.default_threshold})"
+            )
+            self.model = HashingEmbedder(self.dimension)
+            self.hashing_fallback = True
+        
+        if isinstance(self.model, HashingEmbedder):
+            self.default_threshold = HashingEmbedder.default_threshold
+    
+    def _start_worker_model(self):
+        """Load the model in the process pool only, asking a worker for its dimension"""
+        try:
+            self.dimension = self._get_process_pool().submit(_worker_dimension).result()
+            self._model_in_workers = True
+            logger.info(
+                f"Initialized SentenceTransformer {self.model_name} in worker processes"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load {self.model_name} in worker processes: {e}")
+            self.close()
+    
+    def encode(self, texts: Union[str, List[str]]) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Generate embeddings for text(s)
         
         Args:
             texts: Single text or list of texts
-            
+        
+        Returns:
+            Embeddings as numpy array(s)
+        """
+        if isinstance(texts, str):
+            return self.encode_batch([texts])[0]
+        else:
+            return list(self.encode_batch(list(texts)))
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts as one matrix
+        
+        Cached embeddings are served from the embedding cache; only the
+        distinct cache misses are sent to the model. Feature-hashing
+        embeddings are cheaper to compute than to look up and bypass the
+        cache.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Model inference batch size
+        
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        
+        if self.cache is None or isinstance(self.model, HashingEmbedder):
+            return self._encode_uncached(texts, batch_size)
+        
+        embeddings, misses = self._split_cached(texts)
+        if misses:
+            computed = self._encode_uncached(list(misses), batch_size)
+            self._fill_misses(embeddings, misses, computed)
+        return embeddings
+    
+    def _split_cached(self,
+                      texts: List[str]) -> Tuple[np.ndarray, Dict[str, List[int]]]:
+        """Embeddings found in the cache, plus the rows of every distinct miss"""
+        embeddings = np.zeros((len(texts), self.dimension), dtype='float32')
+        cached_rows = [None] * len(texts)
+        if self.cache is not None:
+            cached_rows = self.cache.get_many(texts)
+        misses: Dict[str, List[int]] = {}
+        for i, (text, cached) in enumerate(zip(texts, cached_rows)):
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                misses.setdefault(text, []).append(i)
+        return embeddings, misses
+    
+    def _fill_misses(self,
+                     embeddings: np.ndarray,
+                     misses: Dict[str, List[int]],
+                     computed: np.ndarray):
+        """Place computed miss embeddings into their rows and cache them"""
+        miss_texts = list(misses)
+        if self.cache is not None and np.any(computed):
+            self.cache.put_many(miss_texts, computed)
+        for text, vector in zip(miss_texts, computed):
+            embeddings[misses[text]] = vector
+    
+    async def aencode(
+        self,
+        texts: Union[str, List[str]]
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Awaitable ``encode`` that keeps the event loop free during inference
+        
+        Args:
+            texts: Single text or list of texts
+        
         Returns:
             Embeddings as numpy array(s)
         """
+        if isinstance(texts, str):
+            return (await self.aencode_batch([texts]))[0]
+        else:
+            return list(await self.aencode_batch(list(texts)))
+    
+    async def aencode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Awaitable ``encode_batch`` run on the engine's worker pool
+        
+        With the process executor, cache misses are sent straight to the
+        worker processes; only the cache lookups run on the event loop.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Model inference batch size
+        
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        
+        loop = asyncio.get_running_loop()
+        if not self._model_in_workers:
+            return await loop.run_in_executor(
+                self._get_thread_pool(), self.encode_batch, texts, batch_size
+            )
+        
+        embeddings, misses = self._split_cached(texts)
+        if misses:
+            miss_texts = list(misses)
+            pool = self._get_process_pool()
+            try:
+                parts = await asyncio.gather(*(
+                    loop.run_in_executor(
+                        pool, _worker_encode, miss_texts[i:i + batch_size], batch_size
+                    )
+                    for i in range(0, len(miss_texts), batch_size)
+                ))
+                computed = np.vstack(parts).reshape(len(miss_texts), self.dimension)
+            except Exception as e:
+                logger.error(f"Embedding generation failed: {e}")
+                computed = np.zeros((len(miss_texts), self.dimension), dtype='float32')
+            self._fill_misses(embeddings, misses, computed)
+        return embeddings
+    
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        """Thread pool that runs encodes for awaiting callers"""
+        with self._pool_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="embedding"
+                )
+            return self._thread_pool
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Process pool whose workers each hold a loaded model"""
+        with self._pool_lock:
+            if self._process_pool is None:
+                # Spawned workers avoid inheriting model/thread state via fork
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_worker_model,
+                    initargs=(self.model_name,)
+                )
+            return self._process_pool
+    
+    def close(self):
+        """Shut down the worker pools"""
+        with self._pool_lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True)
+            self._thread_pool = None
+            self._process_pool = None
+    
+    def _encode_uncached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Run the embedding model on texts"""
         try:
-            if self.model is None:
-                # Fallback to random embeddings for testing
-                logger.warning("No embedding model available, using random embeddings")
-                if isinstance(texts, str):
-                    return np.random.rand(self.dimension).astype('float32')
-                else:
-                    return [np.random.rand(self.dimension).astype('float32') for _ in texts]
+            if self._model_in_workers:
+                # Spread model batches across the worker processes
+                shards = [
+                    texts[i:i + batch_size] for i in range(0, len(texts), batch_size)
+                ]
+                embeddings = np.vstack(list(self._get_process_pool().map(
+                    _worker_encode, shards, [batch_size] * len(shards)
+                )))
+                return embeddings.reshape(len(texts), self.dimension)
             
-            if isinstance(texts, str):
-                return self.model.encode(texts)
-            else:
-                return self.model.encode(texts)
-                
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True
+            )
+            embeddings = np.asarray(embeddings, dtype='float32')
+            return embeddings.reshape(len(texts), self.dimension)
+        
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
-            if isinstance(texts, str):
-                return np.zeros(self.dimension).astype('float32')
-            else:
-                return [np.zeros(self.dimension).astype('float32') for _ in texts]
+            return np.zeros((len(texts), self.dimension), dtype='float32')
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get embedding cache statistics"""
+        return self.cache.get_stats() if self.cache is not None else {}
+    
+    def get_executor_stats(self) -> Dict[str, Any]:
+        """Get worker pool configuration"""
+        return {
+            "executor": self.executor,
+            "max_workers": self.max_workers,
+            "model_in_workers": self._model_in_workers,
+            "started": (
+                self._process_pool if self.executor == "process" else self._thread_pool
+            ) is not None
+        }
     
     def get_dimension(self) -> int:
         """Get embedding dimension"""
@@ -362,30 +1629,217 @@ class RAGSystem:
     
     def __init__(self, 
                  embedding_model: str = EmbeddingModel.SENTENCE_BERT.value,
-                 vector_db_config: Optional[Dict[str, Any]] = None):
+                 vector_db_config: Optional[Dict[str, Any]] = None,
+                 knowledge_base_path: Optional[Union[str, Path]] = None,
+                 near_duplicate_threshold: Optional[float] = 0.98,
+                 chunk_size: int = 1000,
+                 chunk_overlap: int = 200,
+                 token_counter: Optional[TokenCounter] = None,
+                 embedding_executor: str = "thread",
+                 embedding_workers: int = 1,
+                 query_cache_size: int = 1024,
+                 query_cache_ttl: Optional[float] = 300.0,
+                 allow_hashing_fallback: Optional[bool] = None):
         """
         Initialize RAG system
         
         Args:
             embedding_model: Embedding model to use
             vector_db_config: Vector database configuration
+            knowledge_base_path: Directory for the persisted knowledge base
+            near_duplicate_threshold: Cosine similarity at or above which a
+                new document is treated as a duplicate of an indexed one
+                (None disables the check)
+            chunk_size: Maximum chunk length in characters (mirrors
+                ``Settings.rag_chunk_size``)
+            chunk_overlap: Characters repeated between adjacent chunks
+                (mirrors ``Settings.rag_chunk_overlap``)
+            token_counter: Local tokenizer used to budget context windows
+                (tiktoken if installed, otherwise a regex approximation)
+            embedding_executor: "thread" or "process" worker pool for
+                embedding inference (mirrors ``Settings.rag_embedding_executor``)
+            embedding_workers: Embedding worker count (mirrors
+                ``Settings.rag_embedding_workers``)
+            query_cache_size: Search results and contexts cached per query
+                (0 disables the cache; mirrors ``Settings.rag_query_cache_size``)
+            query_cache_ttl: Seconds a cached result stays valid (None for
+                no expiry; mirrors ``Settings.rag_query_cache_ttl``)
+            allow_hashing_fallback: Use feature-hashing embeddings when the
+                embedding model cannot be loaded instead of raising (mirrors
+                ``Settings.rag_allow_hashing_fallback``)
         """
-        self.embedding_engine = EmbeddingEngine(embedding_model)
+        self.knowledge_base_path = Path(knowledge_base_path or "data/knowledge_base")
+        self.knowledge_base_path.mkdir(parents=True, exist_ok=True)
+        
+        self.embedding_engine = EmbeddingEngine(
+            embedding_model,
+            cache_dir=self.knowledge_base_path / "embedding_cache",
+            executor=embedding_executor,
+            max_workers=embedding_workers,
+            allow_hashing_fallback=allow_hashing_fallback
+        )
+        
+        # Concurrent query embeddings are coalesced into batches
+        self.query_batcher = EmbeddingBatcher(self.embedding_engine)
         
         # Initialize vector database with appropriate dimension
         db_config = vector_db_config or {}
         db_config["dimension"] = self.embedding_engine.get_dimension()
         
         self.vector_db = VectorDatabase(**db_config)
-        self.knowledge_base_path = Path("data/knowledge_base")
-        self.knowledge_base_path.mkdir(parents=True, exist_ok=True)
+        self.store = SegmentStore(
+            self.knowledge_base_path, self.embedding_engine.get_dimension()
+        )
+        self.lexical_index = BM25Index()
+        self.rrf_k = 60
+        self.index_snapshot_path = self.knowledge_base_path / "index"
         
         # Context management
         self.max_context_tokens = 4000  # Conservative limit for most models
-        self.context_overlap = 200      # Token overlap between chunks
+        self.context_overlap = chunk_overlap  # Overlap between chunks
+        self.chunker = DocumentChunker(chunk_size, chunk_overlap)
+        self.token_counter = CachedTokenCounter(token_counter or create_token_counter())
+        self.context_packer = ContextPacker()
+        self.mmr_fetch_factor = 3  # Candidates per context slot for diversification
+        
+        # Ingestion bookkeeping
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self._source_index: Dict[str, str] = {}  # upsert key -> current document ID
+        # upsert key -> near-duplicate document it resolved to
+        self._source_aliases: Dict[str, str] = {}
+        # released upsert key -> document it owned that other keys still share
+        self._detached_sources: Dict[str, str] = {}
+        self.source_aliases_path = self.knowledge_base_path / SOURCE_ALIASES_FILE
+        self.last_ingest_stats: Dict[str, Any] = {}
+        self._index_dirty = False  # index changed since the last checkpoint
+        self.knowledge_base_loaded = False  # persisted documents are in the index
+        
+        # Repeated queries are answered from the cache until the knowledge
+        # base version moves on
+        self.kb_version = 0
+        self.query_cache: Optional[QueryResultCache] = None
+        if query_cache_size > 0:
+            self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl)
         
         logger.info("RAG System initialized successfully")
     
+    def _bump_version(self):
+        """Mark the knowledge base as changed, invalidating cached results"""
+        self.kb_version += 1
+    
+    @staticmethod
+    def _query_cache_key(kind: str, query: str, *params: Any) -> Tuple:
+        """Cache key of a query and the parameters that shape its result"""
+        return (kind, normalize_query(query)) + params
+    
+    @staticmethod
+    def _filter_key(values: Optional[Iterable[Any]]) -> Optional[Tuple]:
+        """Order-insensitive, hashable form of a type or tag filter"""
+        if values is None:
+            return None
+        return tuple(sorted(getattr(value, "value", value) for value in values))
+    
+    def _cache_get(self, key: Tuple) -> Optional[Any]:
+        """Copy of a cached result for the current knowledge base version"""
+        if self.query_cache is None:
+            return None
+        return self._copy_cached(self.query_cache.get(key, self.kb_version))
+    
+    def _cache_put(self, key: Tuple, version: int, value: Any):
+        """Cache a result computed against knowledge base version"""
+        if self.query_cache is not None:
+            self.query_cache.put(key, version, self._copy_cached(value))
+    
+    @staticmethod
+    def _copy_cached(value: Any) -> Any:
+        """Copy a result so callers can re-rank it without touching the cache"""
+        if value is None:
+            return None
+        if isinstance(value, RAGContext):
+            documents = [replace(result) for result in value.retrieved_documents]
+            return replace(value, retrieved_documents=documents)
+        return [replace(result) for result in value]
+    
+    @staticmethod
+    def _content_hash(content: str) -> str:
+        """SHA-256 hash of document content"""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def _generate_document_id(self,
+                              content: str,
+                              source: Optional[str] = None,
+                              parent_id: Optional[str] = None) -> str:
+        """
+        Derive a stable document ID from source and content
+        
+        Re-ingesting the same content from the same source always yields the
+        same ID, so repeated indexing runs do not create duplicates. Chunks
+        are additionally scoped to their parent document version.
+        """
+        content_hash = self._content_hash(content)
+        scope = "\0".join(part for part in (source, parent_id) if part)
+        if not scope:
+            return content_hash[:32]
+        scoped = f"{scope}\0{content_hash}".encode('utf-8')
+        return hashlib.sha256(scoped).hexdigest()[:32]
+    
+    def _upsert_key(self, spec: Dict[str, Any]) -> Optional[str]:
+        """Key under which a newer version of a document replaces an older one"""
+        metadata = spec.get("metadata") or {}
+        if "chunk_index" in metadata:
+            parent = spec.get('source') or metadata['parent_id']
+            return f"{parent}#{metadata['chunk_index']}"
+        return spec.get("source") or None
+    
+    def _document_key(self, document: Document) -> Optional[str]:
+        """Upsert key of a stored document"""
+        return self._upsert_key(
+            {"source": document.source, "metadata": document.metadata}
+        )
+    
+    def _index_sources(self, documents: Iterable[Document]):
+        """Rebuild the upsert key index from loaded documents"""
+        self._source_index = {}
+        latest: Dict[str, datetime] = {}
+        loaded_ids = set()
+        for document in documents:
+            loaded_ids.add(document.id)
+            key = self._document_key(document)
+            if key is None:
+                continue
+            if key not in latest or document.timestamp >= latest[key]:
+                self._source_index[key] = document.id
+                latest[key] = document.timestamp
+        
+        # Keys merged into a near-duplicate map to that document; released
+        # keys no longer own the document other keys still share
+        self._source_aliases = {}
+        self._detached_sources = {}
+        if self.source_aliases_path.exists():
+            with open(self.source_aliases_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self._detached_sources = {
+                key: doc_id for key, doc_id in saved.get("detached", {}).items()
+                if self._source_index.get(key) == doc_id
+            }
+            for key in self._detached_sources:
+                del self._source_index[key]
+            self._source_aliases = {
+                key: doc_id for key, doc_id in saved.get("aliases", {}).items()
+                if key not in self._source_index and doc_id in loaded_ids
+            }
+            self._source_index.update(self._source_aliases)
+    
+    def _save_source_aliases(self):
+        """Persist the keys merged into or released from shared documents"""
+        tmp_path = self.source_aliases_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "aliases": self._source_aliases,
+                "detached": self._detached_sources
+            }, f)
+        os.replace(tmp_path, self.source_aliases_path)
+    
     async def add_document(self, 
                           content: str,
                           doc_type: DocumentType,
@@ -395,60 +1849,398 @@ class RAGSystem:
         """
         Add document to knowledge base
         
+        Documents are upserted: unchanged content is not re-embedded, new
+        content from a known source replaces the previous version and
+        near-duplicates of indexed documents resolve to the existing ID.
+        
         Args:
             content: Document content
             doc_type: Type of document
             metadata: Additional metadata
             source: Document source
             tags: Document tags
-            
+        
         Returns:
             Document ID
         """
-        try:
-            # Generate document ID
-            doc_id = hashlib.md5(
-                f"{content[:100]}{datetime.now().isoformat()}".encode()
-            ).hexdigest()
-            
-            # Generate embedding
-            embedding = self.embedding_engine.encode(content)
-            
-            # Create document
-            document = Document(
-                id=doc_id,
-                content=content,
-                doc_type=doc_type,
-                metadata=metadata or {},
-                timestamp=datetime.now(timezone.utc),
-                embedding=embedding,
-                embedding_model=self.embedding_engine.model_name,
-                source=source,
-                tags=tags or []
+        doc_ids = await self._add_document_batch([{
+            "content": content,
+            "doc_type": doc_type,
+            "metadata": metadata,
+            "source": source,
+            "tags": tags
+        }])
+        
+        if not doc_ids:
+            logger.error("Failed to add document to knowledge base")
+            return ""
+        
+        logger.info(f"Added document {doc_ids[0]} to knowledge base")
+        return doc_ids[0]
+    
+    async def add_documents(self,
+                           documents: Iterable[Dict[str, Any]],
+                           batch_size: int = 64,
+                           checkpoint: bool = True) -> List[str]:
+        """
+        Bulk-add documents to the knowledge base
+        
+        Each batch is embedded with one ``aencode_batch`` call off the event
+        loop, inserted into the vector database with one index insertion and
+        persisted with one write. Documents are upserted as in ``add_document``.
+        
+        Args:
+            documents: Iterable of dicts with ``content`` and ``doc_type`` keys
+                and optional ``metadata``, ``source`` and ``tags``
+            batch_size: Number of documents per batch
+            checkpoint: Save the vector index once all batches are in, so
+                the next ``load_knowledge_base`` skips rebuilding it
+        
+        Returns:
+            Document IDs of the ingested documents, in input order
+        """
+        doc_ids = await self._add_documents(documents, batch_size)
+        if checkpoint:
+            self.checkpoint()
+        return doc_ids
+    
+    async def _add_documents(self,
+                             documents: Iterable[Dict[str, Any]],
+                             batch_size: int) -> List[str]:
+        """Run ``add_documents`` batches without checkpointing"""
+        doc_ids: List[str] = []
+        counts = {"added": 0, "unchanged": 0, "replaced": 0, "near_duplicates": 0}
+        total = 0
+        start_time = time.perf_counter()
+        
+        batch: List[Dict[str, Any]] = []
+        for spec in documents:
+            batch.append(spec)
+            if len(batch) >= batch_size:
+                doc_ids.extend(await self._add_document_batch(batch, counts))
+                total += len(batch)
+                batch = []
+        
+        if batch:
+            doc_ids.extend(await self._add_document_batch(batch, counts))
+            total += len(batch)
+        
+        elapsed = time.perf_counter() - start_time
+        docs_per_second = total / elapsed if elapsed > 0 else 0.0
+        self.last_ingest_stats = {
+            "documents_submitted": total,
+            "documents_added": counts["added"],
+            "documents_unchanged": counts["unchanged"],
+            "documents_replaced": counts["replaced"],
+            "near_duplicates": counts["near_duplicates"],
+            "batch_size": batch_size,
+            "elapsed_seconds": elapsed,
+            "documents_per_second": docs_per_second
+        }
+        
+        logger.info(
+            f"Bulk ingestion added {counts['added']}/{total} documents "
+            f"({counts['unchanged']} unchanged, {counts['replaced']} replaced, "
+            f"{counts['near_duplicates']} near-duplicates) "
+            f"in {elapsed:.2f}s ({docs_per_second:.1f} docs/s)"
+        )
+        return doc_ids
+    
+    async def ingest_documents(self,
+                               documents: Iterable[Dict[str, Any]],
+                               strategy: Optional[ChunkingStrategy] = None,
+                               batch_size: int = 64,
+                               checkpoint: bool = True) -> List[str]:
+        """
+        Chunk documents and bulk-add the chunks
+        
+        Chunks are generated lazily and streamed into ``add_documents``.
+        Each chunk's metadata carries ``parent_id``, ``chunk_index``,
+        ``chunk_start``, ``chunk_end`` and ``section``. Chunks left over from
+        a previous version of the same source are removed.
+        
+        Args:
+            documents: Document specs as accepted by ``add_documents``
+            strategy: Chunking strategy (chosen per document from its source
+                and type when None)
+            batch_size: Number of chunks per ingestion batch
+            checkpoint: Save the vector index once the chunks are in
+        
+        Returns:
+            Chunk document IDs, in document and chunk order
+        """
+        chunk_counts: Dict[str, int] = {}
+        doc_ids = await self._add_documents(
+            self._chunk_specs(documents, strategy, chunk_counts),
+            batch_size=batch_size
+        )
+        
+        stale_keys: List[str] = []
+        for source, count in chunk_counts.items():
+            stale_keys.extend(self._stale_chunk_keys(source, count))
+        removed = self._release_keys(stale_keys)
+        
+        self.last_ingest_stats["documents_chunked"] = len(chunk_counts)
+        self.last_ingest_stats["stale_chunks_removed"] = len(removed)
+        self.last_ingest_stats["chunks_per_source"] = chunk_counts
+        if checkpoint:
+            self.checkpoint()
+        return doc_ids
+    
+    def _chunk_specs(self,
+                     documents: Iterable[Dict[str, Any]],
+                     strategy: Optional[ChunkingStrategy],
+                     chunk_counts: Dict[str, int]) -> Iterable[Dict[str, Any]]:
+        """Yield one document spec per chunk, recording chunk counts per source"""
+        for spec in documents:
+            content = spec["content"]
+            source = spec.get("source")
+            parent_id = self._generate_document_id(content, source)
+            doc_strategy = strategy or select_strategy(
+                source, spec["doc_type"] == DocumentType.CODE
             )
             
-            # Add to vector database
-            success = self.vector_db.add_document(document)
+            count = 0
+            for chunk in self.chunker.chunk(content, doc_strategy):
+                yield {
+                    "content": chunk.content,
+                    "doc_type": spec["doc_type"],
+                    "metadata": {
+                        **(spec.get("metadata") or {}),
+                        "parent_id": parent_id,
+                        "chunk_index": chunk.index,
+                        "chunk_start": chunk.start,
+                        "chunk_end": chunk.end,
+                        "section": chunk.section
+                    },
+                    "source": source,
+                    "tags": spec.get("tags")
+                }
+                count += 1
             
-            if success:
-                # Persist document
-                await self._persist_document(document)
-                logger.info(f"Added document {doc_id} to knowledge base")
-                return doc_id
-            else:
-                logger.error(f"Failed to add document {doc_id} to vector database")
-                return ""
+            if source:
+                chunk_counts[source] = count
+    
+    def _stale_chunk_keys(self, source: str, chunk_count: int) -> List[str]:
+        """Upsert keys of a source's whole document and chunks from chunk_count on"""
+        stale_keys = []
+        if source in self._source_index:
+            stale_keys.append(source)
+        
+        index = chunk_count
+        while f"{source}#{index}" in self._source_index:
+            stale_keys.append(f"{source}#{index}")
+            index += 1
+        return stale_keys
+    
+    def _release_keys(self, keys: List[str]) -> List[str]:
+        """
+        Drop upsert keys and remove the documents no other key refers to
+        
+        Args:
+            keys: Upsert keys to forget
+        
+        Returns:
+            IDs of the removed documents
+        """
+        released = {
+            key: self._source_index.pop(key)
+            for key in keys if key in self._source_index
+        }
+        removed = self._remove_unreferenced(list(released.values()))
+        
+        # Documents still shared by other keys stay, detached from the released keys
+        removed_set = set(removed)
+        for key, doc_id in released.items():
+            was_alias = self._source_aliases.pop(key, None) is not None
+            if not was_alias and doc_id not in removed_set:
+                self._detached_sources[key] = doc_id
+        if released:
+            self._index_dirty = True
+        return removed
+    
+    def _remove_unreferenced(self, doc_ids: List[str]) -> List[str]:
+        """Remove the documents among doc_ids that no upsert key maps to"""
+        referenced = set(self._source_index.values())
+        return self._remove_documents(
+            [doc_id for doc_id in doc_ids if doc_id not in referenced]
+        )
+    
+    def _find_near_duplicates(self,
+                              doc_ids: List[str],
+                              embeddings: np.ndarray,
+                              checked: List[bool]) -> List[Optional[str]]:
+        """
+        Resolve new documents to nearly identical indexed or batch documents
+        
+        The index is searched once for the whole batch; rows are also
+        compared with the earlier rows of the batch that are kept.
+        
+        Args:
+            doc_ids: Document ID of every row
+            embeddings: Embedding matrix, one row per document
+            checked: Whether a row may be merged into a near-duplicate
+        
+        Returns:
+            For every row, the ID of the document it duplicates or None
+        """
+        duplicates: List[Optional[str]] = [None] * len(doc_ids)
+        if self.near_duplicate_threshold is None or self.vector_db.metric != "cosine":
+            return duplicates
+        
+        rows = [row for row, check in enumerate(checked) if check]
+        if rows:
+            matches = self.vector_db.search_batch(
+                embeddings[rows], k=1, threshold=self.near_duplicate_threshold
+            )
+            for row, row_matches in zip(rows, matches):
+                if row_matches:
+                    duplicates[row] = row_matches[0][0]
+        
+        # Within the batch, compare against the rows that are kept
+        normalized = self.vector_db._normalize(np.asarray(embeddings, dtype='float32'))
+        similarities = normalized @ normalized.T
+        kept: List[int] = []
+        for row in range(len(doc_ids)):
+            if checked[row] and duplicates[row] is None and kept:
+                best = kept[int(np.argmax(similarities[row, kept]))]
+                if similarities[row, best] >= self.near_duplicate_threshold:
+                    duplicates[row] = doc_ids[best]
+            if duplicates[row] is None:
+                kept.append(row)
+        return duplicates
+    
+    async def _add_document_batch(self,
+                                  specs: List[Dict[str, Any]],
+                                  counts: Optional[Dict[str, int]] = None) -> List[str]:
+        """
+        Upsert one batch of document specs
+        
+        Args:
+            specs: Document specs as accepted by ``add_documents``
+            counts: Optional counters updated with added/unchanged/replaced/
+                near_duplicates totals
+        
+        Returns:
+            Document ID for every spec, or an empty list on failure
+        """
+        if counts is None:
+            counts = {"added": 0, "unchanged": 0, "replaced": 0, "near_duplicates": 0}
+        
+        try:
+            # Resolve IDs; within a batch the last version of a key wins
+            spec_keys: List[str] = []
+            pending: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+            resolved: Dict[str, str] = {}
+            
+            for spec in specs:
+                key = self._upsert_key(spec)
+                parent_id = (spec.get("metadata") or {}).get("parent_id")
+                doc_id = self._generate_document_id(spec["content"], key, parent_id)
+                key = key or doc_id
+                spec_keys.append(key)
+                
+                if doc_id in self.vector_db.documents:
+                    # Unchanged content: nothing to embed or write
+                    pending.pop(key, None)
+                    resolved[key] = doc_id
+                    if key in self._detached_sources:
+                        del self._detached_sources[key]
+                        self._source_index[key] = doc_id
+                        self._index_dirty = True
+                    counts["unchanged"] += 1
+                else:
+                    pending[key] = (doc_id, spec)
+            
+            batch: List[Document] = []
+            replaced_ids: List[str] = []
+            merged: Dict[str, str] = {}  # upsert key -> near-duplicate document ID
+            
+            if pending:
+                contents = [spec["content"] for _, spec in pending.values()]
+                embeddings = await self.embedding_engine.aencode_batch(
+                    contents, batch_size=len(contents)
+                )
+                timestamp = datetime.now(timezone.utc)
+                previous_ids = [self._source_index.get(key) for key in pending]
+                duplicate_ids = self._find_near_duplicates(
+                    [doc_id for doc_id, _ in pending.values()],
+                    embeddings,
+                    [previous_id is None for previous_id in previous_ids]
+                )
+                
+                for (key, (doc_id, spec)), embedding, previous_id, duplicate_id in zip(
+                        pending.items(), embeddings, previous_ids, duplicate_ids):
+                    if duplicate_id is not None:
+                        resolved[key] = duplicate_id
+                        if self._upsert_key(spec) is not None:
+                            merged[key] = duplicate_id
+                        counts["near_duplicates"] += 1
+                        continue
+                    if previous_id is not None and previous_id != doc_id:
+                        replaced_ids.append(previous_id)
+                    
+                    batch.append(Document(
+                        id=doc_id,
+                        content=spec["content"],
+                        doc_type=spec["doc_type"],
+                        metadata=spec.get("metadata") or {},
+                        timestamp=timestamp,
+                        embedding=embedding,
+                        embedding_model=self.embedding_engine.model_name,
+                        source=spec.get("source"),
+                        tags=spec.get("tags") or []
+                    ))
+                    resolved[key] = doc_id
+            
+            if batch:
+                self._bump_version()
+                # Quantized vector storage releases document embeddings on insert
+                batch_embeddings = np.vstack([
+                    np.asarray(document.embedding, dtype='float32').reshape(1, -1)
+                    for document in batch
+                ])
+                if self.vector_db.add_documents(batch) != len(batch):
+                    logger.error(
+                        f"Failed to add batch of {len(batch)} documents "
+                        f"to vector database"
+                    )
+                    return []
                 
+                self._index_dirty = True
+                await self._persist_documents(batch, batch_embeddings)
+                for document in batch:
+                    self.lexical_index.add(document.id, document.content)
+                    key = self._document_key(document)
+                    if key is not None:
+                        self._source_index[key] = document.id
+                        self._source_aliases.pop(key, None)
+                        self._detached_sources.pop(key, None)
+                counts["added"] += len(batch)
+            
+            if merged:
+                # Merged keys share the document, so removing their source finds it
+                self._source_index.update(merged)
+                self._source_aliases.update(merged)
+                self._index_dirty = True
+            
+            # Drop superseded versions once their replacements are stored,
+            # unless another key still shares them
+            counts["replaced"] += len(self._remove_unreferenced(replaced_ids))
+            
+            return [resolved[key] for key in spec_keys]
+        
         except Exception as e:
-            logger.error(f"Failed to add document: {e}")
-            return ""
+            logger.error(f"Failed to add document batch: {e}")
+            return []
     
     async def search(self, 
                     query: str,
                     k: int = 5,
                     doc_types: Optional[List[DocumentType]] = None,
                     tags: Optional[List[str]] = None,
-                    threshold: float = 0.7) -> List[SearchResult]:
+                    threshold: Optional[float] = None,
+                    retrieval_method: str = "vector") -> List[SearchResult]:
         """
         Search knowledge base for relevant documents
         
@@ -457,64 +2249,243 @@ class RAGSystem:
             k: Number of results to return
             doc_types: Filter by document types
             tags: Filter by tags
-            threshold: Minimum similarity threshold
-            
+            threshold: Minimum similarity threshold (vector matches only;
+                the embedding model's default when None)
+            retrieval_method: "vector", "lexical" (BM25) or "hybrid"
+                (reciprocal rank fusion of both)
+        
         Returns:
             List of search results
         """
+        if threshold is None:
+            threshold = self.embedding_engine.default_threshold
+        
+        cache_key = self._query_cache_key(
+            "search", query, k, self._filter_key(doc_types), self._filter_key(tags),
+            threshold, retrieval_method
+        )
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        version = self.kb_version
+        
         try:
             # Generate query embedding
-            query_embedding = self.embedding_engine.encode(query)
+            query_embedding = await self.query_batcher.encode(query)
             
-            # Vector search
-            raw_results = self.vector_db.search(
-                query_embedding, 
-                k=k*2,  # Get more results for filtering
-                threshold=threshold
+            # Filters are applied inside retrieval, so k results are fetched
+            raw_results = self._retrieve(
+                query,
+                query_embedding,
+                k,
+                threshold,
+                retrieval_method,
+                doc_types,
+                tags
             )
             
-            # Filter and rank results
-            filtered_results = []
-            for doc_id, similarity in raw_results:
-                document = self.vector_db.get_document(doc_id)
-                if document is None:
-                    continue
-                
-                # Apply filters
-                if doc_types and document.doc_type not in doc_types:
-                    continue
-                    
-                if tags and not any(tag in document.tags for tag in tags):
-                    continue
-                
-                # Create search result
-                context_snippet = self._create_context_snippet(document.content, query)
-                highlighted_terms = self._extract_highlighted_terms(query, document.content)
-                
-                result = SearchResult(
-                    document=document,
-                    similarity_score=similarity,
-                    relevance_rank=len(filtered_results) + 1,
-                    context_snippet=context_snippet,
-                    highlighted_terms=highlighted_terms
-                )
-                
-                filtered_results.append(result)
-                
-                if len(filtered_results) >= k:
-                    break
-            
+            filtered_results = self._build_search_results(query, raw_results, k)
+            self._cache_put(cache_key, version, filtered_results)
             logger.info(f"Search for '{query}' returned {len(filtered_results)} results")
             return filtered_results
-            
+        
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
     
+    async def search_many(self,
+                          queries: List[str],
+                          k: int = 5,
+                          doc_types: Optional[List[DocumentType]] = None,
+                          tags: Optional[List[str]] = None,
+                          threshold: Optional[float] = None,
+                          retrieval_method: str = "vector") -> List[List[SearchResult]]:
+        """
+        Search the knowledge base for several queries at once
+        
+        Cached queries are answered from the query cache; the rest are
+        embedded in one batch and vector retrieval runs as one batched index
+        search with the filter bitmap resolved once.
+        
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            doc_types: Filter by document types
+            tags: Filter by tags
+            threshold: Minimum similarity threshold (vector matches only;
+                the embedding model's default when None)
+            retrieval_method: "vector", "lexical" or "hybrid"
+        
+        Returns:
+            One list of search results per query, in query order
+        """
+        if not queries:
+            return []
+        if threshold is None:
+            threshold = self.embedding_engine.default_threshold
+        
+        filter_keys = (
+            self._filter_key(doc_types), self._filter_key(tags),
+            threshold, retrieval_method
+        )
+        cache_keys = [
+            self._query_cache_key("search", query, k, *filter_keys) for query in queries
+        ]
+        results = [self._cache_get(key) for key in cache_keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        version = self.kb_version
+        
+        try:
+            if missing:
+                missing_queries = [queries[i] for i in missing]
+                query_embeddings = await self.embedding_engine.aencode_batch(
+                    missing_queries
+                )
+                
+                if retrieval_method == "vector":
+                    raw_batches = self.vector_db.search_batch(
+                        query_embeddings, k=k, threshold=threshold,
+                        doc_types=doc_types, tags=tags
+                    )
+                else:
+                    raw_batches = [
+                        self._retrieve(
+                            query, embedding, k, threshold, retrieval_method,
+                            doc_types, tags
+                        )
+                        for query, embedding in zip(missing_queries, query_embeddings)
+                    ]
+                
+                for i, raw_results in zip(missing, raw_batches):
+                    results[i] = self._build_search_results(queries[i], raw_results, k)
+                    self._cache_put(cache_keys[i], version, results[i])
+            
+            logger.info(
+                f"Batched search for {len(queries)} queries returned "
+                f"{sum(map(len, results))} results"
+            )
+            return results
+        
+        except Exception as e:
+            logger.error(f"Batched search failed: {e}")
+            return [[] for _ in queries]
+    
+    def _build_search_results(self,
+                              query: str,
+                              raw_results: List[Tuple[str, float]],
+                              k: int) -> List[SearchResult]:
+        """Turn ranked (document_id, similarity) pairs into search results"""
+        filtered_results = []
+        for doc_id, similarity in raw_results:
+            document = self.vector_db.get_document(doc_id)
+            if document is None:
+                continue
+            
+            # Create search result from one pass over the query-term hits
+            terms, starts, ends = self._match_positions(query, document.content, doc_id)
+            context_snippet, highlight_spans = extract_snippet(
+                document.content, starts, ends
+            )
+            
+            filtered_results.append(SearchResult(
+                document=document,
+                similarity_score=similarity,
+                relevance_rank=len(filtered_results) + 1,
+                context_snippet=context_snippet,
+                highlighted_terms=terms[:10],
+                highlight_spans=highlight_spans
+            ))
+            
+            if len(filtered_results) >= k:
+                break
+        
+        return filtered_results
+    
+    def _retrieve(self,
+                  query: str,
+                  query_embedding: np.ndarray,
+                  k: int,
+                  threshold: float,
+                  retrieval_method: str,
+                  doc_types: Optional[List[DocumentType]] = None,
+                  tags: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank candidate documents for a query
+        
+        Returns:
+            List of (document_id, similarity_score) tuples in ranked order
+        """
+        if retrieval_method == "vector":
+            return self.vector_db.search(
+                query_embedding, k=k, threshold=threshold,
+                doc_types=doc_types, tags=tags
+            )
+        
+        accept = self._document_filter(doc_types, tags)
+        
+        if retrieval_method == "lexical":
+            lexical_results = self.lexical_index.search(query, k=k, accept=accept)
+            return [
+                (doc_id, self._vector_similarity(query_embedding, doc_id))
+                for doc_id, _ in lexical_results
+            ]
+        
+        if retrieval_method == "hybrid":
+            # Fuse deeper candidate lists than the final cut
+            vector_results = self.vector_db.search(
+                query_embedding, k=2 * k, threshold=threshold,
+                doc_types=doc_types, tags=tags
+            )
+            lexical_results = self.lexical_index.search(query, k=2 * k, accept=accept)
+            similarities = dict(vector_results)
+            fused = reciprocal_rank_fusion(
+                [
+                    [doc_id for doc_id, _ in vector_results],
+                    [doc_id for doc_id, _ in lexical_results]
+                ],
+                k=self.rrf_k
+            )
+            return [
+                (doc_id, similarities[doc_id] if doc_id in similarities
+                 else self._vector_similarity(query_embedding, doc_id))
+                for doc_id, _ in fused[:k]
+            ]
+        
+        raise ValueError(f"Unknown retrieval method: {retrieval_method}")
+    
+    def _document_filter(self,
+                         doc_types: Optional[List[DocumentType]],
+                         tags: Optional[List[str]]) -> Optional[Callable[[str], bool]]:
+        """Predicate accepting document IDs that match the filters, if any"""
+        if not (doc_types or tags):
+            return None
+        selection = self.vector_db.filters.select(doc_types, tags)
+        
+        def matches(doc_id: str) -> bool:
+            label = self.vector_db.id_to_index.get(doc_id)
+            if label is None:
+                return False
+            return bool(self.vector_db.filters.contains(selection, [label])[0])
+        
+        return matches
+    
+    def _vector_similarity(self, query_embedding: np.ndarray, doc_id: str) -> float:
+        """Cosine similarity between a query and an indexed document"""
+        if self.vector_db.get_document(doc_id) is None:
+            return 0.0
+        query = np.asarray(query_embedding, dtype='float32').reshape(-1)
+        embedding = self.vector_db.get_embeddings([doc_id])[0]
+        denominator = float(np.linalg.norm(query))
+        return float(np.dot(query, embedding)) / denominator if denominator else 0.0
+    
     async def get_context(self, 
                          query: str,
                          max_tokens: Optional[int] = None,
-                         doc_types: Optional[List[DocumentType]] = None) -> RAGContext:
+                         doc_types: Optional[List[DocumentType]] = None,
+                         merge_chunks: bool = True,
+                         retrieval_method: str = "vector",
+                         diversity: Optional[float] = None,
+                         max_per_source: Optional[int] = None) -> RAGContext:
         """
         Get complete RAG context for query
         
@@ -522,106 +2493,361 @@ class RAGSystem:
             query: Query for context retrieval
             max_tokens: Maximum context tokens
             doc_types: Filter by document types
-            
+            merge_chunks: Join retrieved chunks that are adjacent in their
+                parent document into one passage
+            retrieval_method: "vector", "lexical" or "hybrid"
+            diversity: MMR lambda; when set, results are re-ranked trading
+                relevance (1.0) against novelty (0.0)
+            max_per_source: Maximum results taken from one source document
+        
         Returns:
             RAG context package
         """
         try:  
             max_tokens = max_tokens or self.max_context_tokens
+            context_k = 10  # Get more documents for context assembly
+            diversify = diversity is not None or max_per_source is not None
+            
+            cache_key = self._query_cache_key(
+                "context", query, max_tokens, self._filter_key(doc_types), merge_chunks,
+                retrieval_method, diversity, max_per_source
+            )
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return replace(cached, query=query)
+            version = self.kb_version
             
             # Search for relevant documents
             search_results = await self.search(
                 query,
-                k=10,  # Get more documents for context assembly
-                doc_types=doc_types
+                k=context_k * self.mmr_fetch_factor if diversify else context_k,
+                doc_types=doc_types,
+                retrieval_method=retrieval_method
             )
             
-            # Build context window
-            context_parts = []
-            total_tokens = 0
-            used_results = []
+            rag_context = self._assemble_context(
+                query, search_results, context_k, max_tokens, merge_chunks,
+                retrieval_method, diversity, max_per_source
+            )
+            self._cache_put(cache_key, version, rag_context)
+            return rag_context
+        
+        except Exception as e:
+            logger.error(f"Failed to get RAG context: {e}")
+            return self._error_context(query)
+    
+    async def get_contexts(self,
+                           queries: List[str],
+                           max_tokens: Optional[int] = None,
+                           doc_types: Optional[List[DocumentType]] = None,
+                           merge_chunks: bool = True,
+                           retrieval_method: str = "vector",
+                           diversity: Optional[float] = None,
+                           max_per_source: Optional[int] = None) -> List[RAGContext]:
+        """
+        Get RAG contexts for several queries with one batched search
+        
+        Args:
+            queries: Queries for context retrieval
+            max_tokens, doc_types, merge_chunks, retrieval_method, diversity,
+            max_per_source: As in ``get_context``
+        
+        Returns:
+            One RAG context per query, in query order
+        """
+        try:
+            max_tokens = max_tokens or self.max_context_tokens
+            context_k = 10
+            diversify = diversity is not None or max_per_source is not None
             
-            for result in search_results:
-                # Estimate tokens (rough approximation: 1 token ≈ 4 characters)
-                content_tokens = len(result.document.content) // 4
-                
-                if total_tokens + content_tokens <= max_tokens:
-                    context_parts.append(f"[Source: {result.document.source or 'Unknown'}]\n{result.document.content}")
-                    total_tokens += content_tokens
-                    used_results.append(result)
-                else:
-                    # Try to fit partial content
-                    remaining_tokens = max_tokens - total_tokens
-                    if remaining_tokens > 100:  # Only if we have meaningful space
-                        partial_content = result.document.content[:remaining_tokens * 4]
-                        context_parts.append(f"[Source: {result.document.source or 'Unknown'}]\n{partial_content}...")
-                        total_tokens = max_tokens
-                        used_results.append(result)
-                    break
-            
-            context_window = "\n\n".join(context_parts)
-            
-            # Calculate confidence score based on result quality
-            confidence = self._calculate_confidence(used_results, query) if used_results else 0.0
-            
-            rag_context = RAGContext(
-                query=query,
-                retrieved_documents=used_results,
-                context_window=context_window,
-                total_tokens=total_tokens,
-                confidence_score=confidence,
-                retrieval_method="vector_similarity",
-                timestamp=datetime.now(timezone.utc)
+            cache_keys = [
+                self._query_cache_key(
+                    "context", query, max_tokens, self._filter_key(doc_types),
+                    merge_chunks, retrieval_method, diversity, max_per_source
+                )
+                for query in queries
+            ]
+            contexts = [self._cache_get(key) for key in cache_keys]
+            missing = [i for i, cached in enumerate(contexts) if cached is None]
+            version = self.kb_version
+            
+            batches = await self.search_many(
+                [queries[i] for i in missing],
+                k=context_k * self.mmr_fetch_factor if diversify else context_k,
+                doc_types=doc_types,
+                retrieval_method=retrieval_method
             )
             
-            logger.info(f"Generated RAG context: {total_tokens} tokens, confidence: {confidence:.2f}")
-            return rag_context
+            for i, search_results in zip(missing, batches):
+                contexts[i] = self._assemble_context(
+                    queries[i], search_results, context_k, max_tokens, merge_chunks,
+                    retrieval_method, diversity, max_per_source
+                )
+                self._cache_put(cache_keys[i], version, contexts[i])
             
+            return [
+                replace(context, query=query)
+                for query, context in zip(queries, contexts)
+            ]
+        
         except Exception as e:
-            logger.error(f"Failed to get RAG context: {e}")
-            return RAGContext(
-                query=query,
-                retrieved_documents=[],
-                context_window="",
-                total_tokens=0,
-                confidence_score=0.0,
-                retrieval_method="error",
-                timestamp=datetime.now(timezone.utc)
+            logger.error(f"Failed to get RAG contexts: {e}")
+            return [self._error_context(query) for query in queries]
+    
+    def _assemble_context(self,
+                          query: str,
+                          search_results: List[SearchResult],
+                          context_k: int,
+                          max_tokens: int,
+                          merge_chunks: bool,
+                          retrieval_method: str,
+                          diversity: Optional[float],
+                          max_per_source: Optional[int]) -> RAGContext:
+        """Diversify, merge and pack search results into a RAG context"""
+        if diversity is not None or max_per_source is not None:
+            search_results = self._diversify(
+                search_results,
+                context_k,
+                1.0 if diversity is None else diversity,
+                max_per_source
             )
+        
+        if merge_chunks:
+            passages = self._merge_adjacent_chunks(search_results)
+        else:
+            passages = [
+                ([result], result.document.content) for result in search_results
+            ]
+        
+        # Build context window from the most relevant passages that fit
+        context_window, chosen = self._pack_context(passages, max_tokens)
+        total_tokens = self.token_counter.count(context_window) if context_window else 0
+        used_results = sorted(
+            (result for i in chosen for result in passages[i][0]),
+            key=lambda result: result.relevance_rank
+        )
+        
+        # Calculate confidence score based on result quality
+        confidence = 0.0
+        if used_results:
+            confidence = self._calculate_confidence(used_results, query)
+        
+        rag_context = RAGContext(
+            query=query,
+            retrieved_documents=used_results,
+            context_window=context_window,
+            total_tokens=total_tokens,
+            confidence_score=confidence,
+            retrieval_method=(
+                "vector_similarity" if retrieval_method == "vector"
+                else retrieval_method
+            ),
+            timestamp=datetime.now(timezone.utc)
+        )
+        
+        logger.info(
+            f"Generated RAG context: {total_tokens} tokens, "
+            f"confidence: {confidence:.2f}"
+        )
+        return rag_context
     
-    def _create_context_snippet(self, content: str, query: str, max_length: int = 200) -> str:
-        """Create contextual snippet around query terms"""
-        # Simple implementation - can be enhanced with more sophisticated extraction
-        words = content.lower().split()
-        query_words = query.lower().split()
+    @staticmethod
+    def _error_context(query: str) -> RAGContext:
+        """Empty context returned when retrieval fails"""
+        return RAGContext(
+            query=query,
+            retrieved_documents=[],
+            context_window="",
+            total_tokens=0,
+            confidence_score=0.0,
+            retrieval_method="error",
+            timestamp=datetime.now(timezone.utc)
+        )
+    
+    def _diversify(self,
+                   results: List[SearchResult],
+                   k: int,
+                   lambda_mult: float,
+                   max_per_source: Optional[int] = None) -> List[SearchResult]:
+        """
+        Re-rank results with Maximal Marginal Relevance
+        
+        Args:
+            results: Search results in relevance order
+            k: Number of results to keep
+            lambda_mult: Relevance/novelty trade-off
+            max_per_source: Maximum results per source document
+        
+        Returns:
+            Selected results, re-ranked
+        """
+        if not results:
+            return []
+        
+        embeddings = self.vector_db.get_embeddings(
+            [result.document.id for result in results]
+        )
+        selected = maximal_marginal_relevance(
+            embeddings,
+            [result.similarity_score for result in results],
+            k,
+            lambda_mult=lambda_mult,
+            groups=[self._source_key(result.document) for result in results],
+            max_per_group=max_per_source
+        )
+        
+        diversified = [results[i] for i in selected]
+        for rank, result in enumerate(diversified, 1):
+            result.relevance_rank = rank
+        return diversified
+    
+    @staticmethod
+    def _source_key(document: Document) -> str:
+        """Source document a result belongs to (chunks share their parent)"""
+        return document.source or document.metadata.get("parent_id") or document.id
+    
+    def _pack_context(self,
+                      passages: List[Tuple[List[SearchResult], str]],
+                      max_tokens: int) -> Tuple[str, List[int]]:
+        """
+        Choose passages maximizing relevance within the token budget
+        
+        Passages are costed with the local tokenizer exactly as they appear
+        in the window (source header and separator included). A top-ranked
+        passage larger than the whole budget is trimmed at a sentence
+        boundary (or a token boundary when no sentence fits) instead of
+        being dropped.
+        
+        Returns:
+            (context window, indices of the passages used)
+        """
+        separator = "\n\n"
+        separator_tokens = self.token_counter.count(separator)
+        
+        items = []
+        for results, content in passages:
+            block = f"[Source: {results[0].document.source or 'Unknown'}]\n{content}"
+            relevance = max(result.similarity_score for result in results)
+            items.append(PackItem(
+                text=block,
+                value=max(relevance, 0.0) + 1e-3,  # every passage is worth something
+                tokens=self.token_counter.count(block) + separator_tokens
+            ))
+        
+        if items and items[0].tokens > max_tokens:
+            items[0] = self._trim_passage(
+                items[0], passages[0][1], max_tokens - separator_tokens
+            )
+        
+        chosen = self.context_packer.select(items, max_tokens)
+        context_window = separator.join(items[i].text for i in chosen)
+        
+        # Token counts of joined text can differ slightly from the sum of parts
+        while chosen and self.token_counter.count(context_window) > max_tokens:
+            chosen.remove(min(chosen, key=lambda i: items[i].value))
+            context_window = separator.join(items[i].text for i in chosen)
+        
+        return context_window, chosen
+    
+    def _trim_passage(self, item: PackItem, content: str, max_tokens: int) -> PackItem:
+        """Cut a passage's content so the passage, header included, fits max_tokens"""
+        header = item.text[:len(item.text) - len(content)]
+        separator_tokens = item.tokens - self.token_counter.count(item.text)
+        budget = max_tokens - self.token_counter.count(header)
+        
+        # Tokens can merge across the header/content seam; shrink until it fits
+        while budget > 0:
+            trimmed = trim_to_tokens(content, budget, self.token_counter)
+            tokens = self.token_counter.count(header + trimmed)
+            if trimmed and tokens <= max_tokens:
+                return PackItem(header + trimmed, item.value, tokens + separator_tokens)
+            budget -= max(1, tokens - max_tokens)
+        return item
+    
+    def _merge_adjacent_chunks(
+        self,
+        results: List[SearchResult]
+    ) -> List[Tuple[List[SearchResult], str]]:
+        """
+        Group search results into context passages
         
-        # Find best matching section
-        best_start = 0
-        best_score = 0
+        Chunks of the same parent document with consecutive indices are
+        joined, dropping the overlap they share.
         
-        for i in range(len(words) - max_length // 10):
-            section = words[i:i + max_length // 10]
-            score = sum(1 for word in section if any(qw in word for qw in query_words))
-            if score > best_score:
-                best_score = score
-                best_start = i
+        Returns:
+            (results, passage text) pairs ordered by their best-ranked result
+        """
+        groups: Dict[Tuple[str, str], List[SearchResult]] = {}
+        for result in results:
+            metadata = result.document.metadata
+            if "chunk_index" in metadata:
+                key = ("chunk", metadata["parent_id"])
+            else:
+                key = ("document", result.document.id)
+            groups.setdefault(key, []).append(result)
         
-        # Extract snippet
-        snippet_words = words[best_start:best_start + max_length // 10]
-        snippet = " ".join(snippet_words)
+        passages: List[Tuple[List[SearchResult], str]] = []
+        for group in groups.values():
+            group.sort(
+                key=lambda result: result.document.metadata.get("chunk_index", 0)
+            )
+            run = [group[0]]
+            for result in group[1:]:
+                previous_index = run[-1].document.metadata["chunk_index"]
+                if result.document.metadata["chunk_index"] == previous_index + 1:
+                    run.append(result)
+                else:
+                    passages.append((run, self._join_chunks(run)))
+                    run = [result]
+            passages.append((run, self._join_chunks(run)))
         
-        if len(snippet) > max_length:
-            snippet = snippet[:max_length] + "..."
+        passages.sort(
+            key=lambda passage: min(result.relevance_rank for result in passage[0])
+        )
+        return passages
+    
+    def _join_chunks(self, run: List[SearchResult]) -> str:
+        """Concatenate consecutive chunks using their spans in the parent"""
+        parts = [run[0].document.content]
+        end = run[0].document.metadata.get("chunk_end")
+        for result in run[1:]:
+            metadata = result.document.metadata
+            overlap = max(0, end - metadata["chunk_start"])
+            parts.append(result.document.content[overlap:])
+            end = metadata["chunk_end"]
+        return "".join(parts)
+    
+    def _match_positions(
+        self,
+        query: str,
+        content: str,
+        doc_id: Optional[str] = None
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Matched query terms plus start/end offsets of every occurrence in content"""
+        # Reuse the token positions stored in the lexical index
+        if doc_id is not None and doc_id in self.lexical_index:
+            return self.lexical_index.match_positions(doc_id, query)
         
+        query_terms = {term for term, _, _ in tokenize(query)}
+        matches = [match for match in tokenize(content) if match[0] in query_terms]
+        return (
+            list(dict.fromkeys(term for term, _, _ in matches)),
+            np.array([start for _, start, _ in matches], dtype=np.int64),
+            np.array([end for _, _, end in matches], dtype=np.int64)
+        )
+    
+    def _create_context_snippet(self, content: str, query: str, max_length: int = 200) -> str:
+        """Create contextual snippet around query terms"""
+        _, starts, ends = self._match_positions(query, content)
+        snippet, _ = extract_snippet(content, starts, ends, max_length)
         return snippet
     
-    def _extract_highlighted_terms(self, query: str, content: str) -> List[str]:
+    def _extract_highlighted_terms(self,
+                                   query: str,
+                                   content: str,
+                                   doc_id: Optional[str] = None) -> List[str]:
         """Extract terms from content that match query"""
-        query_words = set(query.lower().split())
-        content_words = set(content.lower().split())
-        
-        # Find intersection of query and content words
-        highlighted = list(query_words.intersection(content_words))
+        highlighted, _, _ = self._match_positions(query, content, doc_id)
         return highlighted[:10]  # Limit to prevent clutter
     
     def _calculate_confidence(self, results: List[SearchResult], query: str) -> float:
@@ -632,88 +2858,297 @@ class RAGSystem:
         # Base confidence on similarity scores and result diversity
         avg_similarity = sum(r.similarity_score for r in results) / len(results)
         
-        # Bonus for multiple high-quality results
-        high_quality_count = sum(1 for r in results if r.similarity_score > 0.8)
-        diversity_bonus = min(high_quality_count * 0.1, 0.3)
+        # Bonus for high-quality results from distinct sources; chunks of
+        # one document only count once
+        high_quality_sources = {
+            self._source_key(r.document) for r in results if r.similarity_score > 0.8
+        }
+        diversity_bonus = min(len(high_quality_sources) * 0.1, 0.3)
         
         confidence = min(avg_similarity + diversity_bonus, 1.0)
         return confidence
     
+    async def remove_document(self, doc_id: str) -> bool:
+        """
+        Remove document from the knowledge base
+        
+        Args:
+            doc_id: Document ID
+        
+        Returns:
+            bool: True if the document existed
+        """
+        try:
+            if not self._remove_documents([doc_id]):
+                return False
+            
+            logger.info(f"Removed document {doc_id} from knowledge base")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to remove document {doc_id}: {e}")
+            return False
+    
+    async def remove_source(self, source: str, checkpoint: bool = True) -> int:
+        """
+        Remove every document and chunk ingested from a source
+        
+        Args:
+            source: Source the documents were ingested with
+            checkpoint: Save the vector index after the removal
+        
+        Returns:
+            Number of documents removed
+        """
+        removed = self._release_keys(self._stale_chunk_keys(source, 0))
+        if removed:
+            logger.info(
+                f"Removed {len(removed)} documents of source {source} "
+                f"from knowledge base"
+            )
+            if checkpoint:
+                self.checkpoint()
+        return len(removed)
+    
+    def _remove_documents(self, doc_ids: List[str]) -> List[str]:
+        """Remove documents from the index and the store, returning removed IDs"""
+        removed = [
+            doc_id for doc_id in doc_ids if self.vector_db.remove_document(doc_id)
+        ]
+        if not removed:
+            return removed
+        
+        self._bump_version()
+        self._index_dirty = True
+        for doc_id in removed:
+            self.lexical_index.remove(doc_id)
+        
+        self.store.delete(removed)
+        removed_set = set(removed)
+        self._source_index = {
+            key: doc_id for key, doc_id in self._source_index.items()
+            if doc_id not in removed_set
+        }
+        self._source_aliases = {
+            key: doc_id for key, doc_id in self._source_aliases.items()
+            if doc_id not in removed_set
+        }
+        self._detached_sources = {
+            key: doc_id for key, doc_id in self._detached_sources.items()
+            if doc_id not in removed_set
+        }
+        for doc_id in removed:
+            legacy_file = self.knowledge_base_path / f"{doc_id}.json"
+            if legacy_file.exists():
+                legacy_file.unlink()
+        return removed
+    
+    def _serialize_document(self, document: Document) -> Dict[str, Any]:
+        """Convert document metadata to serializable format (without embedding)"""
+        return {
+            "id": document.id,
+            "content": document.content,
+            "doc_type": document.doc_type.value,
+            "metadata": document.metadata,
+            "timestamp": document.timestamp.isoformat(),
+            "embedding_model": document.embedding_model,
+            "source": document.source,
+            "tags": document.tags
+        }
+    
+    def _deserialize_document(self,
+                              doc_data: Dict[str, Any],
+                              embedding: Optional[np.ndarray] = None) -> Document:
+        """Reconstruct document from its serialized format"""
+        if embedding is None and doc_data.get("embedding"):
+            embedding = np.array(doc_data["embedding"], dtype='float32')
+        
+        return Document(
+            id=doc_data["id"],
+            content=doc_data["content"],
+            doc_type=DocumentType(doc_data["doc_type"]),
+            metadata=doc_data["metadata"],
+            timestamp=datetime.fromisoformat(doc_data["timestamp"]),
+            embedding=embedding,
+            embedding_model=doc_data.get("embedding_model"),
+            source=doc_data.get("source"),
+            tags=doc_data.get("tags", [])
+        )
+    
     async def _persist_document(self, document: Document):
         """Persist document to disk"""
+        await self._persist_documents([document])
+    
+    async def _persist_documents(self,
+                                 documents: List[Document],
+                                 embeddings: Optional[np.ndarray] = None):
+        """
+        Append a batch of documents to the segment store with a single write
+        
+        Args:
+            documents: Documents to persist
+            embeddings: Their embeddings, one row per document (taken from
+                the documents when None)
+        """
+        if embeddings is None:
+            documents = [
+                document for document in documents if document.embedding is not None
+            ]
+            if not documents:
+                return
+            embeddings = np.vstack([
+                np.asarray(document.embedding, dtype='float32').reshape(1, -1)
+                for document in documents
+            ])
+        
         try:
-            doc_file = self.knowledge_base_path / f"{document.id}.json"
-            
-            # Convert document to serializable format
-            doc_data = asdict(document)
-            doc_data["timestamp"] = document.timestamp.isoformat()
-            doc_data["doc_type"] = document.doc_type.value
-            doc_data["embedding"] = document.embedding.tolist() if document.embedding is not None else None
-            
-            with open(doc_file, 'w', encoding='utf-8') as f:
-                json.dump(doc_data, f, indent=2, ensure_ascii=False)
-                
+            self.store.append(
+                [self._serialize_document(document) for document in documents],
+                embeddings
+            )
         except Exception as e:
-            logger.error(f"Failed to persist document {document.id}: {e}")
+            logger.error(f"Failed to persist batch of {len(documents)} documents: {e}")
     
     async def load_knowledge_base(self) -> int:
-        """Load persisted knowledge base from disk"""
-        loaded_count = 0
+        """
+        Load persisted knowledge base from disk
         
+        Segment vectors are memory-mapped. The vector and lexical indexes
+        are restored from their snapshots when these describe exactly the
+        stored documents, and otherwise rebuilt in a single batch and
+        checkpointed. Documents in the legacy one-JSON-file-per-document
+        layout are loaded as well.
+        """
         try:
             if not self.knowledge_base_path.exists():
+                self.knowledge_base_loaded = True
                 return 0
             
-            for doc_file in self.knowledge_base_path.glob("*.json"):
-                try:
-                    with open(doc_file, 'r', encoding='utf-8') as f:
-                        doc_data = json.load(f)
-                    
-                    # Reconstruct document
-                    document = Document(
-                        id=doc_data["id"],
-                        content=doc_data["content"],
-                        doc_type=DocumentType(doc_data["doc_type"]),
-                        metadata=doc_data["metadata"],
-                        timestamp=datetime.fromisoformat(doc_data["timestamp"]),
-                        embedding=np.array(doc_data["embedding"]) if doc_data["embedding"] else None,
-                        embedding_model=doc_data.get("embedding_model"),
-                        source=doc_data.get("source"),
-                        tags=doc_data.get("tags", [])
-                    )
-                    
-                    # Add to vector database
-                    if self.vector_db.add_document(document):
-                        loaded_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Failed to load document from {doc_file}: {e}")
+            documents = [
+                self._deserialize_document(record, embedding)
+                for record, embedding in self.store.load()
+            ]
+            known_ids = {document.id for document in documents}
+            documents.extend(
+                document for document in self._load_legacy_documents()
+                if document.id not in known_ids
+            )
+            
+            # Reuse the saved index when it describes exactly these documents
+            document_map = {document.id: document for document in documents}
+            self._bump_version()
+            self._index_sources(documents)
+            if not self.lexical_index.load(self.index_snapshot_path, document_map):
+                for document in documents:
+                    self.lexical_index.add(document.id, document.content)
+                self._index_dirty = True
+            if self.vector_db.load(self.index_snapshot_path, document_map):
+                loaded_count = len(document_map)
+            else:
+                loaded_count = self.vector_db.add_documents(documents)
+                self._index_dirty = True
+            self.checkpoint()
+            self.knowledge_base_loaded = True
             
             logger.info(f"Loaded {loaded_count} documents from knowledge base")
             return loaded_count
-            
+        
         except Exception as e:
             logger.error(f"Failed to load knowledge base: {e}")
             return 0
     
+    def checkpoint(self):
+        """
+        Save the vector and lexical indexes so the next load can skip
+        rebuilding them
+        
+        Bulk adds, ingests, source removals and ``close`` checkpoint
+        automatically; single-document adds and removals are saved by the
+        next of those. Does nothing when the index is unchanged since the
+        last save. The segment store is compacted once too many of its rows
+        are superseded or deleted.
+        """
+        if not self._index_dirty:
+            return
+        try:
+            self.vector_db.save(self.index_snapshot_path)
+            self.lexical_index.save(self.index_snapshot_path)
+            self._save_source_aliases()
+            self._index_dirty = False
+        except Exception as e:
+            logger.error(f"Failed to checkpoint vector index: {e}")
+        
+        try:
+            self.store.maybe_compact(len(self.vector_db.documents))
+        except Exception as e:
+            logger.error(f"Failed to compact segment store: {e}")
+    
+    def _load_legacy_documents(self) -> List[Document]:
+        """Load documents stored as individual JSON files"""
+        documents = []
+        
+        for doc_file in self.knowledge_base_path.glob("*.json"):
+            if doc_file.name in (MANIFEST_FILE, SOURCE_ALIASES_FILE):
+                continue
+            try:
+                with open(doc_file, 'r', encoding='utf-8') as f:
+                    documents.append(self._deserialize_document(json.load(f)))
+            except Exception as e:
+                logger.error(f"Failed to load document from {doc_file}: {e}")
+        
+        return documents
+    
+    def close(self):
+        """Checkpoint the index and shut down the embedding worker pools"""
+        self.checkpoint()
+        self.embedding_engine.close()
+        logger.info("RAG System closed")
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get RAG system statistics"""
         return {
             "vector_db_stats": self.vector_db.get_stats(),
             "embedding_model": self.embedding_engine.model_name,
             "embedding_dimension": self.embedding_engine.get_dimension(),
+            "hashing_fallback": self.embedding_engine.hashing_fallback,
+            "default_threshold": self.embedding_engine.default_threshold,
+            "embedding_cache": self.embedding_engine.get_cache_stats(),
+            "embedding_executor": self.embedding_engine.get_executor_stats(),
+            "query_batching": self.query_batcher.get_stats(),
             "max_context_tokens": self.max_context_tokens,
-            "knowledge_base_path": str(self.knowledge_base_path)
+            "knowledge_base_path": str(self.knowledge_base_path),
+            "storage": self.store.get_stats(),
+            "lexical_index": self.lexical_index.get_stats(),
+            "token_counter": self.token_counter.get_stats(),
+            "query_cache": {
+                **(
+                    self.query_cache.get_stats()
+                    if self.query_cache is not None else {}
+                ),
+                "kb_version": self.kb_version
+            },
+            "last_ingest": self.last_ingest_stats
         }
 
 
 # Factory function for easy initialization
 def create_rag_system(
     embedding_model: str = EmbeddingModel.SENTENCE_BERT.value,
-    vector_db_config: Optional[Dict[str, Any]] = None
+    vector_db_config: Optional[Dict[str, Any]] = None,
+    knowledge_base_path: Optional[Union[str, Path]] = None,
+    **kwargs: Any
 ) -> RAGSystem:
-    """Create and initialize a RAG system"""
-    return RAGSystem(embedding_model, vector_db_config)
+    """
+    Create and initialize a RAG system
+    
+    Args:
+        embedding_model: Embedding model to use
+        vector_db_config: Vector database configuration
+        knowledge_base_path: Directory for the persisted knowledge base
+        **kwargs: Further ``RAGSystem`` options (chunking, embedding
+            executor, query cache, ...)
+    """
+    return RAGSystem(embedding_model, vector_db_config, knowledge_base_path, **kwargs)
 
 
 # Example usage and testing
@@ -0,0 +1,226 @@
+"""
+Embedding Cache Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Content-addressed cache for text embeddings:
+- Keys are (model_name, sha256(text))
+- Bounded in-memory LRU tier
+- Optional persistent disk tier (memory-mapped float32 vectors plus a
+  fixed-width key index)
+- Hit/miss/eviction counters
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KEY_RECORD_BYTES = 65  # 64 hex digits + newline
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by model name and text hash
+    """
+    
+    def __init__(self,
+                 model_name: str,
+                 dimension: int,
+                 max_memory_entries: int = 10000,
+                 cache_dir: Optional[Union[str, Path]] = None):
+        """
+        Initialize embedding cache
+        
+        Args:
+            model_name: Embedding model the cached vectors belong to
+            dimension: Embedding dimension
+            max_memory_entries: Capacity of the in-memory LRU tier
+            cache_dir: Root directory of the disk tier (disabled when None)
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_memory_entries = max_memory_entries
+        
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        # Disk tier state
+        self._disk_path: Optional[Path] = None
+        self._disk_rows: Dict[str, int] = {}
+        self._disk_vectors: Optional[np.ndarray] = None
+        if cache_dir is not None:
+            self._open_disk_tier(Path(cache_dir))
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash of a text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _open_disk_tier(self, cache_dir: Path):
+        """Open (or create) the disk tier for this model"""
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.model_name)
+        self._disk_path = cache_dir / f"{safe_name}-{self.dimension}"
+        self._disk_path.mkdir(parents=True, exist_ok=True)
+        
+        keys_file = self._disk_path / "keys.txt"
+        vectors_file = self._disk_path / "vectors.f32"
+        keys_file.touch()
+        vectors_file.touch()
+        
+        # A row is valid only once both its vector and its key are complete
+        key_rows = keys_file.stat().st_size // KEY_RECORD_BYTES
+        vector_rows = vectors_file.stat().st_size // (self.dimension * 4)
+        rows = min(key_rows, vector_rows)
+        
+        with open(keys_file, 'r+b') as f:
+            f.truncate(rows * KEY_RECORD_BYTES)
+            keys = f.read().decode('ascii').split()
+        with open(vectors_file, 'r+b') as f:
+            f.truncate(rows * self.dimension * 4)
+        
+        self._disk_rows = {key: row for row, key in enumerate(keys)}
+        self._map_disk_vectors()
+    
+    def _map_disk_vectors(self):
+        """(Re)map the disk vector file"""
+        rows = len(self._disk_rows)
+        if rows == 0:
+            self._disk_vectors = None
+            return
+        self._disk_vectors = np.memmap(
+            self._disk_path / "vectors.f32",
+            dtype='float32',
+            mode='r',
+            shape=(rows, self.dimension)
+        )
+    
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the memory tier, evicting the least recently used"""
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for texts
+        
+        Args:
+            texts: Texts to look up
+        
+        Returns:
+            Cached embedding or None for each text
+        """
+        results: List[Optional[np.ndarray]] = []
+        
+        with self._lock:
+            for text in texts:
+                key = self.hash_text(text)
+                vector = self._memory.get(key)
+                
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                elif key in self._disk_rows and self._disk_vectors is not None:
+                    vector = np.array(self._disk_vectors[self._disk_rows[key]])
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                
+                results.append(vector)
+        
+        return results
+    
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """
+        Store embeddings for texts
+        
+        Args:
+            texts: Texts the embeddings were computed for
+            vectors: Matrix with one embedding row per text
+        """
+        vectors = np.asarray(vectors, dtype='float32')
+        vectors = vectors.reshape(len(texts), self.dimension)
+        
+        with self._lock:
+            new_keys: List[str] = []
+            new_rows: List[np.ndarray] = []
+            
+            for text, vector in zip(texts, vectors):
+                key = self.hash_text(text)
+                vector = np.array(vector)
+                self._remember(key, vector)
+                
+                if self._disk_path is not None and key not in self._disk_rows:
+                    self._disk_rows[key] = -1  # reserved, assigned below
+                    new_keys.append(key)
+                    new_rows.append(vector)
+            
+            if new_keys:
+                self._append_to_disk(new_keys, np.vstack(new_rows))
+    
+    def _append_to_disk(self, keys: List[str], vectors: np.ndarray):
+        """Append new entries to the disk tier (caller holds the lock)"""
+        start = len(self._disk_rows) - len(keys)
+        vectors_file = self._disk_path / "vectors.f32"
+        keys_file = self._disk_path / "keys.txt"
+        
+        try:
+            with open(vectors_file, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype='float32').tobytes())
+            with open(keys_file, 'ab') as f:
+                f.write("".join(f"{key}\n" for key in keys).encode('ascii'))
+            
+            for row, key in enumerate(keys, start):
+                self._disk_rows[key] = row
+            self._map_disk_vectors()
+            
+        except Exception as e:
+            logger.error(f"Failed to write embedding cache to disk: {e}")
+            for key in keys:
+                self._disk_rows.pop(key, None)
+            # Roll both files back so later rows stay aligned
+            with open(vectors_file, 'r+b') as f:
+                f.truncate(start * self.dimension * 4)
+            with open(keys_file, 'r+b') as f:
+                f.truncate(start * KEY_RECORD_BYTES)
+    
+    def clear_memory(self):
+        """Drop the in-memory tier"""
+        with self._lock:
+            self._memory.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "model_name": self.model_name,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_memory_entries": self.max_memory_entries,
+            "disk_entries": len(self._disk_rows),
+            "disk_path": str(self._disk_path) if self._disk_path else None
+        }
@@ -0,0 +1,148 @@
+"""
+Metadata Filter Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Packed bitmaps over vector labels for pre-filtered search:
+- One bitmap per document type and per tag, plus a live-label bitmap
+- Maintained on insert and delete
+- Bit order matches ``faiss.IDSelectorBitmap`` so a combined filter can be
+  pushed straight into a FAISS search
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class MetadataFilterIndex:
+    """
+    Per-document-type and per-tag label bitmaps
+    
+    Bit ``label`` of a bitmap lives in byte ``label >> 3`` at position
+    ``label & 7`` (little-endian bit order). Removing a label only clears
+    its live bit; stale type/tag bits are masked out by the live bitmap.
+    """
+    
+    def __init__(self):
+        """Initialize empty filter index"""
+        self._bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+        self._live = np.zeros(0, dtype=np.uint8)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _grow(bitmap: np.ndarray, num_bytes: int) -> np.ndarray:
+        """Return bitmap with room for num_bytes, growing geometrically"""
+        if num_bytes <= len(bitmap):
+            return bitmap
+        grown = np.zeros(max(num_bytes, 2 * len(bitmap), 128), dtype=np.uint8)
+        grown[:len(bitmap)] = bitmap
+        return grown
+    
+    @staticmethod
+    def _set_bits(bitmap: np.ndarray, labels: np.ndarray):
+        """Set the bits of labels (labels must fit in the bitmap)"""
+        np.bitwise_or.at(bitmap, labels >> 3, (1 << (labels & 7)).astype(np.uint8))
+    
+    def _keys(self, doc_type: Any, tags: Iterable[str]) -> List[Tuple[str, str]]:
+        """Bitmap keys a document belongs to"""
+        type_value = getattr(doc_type, "value", doc_type)
+        tag_keys = [("tag", str(tag)) for tag in set(tags or [])]
+        return [("type", str(type_value))] + tag_keys
+    
+    def add(self, labels: Iterable[int], documents: Iterable[Any]):
+        """
+        Record the type and tags of newly labelled documents
+        
+        Args:
+            labels: Vector labels
+            documents: Documents (with ``doc_type`` and ``tags``) in label order
+        """
+        grouped: Dict[Tuple[str, str], List[int]] = {}
+        all_labels: List[int] = []
+        for label, document in zip(labels, documents):
+            all_labels.append(int(label))
+            for key in self._keys(document.doc_type, document.tags):
+                grouped.setdefault(key, []).append(int(label))
+        
+        if not all_labels:
+            return
+        
+        num_bytes = (max(all_labels) >> 3) + 1
+        with self._lock:
+            self._live = self._grow(self._live, num_bytes)
+            self._set_bits(self._live, np.asarray(all_labels, dtype=np.int64))
+            for key, key_labels in grouped.items():
+                bitmap = self._bitmaps.get(key, np.zeros(0, dtype=np.uint8))
+                bitmap = self._grow(bitmap, num_bytes)
+                self._set_bits(bitmap, np.asarray(key_labels, dtype=np.int64))
+                self._bitmaps[key] = bitmap
+    
+    def remove(self, label: int):
+        """Clear the live bit of a label"""
+        with self._lock:
+            if (label >> 3) < len(self._live):
+                self._live[label >> 3] &= np.uint8(~(1 << (label & 7)) & 0xFF)
+    
+    def clear(self):
+        """Drop all bitmaps"""
+        with self._lock:
+            self._bitmaps = {}
+            self._live = np.zeros(0, dtype=np.uint8)
+    
+    def select(self,
+               doc_types: Optional[Iterable[Any]] = None,
+               tags: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        Combine bitmaps into one selection
+        
+        A label is selected when it is live, has one of ``doc_types`` (if
+        given) and carries at least one of ``tags`` (if given).
+        
+        Returns:
+            Packed uint8 bitmap
+        """
+        with self._lock:
+            selection = self._live.copy()
+            for kind, values in (("type", doc_types), ("tag", tags)):
+                if not values:
+                    continue
+                matched = np.zeros_like(selection)
+                for value in values:
+                    key = (kind, str(getattr(value, "value", value)))
+                    bitmap = self._bitmaps.get(key)
+                    if bitmap is not None:
+                        matched[:len(bitmap)] |= bitmap[:len(matched)]
+                selection &= matched
+            return selection
+    
+    @staticmethod
+    def count(selection: np.ndarray) -> int:
+        """Number of selected labels"""
+        return int(np.unpackbits(selection).sum())
+    
+    @staticmethod
+    def contains(selection: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        """Vectorized membership test of labels in a selection"""
+        labels = np.asarray(labels, dtype=np.int64)
+        inside = (labels >= 0) & ((labels >> 3) < len(selection))
+        result = np.zeros(len(labels), dtype=bool)
+        valid = labels[inside]
+        result[inside] = ((selection[valid >> 3] >> (valid & 7)) & 1).astype(bool)
+        return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get filter index statistics"""
+        with self._lock:
+            kinds = [kind for kind, _ in self._bitmaps]
+            bitmap_bytes = sum(bitmap.nbytes for bitmap in self._bitmaps.values())
+            return {
+                "doc_type_bitmaps": kinds.count("type"),
+                "tag_bitmaps": kinds.count("tag"),
+                "bitmap_bytes": int(bitmap_bytes + self._live.nbytes)
+            }
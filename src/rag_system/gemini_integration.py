@@ -12,10 +12,13 @@ Advanced integration with Google Gemini 2.5 Pro for:
 import asyncio
 import json
 import logging
+import re
+import time
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any, Union
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Any, Union
+from dataclasses import dataclass, replace
 from enum import Enum
+from pathlib import Path
 
 # Gemini API integration (placeholder for actual implementation)
 try:
@@ -26,11 +29,24 @@ except ImportError:
     logging.warning("Google Generative AI not available")
 
 from .core import RAGSystem, RAGContext, DocumentType
+from .lexical import tokenize
+from .semantic_cache import SemanticCache
+from .rate_limit import TokenBucketRateLimiter
+from .response_cache import ResponseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Answer section headers, after any markdown, numbering or bullet prefix:
+# "Answer:", "**Answer:**", "## Conclusion:", "Final Answer:",
+# "4. Conclusion/Answer:" (the text after the colon is part of the answer)
+ANSWER_HEADER = re.compile(
+    r"^[\s#>*_\-\d.)]*(?:final\s+)?(?:answer|response|conclusion)"
+    r"(?:\s*/\s*(?:answer|response|conclusion))?[\s*_]*(?::[\s*_]*|$)",
+    re.IGNORECASE
+)
+
 
 class GeminiModel(Enum):
     """Supported Gemini models"""
@@ -48,6 +64,19 @@ class ResponseMode(Enum):
     CREATIVE = "creative"                # Creative/innovative response
 
 
+# Seconds a cached answer is reused per response mode (0 disables caching)
+DEFAULT_CACHE_TTLS = {
+    ResponseMode.DIRECT: 3600.0,
+    ResponseMode.REASONING: 1800.0,
+    ResponseMode.SYNTHESIS: 1800.0,
+    ResponseMode.ANALYSIS: 1800.0,
+    ResponseMode.CREATIVE: 0.0  # Creative answers are expected to vary
+}
+
+# Query terms that change the answer however close the rest of the query is
+NEGATIONS = frozenset({"not", "no", "never", "without", "nor"})
+
+
 @dataclass
 class GeminiResponse:
     """Gemini API response wrapper"""
@@ -85,7 +114,18 @@ class GeminiRAGIntegration:
     def __init__(self, 
                  rag_system: RAGSystem,
                  gemini_api_key: Optional[str] = None,
-                 model: str = GeminiModel.GEMINI_PRO.value):
+                 model: str = GeminiModel.GEMINI_PRO.value,
+                 semantic_cache_size: int = 0,
+                 semantic_cache_distance: float = 0.03,
+                 cache_ttls: Optional[Dict[ResponseMode, float]] = None,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 batch_concurrency: int = 8,
+                 batch_timeout: Optional[float] = None,
+                 response_cache_path: Optional[Union[str, Path]] = None,
+                 response_cache_size: int = 10000,
+                 response_cache_ttl: Optional[float] = 7 * 24 * 3600.0,
+                 cache_nonzero_temperature: bool = False):
         """
         Initialize Gemini-enhanced RAG system
         
@@ -93,6 +133,31 @@ class GeminiRAGIntegration:
             rag_system: Initialized RAG system
             gemini_api_key: Gemini API key
             model: Gemini model to use
+            semantic_cache_size: Answers kept in the semantic query cache
+                (0, the default, disables it)
+            semantic_cache_distance: Largest cosine distance between a query
+                and an answered one for the cached answer to be reused; the
+                queries must also retrieve the same documents and share
+                their identifiers and negations
+            cache_ttls: Seconds an answer is reused per response mode
+                (defaults to ``DEFAULT_CACHE_TTLS``)
+            requests_per_minute: Gemini request budget (unlimited when None;
+                mirrors ``Settings.gemini_requests_per_minute``)
+            tokens_per_minute: Gemini token budget, counting prompt tokens
+                plus the output token limit (unlimited when None; mirrors
+                ``Settings.gemini_tokens_per_minute``)
+            batch_concurrency: Queries answered concurrently by
+                ``batch_process_queries``
+            batch_timeout: Default per-query timeout in seconds for
+                ``batch_process_queries`` (None waits indefinitely)
+            response_cache_path: SQLite file caching Gemini responses by
+                prompt hash (disabled when None)
+            response_cache_size: Responses kept in the response cache
+            response_cache_ttl: Seconds a cached response is replayed (None
+                keeps it until evicted)
+            cache_nonzero_temperature: Also cache responses sampled with a
+                non-zero temperature (the default temperature is 0.7, so
+                otherwise only calls made at temperature 0 are cached)
         """
         self.rag_system = rag_system
         self.model_name = model
@@ -122,6 +187,36 @@ class GeminiRAGIntegration:
         self.max_context_length = 30000  # Gemini context window
         self.temperature = 0.7
         self.top_p = 0.9
+        self.max_output_tokens = 2048
+        
+        # Client-side limits shared by every Gemini call
+        self.rate_limiter = TokenBucketRateLimiter(
+            requests_per_minute, tokens_per_minute
+        )
+        self.batch_concurrency = max(1, batch_concurrency)
+        self.batch_timeout = batch_timeout
+        self.last_batch_report: Dict[str, Any] = {}
+        
+        # Paraphrases of answered queries grounded on the same documents
+        # reuse the earlier answer
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+        self.semantic_cache: Optional[SemanticCache] = None
+        if semantic_cache_size > 0:
+            self.semantic_cache = SemanticCache(
+                rag_system.embedding_engine.get_dimension(),
+                max_entries=semantic_cache_size,
+                max_distance=semantic_cache_distance
+            )
+        
+        # Identical prompts replay the stored completion across runs
+        self.response_cache: Optional[ResponseCache] = None
+        if response_cache_path is not None:
+            self.response_cache = ResponseCache(
+                response_cache_path,
+                max_entries=response_cache_size,
+                ttl_seconds=response_cache_ttl,
+                allow_nonzero_temperature=cache_nonzero_temperature
+            )
         
         logger.info("Gemini RAG integration initialized")
     
@@ -138,11 +233,15 @@ class GeminiRAGIntegration:
             response_mode: How to generate the response
             doc_types: Filter retrieved documents by type
             max_sources: Maximum number of sources to use
-            
+        
         Returns:
             Enhanced RAG result with Gemini reasoning
         """
         try:
+            start_time = time.perf_counter()
+            ttl = self._cache_ttl(response_mode)
+            version = self.rag_system.kb_version
+            
             # Phase 1: Retrieve relevant context using RAG
             logger.info(f"Retrieving context for query: {query}")
             rag_context = await self.rag_system.get_context(
@@ -151,6 +250,87 @@ class GeminiRAGIntegration:
                 doc_types=doc_types
             )
             
+            if ttl > 0:
+                # Reuse the answer of an earlier paraphrase on the same sources
+                partition = self._cache_partition(
+                    query, rag_context, response_mode, max_sources
+                )
+                query_embedding = await self.rag_system.query_batcher.encode(query)
+                hit = self.semantic_cache.lookup(query_embedding, partition, version)
+                if hit is not None:
+                    cached, similarity = hit
+                    logger.info(
+                        f"Semantic cache hit for query: {query} "
+                        f"(similarity {similarity:.3f})"
+                    )
+                    return replace(cached, query=query, rag_context=rag_context)
+            
+            result = await self._answer_with_context(
+                query, rag_context, response_mode, max_sources
+            )
+            
+            if ttl > 0:
+                self._cache_answer(
+                    query_embedding, partition, version, result, ttl,
+                    time.perf_counter() - start_time
+                )
+            return result
+        
+        except Exception as e:
+            logger.error(f"Enhanced query failed: {e}")
+            # Return fallback result
+            return self._create_fallback_result(query, str(e))
+    
+    def _cache_ttl(self, response_mode: ResponseMode) -> float:
+        """Seconds answers in response_mode are reused (0 when not cached)"""
+        if self.semantic_cache is None:
+            return 0.0
+        return self.cache_ttls.get(response_mode, 0.0)
+    
+    def _cache_answer(self,
+                      query_embedding: Any,
+                      partition: tuple,
+                      version: int,
+                      result: "EnhancedRAGResult",
+                      ttl: float,
+                      cost_seconds: float):
+        """Store an answer in the semantic cache"""
+        # Fallback and error answers are cheap and should not outlive an outage
+        if result.gemini_response.model not in ("fallback", "error"):
+            self.semantic_cache.put(
+                query_embedding, partition, version, result, ttl,
+                cost_seconds=cost_seconds
+            )
+    
+    @staticmethod
+    def _cache_partition(query: str,
+                         rag_context: RAGContext,
+                         response_mode: ResponseMode,
+                         max_sources: int) -> tuple:
+        """
+        What a cached answer must share with the query it serves
+        
+        Besides the generation settings, that is the exact retrieved
+        documents in rank order and the query's identifiers (terms with
+        digits, such as ``CENTAUR-013``) and negations, which embeddings
+        barely separate.
+        """
+        doc_ids = tuple(
+            result.document.id for result in rag_context.retrieved_documents
+        )
+        pinned = frozenset(
+            term for term, _, _ in tokenize(query)
+            if term in NEGATIONS or any(char.isdigit() for char in term)
+        )
+        return (response_mode.value, max_sources, doc_ids, pinned)
+    
+    async def _answer_with_context(self,
+                                   query: str,
+                                   rag_context: RAGContext,
+                                   response_mode: ResponseMode,
+                                   max_sources: int) -> EnhancedRAGResult:
+        """Run the generation phases of an enhanced query on retrieved context"""
+        try:
             # Phase 2: Enhance query with Gemini reasoning
             enhanced_answer, gemini_response = await self._generate_enhanced_response(
                 query=query,
@@ -159,33 +339,211 @@ class GeminiRAGIntegration:
                 max_sources=max_sources
             )
             
-            # Phase 3: Extract reasoning chain and citations
-            reasoning_chain = self._extract_reasoning_chain(gemini_response.content)
-            source_citations = self._extract_source_citations(rag_context, enhanced_answer)
+            return self._build_result(
+                query, rag_context, enhanced_answer, gemini_response
+            )
+        
+        except Exception as e:
+            logger.error(f"Enhanced query failed: {e}")
+            # Return fallback result
+            return self._create_fallback_result(query, str(e))
+    
+    def _build_result(self,
+                      query: str,
+                      rag_context: RAGContext,
+                      enhanced_answer: str,
+                      gemini_response: GeminiResponse) -> EnhancedRAGResult:
+        """Derive reasoning, citations and confidence from a generated response"""
+        # Phase 3: Extract reasoning chain and citations
+        reasoning_chain = self._extract_reasoning_chain(gemini_response.content)
+        source_citations = self._extract_source_citations(rag_context, enhanced_answer)
+        
+        # Phase 4: Calculate confidence score
+        confidence_score = self._calculate_enhanced_confidence(
+            rag_context, gemini_response, reasoning_chain
+        )
+        
+        result = EnhancedRAGResult(
+            query=query,
+            rag_context=rag_context,
+            gemini_response=gemini_response,
+            enhanced_answer=enhanced_answer,
+            confidence_score=confidence_score,
+            reasoning_chain=reasoning_chain,
+            source_citations=source_citations,
+            timestamp=datetime.now(timezone.utc)
+        )
+        
+        logger.info(f"Enhanced query completed - confidence: {confidence_score:.3f}")
+        return result
+    
+    async def enhanced_query_stream(
+        self,
+        query: str,
+        response_mode: ResponseMode = ResponseMode.REASONING,
+        doc_types: Optional[List[DocumentType]] = None,
+        max_sources: int = 5
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process query with enhanced RAG + Gemini reasoning, streaming the answer
+        
+        Yields JSON-serializable event dicts, each with an ``event`` key:
+        - ``retrieval``: sources and retrieval confidence, as soon as the
+          context is retrieved and before generation starts
+        - ``chunk``: ``text`` of the next piece of the response, as Gemini
+          produces it
+        - ``done``: answer, citations, confidence and reasoning chain,
+          computed once the response is complete, plus timings
+        - ``error``: ``message`` of a failure; it ends the stream
+        
+        Args:
+            query: User query
+            response_mode: How to generate the response
+            doc_types: Filter retrieved documents by type
+            max_sources: Maximum number of sources to use
+        
+        Yields:
+            Stream events in the order above
+        """
+        start_time = time.perf_counter()
+        try:
+            ttl = self._cache_ttl(response_mode)
+            version = self.rag_system.kb_version
             
-            # Phase 4: Calculate confidence score
-            confidence_score = self._calculate_enhanced_confidence(
-                rag_context, gemini_response, reasoning_chain
+            # Phase 1: Retrieve relevant context
+            rag_context = await self.rag_system.get_context(
+                query=query,
+                max_tokens=self.max_context_length // 2,  # Reserve space for prompt
+                doc_types=doc_types
             )
             
-            result = EnhancedRAGResult(
+            if ttl > 0:
+                # Replay the answer of an earlier paraphrase on the same sources
+                partition = self._cache_partition(
+                    query, rag_context, response_mode, max_sources
+                )
+                query_embedding = await self.rag_system.query_batcher.encode(query)
+                hit = self.semantic_cache.lookup(query_embedding, partition, version)
+                if hit is not None:
+                    result = replace(hit[0], query=query, rag_context=rag_context)
+                    retrieval_time = time.perf_counter() - start_time
+                    yield self._retrieval_event(
+                        rag_context, max_sources, retrieval_time, cached=True
+                    )
+                    yield {"event": "chunk", "text": result.gemini_response.content}
+                    yield self._done_event(
+                        result, start_time, retrieval_time, retrieval_time, cached=True
+                    )
+                    return
+            
+            # Announce the sources before generation starts
+            retrieval_time = time.perf_counter() - start_time
+            yield self._retrieval_event(rag_context, max_sources, retrieval_time)
+            
+            # Phase 2: Relay the response as it is generated
+            prompt = self._build_enhanced_prompt(
                 query=query,
                 rag_context=rag_context,
-                gemini_response=gemini_response,
-                enhanced_answer=enhanced_answer,
-                confidence_score=confidence_score,
-                reasoning_chain=reasoning_chain,
-                source_citations=source_citations,
-                timestamp=datetime.now(timezone.utc)
+                response_mode=response_mode,
+                max_sources=max_sources
             )
+            parts: List[str] = []
+            first_chunk_time = None
+            usage_metadata: Dict[str, Any] = {}
+            model = self.model_name
             
-            logger.info(f"Enhanced query completed - confidence: {confidence_score:.3f}")
-            return result
+            if self.gemini_client:
+                try:
+                    async for text, usage_metadata in self._stream_gemini_api(prompt):
+                        if first_chunk_time is None:
+                            first_chunk_time = time.perf_counter() - start_time
+                        parts.append(text)
+                        yield {"event": "chunk", "text": text}
+                except Exception as e:
+                    # A response cut off mid-stream cannot be completed by the fallback
+                    if parts:
+                        raise
+                    logger.error(f"Gemini streaming call failed: {e}")
+            
+            if not parts:
+                fallback = self._generate_fallback_response(query, rag_context)
+                first_chunk_time = time.perf_counter() - start_time
+                model = fallback.model
+                parts.append(fallback.content)
+                yield {"event": "chunk", "text": fallback.content}
+            
+            content = "".join(parts)
+            gemini_response = GeminiResponse(
+                content=content,
+                model=model,
+                timestamp=datetime.now(timezone.utc),
+                usage_metadata=usage_metadata,
+                confidence=0.8 if model == self.model_name else 0.3
+            )
             
+            # Phases 3-4: Citations and confidence need the whole response
+            result = self._build_result(
+                query, rag_context, self._extract_answer_from_response(content),
+                gemini_response
+            )
+            if ttl > 0:
+                self._cache_answer(
+                    query_embedding, partition, version, result, ttl,
+                    time.perf_counter() - start_time
+                )
+            yield self._done_event(result, start_time, retrieval_time, first_chunk_time)
+        
         except Exception as e:
-            logger.error(f"Enhanced query failed: {e}")
-            # Return fallback result
-            return self._create_fallback_result(query, str(e))
+            logger.error(f"Enhanced query stream failed: {e}")
+            yield {"event": "error", "message": str(e)}
+    
+    def _retrieval_event(self,
+                         rag_context: RAGContext,
+                         max_sources: int,
+                         retrieval_time: float,
+                         cached: bool = False) -> Dict[str, Any]:
+        """Stream event describing the sources an answer is grounded on"""
+        return {
+            "event": "retrieval",
+            "sources": [
+                {
+                    "source_id": f"source_{i+1}",
+                    "title": (
+                        result.document.source or f"Document {result.document.id[:8]}"
+                    ),
+                    "type": result.document.doc_type.value,
+                    "relevance": round(float(result.similarity_score), 3),
+                    "snippet": result.context_snippet
+                }
+                for i, result in enumerate(
+                    rag_context.retrieved_documents[:max_sources]
+                )
+            ],
+            "retrieval_confidence": rag_context.confidence_score,
+            "retrieval_method": rag_context.retrieval_method,
+            "retrieval_seconds": retrieval_time,
+            "cached": cached
+        }
+    
+    @staticmethod
+    def _done_event(result: EnhancedRAGResult,
+                    start_time: float,
+                    retrieval_time: float,
+                    first_chunk_time: Optional[float],
+                    cached: bool = False) -> Dict[str, Any]:
+        """Stream event carrying the outcome computed from the full response"""
+        return {
+            "event": "done",
+            "answer": result.enhanced_answer,
+            "confidence": result.confidence_score,
+            "reasoning_chain": result.reasoning_chain,
+            "source_citations": result.source_citations,
+            "model": result.gemini_response.model,
+            "retrieval_seconds": retrieval_time,
+            "time_to_first_chunk_seconds": first_chunk_time,
+            "total_seconds": time.perf_counter() - start_time,
+            "cached": cached
+        }
     
     async def _generate_enhanced_response(self,
                                         query: str,
@@ -213,7 +571,7 @@ class GeminiRAGIntegration:
             enhanced_answer = self._extract_answer_from_response(response.content)
             
             return enhanced_answer, response
-            
+        
         except Exception as e:
             logger.error(f"Enhanced response generation failed: {e}")
             fallback_response = self._generate_fallback_response(query, rag_context)
@@ -247,11 +605,27 @@ class GeminiRAGIntegration:
         """Call Gemini API with prompt"""
         try:
             # Configure generation parameters
-            generation_config = {
-                "temperature": self.temperature,
-                "top_p": self.top_p,
-                "max_output_tokens": 2048,
-            }
+            generation_config = self._generation_config()
+            
+            cache_key = self._response_cache_key(prompt, generation_config)
+            if cache_key is not None:
+                cached = await self._response_cache_call(
+                    self.response_cache.get, cache_key
+                )
+                if cached is not None:
+                    return GeminiResponse(
+                        content=cached["content"],
+                        model=cached["model"],
+                        timestamp=datetime.now(timezone.utc),
+                        usage_metadata=cached["usage_metadata"],
+                        confidence=0.8
+                    )
+            elif self.response_cache is not None:
+                self.response_cache.bypassed += 1
+            
+            await self.rate_limiter.acquire(
+                self.rag_system.token_counter.count(prompt) + self.max_output_tokens
+            )
             
             # Make API call
             response = await self.gemini_client.generate_content_async(
@@ -268,12 +642,87 @@ class GeminiRAGIntegration:
                 confidence=0.8  # Default confidence for API responses
             )
             
-            return gemini_response
+            if cache_key is not None:
+                await self._response_cache_call(
+                    self.response_cache.put,
+                    cache_key, self.model_name, gemini_response.content,
+                    gemini_response.usage_metadata
+                )
             
+            return gemini_response
+        
         except Exception as e:
             logger.error(f"Gemini API call failed: {e}")
             return self._generate_fallback_response("", None)
     
+    async def _stream_gemini_api(self, prompt: str) -> AsyncIterator[tuple]:
+        """
+        Call Gemini API with prompt, relaying the response as it streams in
+        
+        Yields:
+            Tuples of (text chunk, usage metadata reported so far)
+        """
+        generation_config = self._generation_config()
+        
+        cache_key = self._response_cache_key(prompt, generation_config)
+        if cache_key is not None:
+            cached = await self._response_cache_call(
+                self.response_cache.get, cache_key
+            )
+            if cached is not None:
+                yield cached["content"], cached["usage_metadata"]
+                return
+        elif self.response_cache is not None:
+            self.response_cache.bypassed += 1
+        
+        await self.rate_limiter.acquire(
+            self.rag_system.token_counter.count(prompt) + self.max_output_tokens
+        )
+        
+        response = await self.gemini_client.generate_content_async(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        )
+        parts: List[str] = []
+        usage_metadata: Any = {}
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                parts.append(text)
+                usage_metadata = getattr(chunk, 'usage_metadata', None) or {}
+                yield text, usage_metadata
+        
+        # Only complete responses are cached
+        if cache_key is not None and parts:
+            await self._response_cache_call(
+                self.response_cache.put,
+                cache_key, self.model_name, "".join(parts), usage_metadata
+            )
+    
+    def _generation_config(self) -> Dict[str, Any]:
+        """Sampling parameters sent with every Gemini call"""
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "max_output_tokens": self.max_output_tokens,
+        }
+    
+    def _response_cache_key(self,
+                            prompt: str,
+                            generation_config: Dict[str, Any]) -> Optional[str]:
+        """Response cache key of a call, or None when it must not be cached"""
+        if self.response_cache is None:
+            return None
+        if not self.response_cache.cacheable(generation_config):
+            return None
+        return ResponseCache.make_key(self.model_name, generation_config, prompt)
+    
+    async def _response_cache_call(self, method, *args: Any) -> Any:
+        """Run a blocking SQLite cache operation off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, method, *args)
+    
     def _generate_fallback_response(self, query: str, rag_context: Optional[RAGContext]) -> GeminiResponse:
         """Generate fallback response when Gemini is unavailable"""
         if rag_context and rag_context.retrieved_documents:
@@ -301,17 +750,15 @@ class GeminiRAGIntegration:
         # Simple extraction - can be enhanced with more sophisticated parsing
         lines = response_content.split('\n')
         
-        # Look for answer section
-        answer_start = -1
+        # Look for answer section; headers only, since "answer:" can also
+        # end a sentence
         for i, line in enumerate(lines):
-            if any(marker in line.lower() for marker in ['answer:', 'response:', 'conclusion:']):
-                answer_start = i + 1
-                break
+            header = ANSWER_HEADER.match(line)
+            if header:
+                answer = [line[header.end():]] + lines[i + 1:]
+                return '\n'.join(answer).strip()
         
-        if answer_start > -1:
-            return '\n'.join(lines[answer_start:]).strip()
-        else:
-            return response_content.strip()
+        return response_content.strip()
     
     def _extract_reasoning_chain(self, response_content: str) -> List[str]:
         """Extract reasoning steps from Gemini response"""
@@ -412,7 +859,7 @@ class GeminiRAGIntegration:
     # Response templates
     def _get_direct_template(self) -> str:
         return """You are an AI assistant with access to relevant documentation and code.
-        
+
 Query: {query}
 
 Relevant Context ({num_sources} sources, confidence: {confidence:.2f}):
@@ -480,23 +927,148 @@ Creative Response:"""
     
     async def batch_process_queries(self, 
                                   queries: List[str],
-                                  response_mode: ResponseMode = ResponseMode.REASONING) -> List[EnhancedRAGResult]:
-        """Process multiple queries in batch"""
-        results = []
+                                  response_mode: ResponseMode = ResponseMode.REASONING,
+                                  max_concurrency: Optional[int] = None,
+                                  timeout: Optional[float] = None,
+                                  max_sources: int = 5) -> List[EnhancedRAGResult]:
+        """
+        Process multiple queries concurrently
         
-        for query in queries:
-            try:
-                result = await self.enhanced_query(query, response_mode)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Batch processing failed for query '{query}': {e}")
-                results.append(self._create_fallback_result(query, str(e)))
+        Contexts are retrieved with one batched search; answers to
+        paraphrases of cached queries are reused and the remaining queries
+        are answered concurrently, bounded by ``max_concurrency`` and the shared
+        rate limiter, so a batch takes about as long as its slowest call.
+        Failed or timed-out queries get a fallback result and are listed in
+        ``last_batch_report``.
+        
+        Args:
+            queries: User queries
+            response_mode: How to generate the responses
+            max_concurrency: Queries answered at once (defaults to
+                ``batch_concurrency``)
+            timeout: Seconds allowed per query, including rate limiting
+                (defaults to ``batch_timeout``)
+            max_sources: Maximum number of sources per answer
+        
+        Returns:
+            One result per query, in query order
+        """
+        start_time = time.perf_counter()
+        timeout = timeout if timeout is not None else self.batch_timeout
+        concurrency = max(1, max_concurrency or self.batch_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        results: List[Optional[EnhancedRAGResult]] = [None] * len(queries)
+        failures: List[Dict[str, Any]] = []
+        item_seconds: List[float] = []
+        
+        ttl = self._cache_ttl(response_mode) if queries else 0.0
+        version = self.rag_system.kb_version
+        rag_contexts = await self.rag_system.get_contexts(
+            list(queries),
+            max_tokens=self.max_context_length // 2
+        )
+        
+        # Serve cached paraphrases grounded on the same documents
+        partitions = [
+            self._cache_partition(query, rag_context, response_mode, max_sources)
+            for query, rag_context in zip(queries, rag_contexts)
+        ]
+        query_embeddings = []
+        if ttl > 0:
+            engine = self.rag_system.embedding_engine
+            query_embeddings = await engine.aencode_batch(list(queries))
+            for i, query in enumerate(queries):
+                hit = self.semantic_cache.lookup(
+                    query_embeddings[i], partitions[i], version
+                )
+                if hit is not None:
+                    results[i] = replace(
+                        hit[0], query=query, rag_context=rag_contexts[i]
+                    )
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        async def answer(i: int, rag_context: RAGContext):
+            query = queries[i]
+            async with semaphore:
+                item_start = time.perf_counter()
+                error = None
+                timed_out = False
+                try:
+                    result = await asyncio.wait_for(
+                        self._answer_with_context(
+                            query, rag_context, response_mode, max_sources
+                        ),
+                        timeout
+                    )
+                    model = result.gemini_response.model
+                    if model == "error" or (
+                        self.gemini_client is not None and model == "fallback"
+                    ):
+                        error = "generation failed"
+                except asyncio.TimeoutError:
+                    error = f"timed out after {timeout}s"
+                    timed_out = True
+                    result = self._create_fallback_result(query, error)
+                except Exception as e:
+                    error = str(e)
+                    result = self._create_fallback_result(query, error)
+                elapsed = time.perf_counter() - item_start
+            
+            item_seconds.append(elapsed)
+            results[i] = result
+            if error is not None:
+                logger.error(f"Batch processing failed for query '{query}': {error}")
+                failures.append({
+                    "index": i, "query": query, "error": error, "timed_out": timed_out
+                })
+            elif ttl > 0:
+                self._cache_answer(
+                    query_embeddings[i], partitions[i], version, result, ttl, elapsed
+                )
         
+        await asyncio.gather(*(answer(i, rag_contexts[i]) for i in pending))
+        
+        failures.sort(key=lambda failure: failure["index"])
+        self.last_batch_report = {
+            "queries": len(queries),
+            "cached": len(queries) - len(pending),
+            "succeeded": len(queries) - len(failures),
+            "failed": len(failures),
+            "timed_out": sum(failure["timed_out"] for failure in failures),
+            "failures": failures,
+            "elapsed_seconds": time.perf_counter() - start_time,
+            "slowest_item_seconds": max(item_seconds, default=0.0),
+            "total_item_seconds": sum(item_seconds),
+            "max_concurrency": concurrency
+        }
+        report = self.last_batch_report
+        logger.info(
+            f"Batch of {len(queries)} queries: {report['succeeded']} succeeded, "
+            f"{len(failures)} failed, {report['cached']} cached "
+            f"in {report['elapsed_seconds']:.2f}s"
+        )
         return results
     
+    def close(self):
+        """Release the RAG system's worker pools and the response cache"""
+        self.rag_system.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get Gemini RAG integration statistics"""
         rag_stats = self.rag_system.get_stats()
+        semantic_stats = (
+            self.semantic_cache.get_stats() if self.semantic_cache is not None else {}
+        )
+        response_stats = (
+            self.response_cache.get_stats() if self.response_cache is not None else {}
+        )
+        last_batch = {
+            key: value for key, value in self.last_batch_report.items()
+            if key != "failures"
+        }
         
         return {
             "rag_system": rag_stats,
@@ -504,18 +1076,55 @@ Creative Response:"""
             "gemini_available": GEMINI_AVAILABLE,
             "max_context_length": self.max_context_length,
             "temperature": self.temperature,
-            "response_modes": [mode.value for mode in ResponseMode]
+            "response_modes": [mode.value for mode in ResponseMode],
+            "semantic_cache": semantic_stats,
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "response_cache": response_stats,
+            "last_batch": last_batch
         }
 
 
+def format_sse(event: Dict[str, Any]) -> str:
+    """Frame a stream event as a Server-Sent Events message"""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def stream_sse(integration: GeminiRAGIntegration,
+                     query: str,
+                     **options: Any) -> AsyncIterator[str]:
+    """
+    Stream an enhanced query as Server-Sent Events messages
+    
+    Args:
+        integration: Integration answering the query
+        query: User query
+        **options: Keyword arguments of ``enhanced_query_stream``
+    
+    Returns:
+        Async iterator of framed SSE messages
+    """
+    async for event in integration.enhanced_query_stream(query, **options):
+        yield format_sse(event)
+
+
 # Factory function for easy initialization
 def create_gemini_rag_system(
     rag_system: RAGSystem,
     gemini_api_key: Optional[str] = None,
-    model: str = GeminiModel.GEMINI_PRO.value
+    model: str = GeminiModel.GEMINI_PRO.value,
+    **kwargs: Any
 ) -> GeminiRAGIntegration:
-    """Create Gemini-enhanced RAG system"""
-    return GeminiRAGIntegration(rag_system, gemini_api_key, model)
+    """
+    Create Gemini-enhanced RAG system
+    
+    Args:
+        rag_system: Initialized RAG system
+        gemini_api_key: Gemini API key
+        model: Gemini model to use
+        **kwargs: Further ``GeminiRAGIntegration`` options (rate limits,
+            response cache, ...)
+    """
+    return GeminiRAGIntegration(rag_system, gemini_api_key, model, **kwargs)
 
 
 # Example usage and testing
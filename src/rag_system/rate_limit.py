@@ -0,0 +1,117 @@
+"""
+Rate Limiting Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Client-side token-bucket rate limiting for LLM API calls:
+- Independent request and token budgets per minute
+- Buckets refill continuously up to one minute's budget, allowing bursts
+- Waiters sleep until enough budget has accrued; cancellation-safe
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for asyncio callers
+    """
+    
+    def __init__(self,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        """
+        Initialize rate limiter
+        
+        Args:
+            requests_per_minute: Request budget (unlimited when None)
+            tokens_per_minute: Token budget (unlimited when None)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        
+        self._requests = float(requests_per_minute or 0.0)
+        self._tokens = float(tokens_per_minute or 0.0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        
+        self.acquired = 0
+        self.tokens_acquired = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+    
+    def _refill(self):
+        """Credit the budget accrued since the last update"""
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated) / 60.0
+        self._updated = now
+        if self.requests_per_minute:
+            accrued = elapsed_minutes * self.requests_per_minute
+            self._requests = min(self.requests_per_minute, self._requests + accrued)
+        if self.tokens_per_minute:
+            accrued = elapsed_minutes * self.tokens_per_minute
+            self._tokens = min(self.tokens_per_minute, self._tokens + accrued)
+    
+    def _delay(self, tokens: float) -> float:
+        """Seconds until one request of tokens fits both buckets"""
+        delay = 0.0
+        if self.requests_per_minute and self._requests < 1.0:
+            delay = max(delay, (1.0 - self._requests) * 60.0 / self.requests_per_minute)
+        if self.tokens_per_minute and self._tokens < tokens:
+            delay = max(delay, (tokens - self._tokens) * 60.0 / self.tokens_per_minute)
+        return delay
+    
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until a request of tokens fits the budget, then consume it
+        
+        Requests larger than a whole minute's token budget are admitted
+        once the bucket is full.
+        
+        Args:
+            tokens: Tokens the request is expected to consume
+        """
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            self.acquired += 1
+            self.tokens_acquired += tokens
+            return
+        
+        needed = min(float(tokens), float(self.tokens_per_minute or tokens))
+        start_time = time.monotonic()
+        
+        # Callers are served in arrival order
+        async with self._lock:
+            self._refill()
+            delay = self._delay(needed)
+            if delay > 0:
+                self.throttled += 1
+            while delay > 0:
+                await asyncio.sleep(delay)
+                self._refill()
+                delay = self._delay(needed)
+            
+            if self.requests_per_minute:
+                self._requests -= 1.0
+            if self.tokens_per_minute:
+                self._tokens -= needed
+        
+        self.acquired += 1
+        self.tokens_acquired += tokens
+        self.wait_time += time.monotonic() - start_time
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limiter statistics"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "acquired": self.acquired,
+            "tokens_acquired": self.tokens_acquired,
+            "throttled": self.throttled,
+            "wait_seconds": self.wait_time
+        }
@@ -0,0 +1,230 @@
+"""
+Response Cache Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Persistent cache of LLM completions for replayed prompts:
+- Keys are sha256(model, generation config, prompt), so any change to the
+  retrieved sources, template or sampling settings is a different entry
+- SQLite storage (stdlib, WAL journal) shared across processes and runs
+- Per-entry TTL and least-recently-used eviction beyond a size bound
+- Sampled (non-zero temperature) completions bypass the cache unless
+  explicitly allowed, since replaying them removes intended variation
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    usage_metadata TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of LLM responses keyed by prompt hash
+    """
+    
+    def __init__(self,
+                 path: Union[str, Path],
+                 max_entries: int = 10000,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600.0,
+                 allow_nonzero_temperature: bool = False):
+        """
+        Initialize response cache
+        
+        Args:
+            path: SQLite database file (created if missing)
+            max_entries: Responses kept before the least recently used are
+                evicted
+            ttl_seconds: Lifetime of a response (None keeps responses until
+                they are evicted)
+            allow_nonzero_temperature: Also cache sampled completions
+        """
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.allow_nonzero_temperature = allow_nonzero_temperature
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.writes = 0
+    
+    @staticmethod
+    def make_key(model: str, generation_config: Dict[str, Any], prompt: str) -> str:
+        """
+        Cache key of a completion request
+        
+        Args:
+            model: Model name
+            generation_config: Sampling parameters sent with the prompt
+            prompt: Full prompt text
+        
+        Returns:
+            Hex sha256 digest
+        """
+        header = json.dumps(
+            {"model": model, "config": generation_config}, sort_keys=True, default=str
+        )
+        digest = hashlib.sha256(header.encode('utf-8'))
+        digest.update(b"\0")
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def cacheable(self, generation_config: Dict[str, Any]) -> bool:
+        """Whether completions with generation_config may be cached"""
+        if self.allow_nonzero_temperature:
+            return True
+        return not generation_config.get("temperature")
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a response
+        
+        Args:
+            key: Key from ``make_key``
+        
+        Returns:
+            Dict with model, content and usage_metadata, or None when
+            missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, content, usage_metadata, expires_at "
+                "FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            
+            model, content, usage_metadata, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        
+        return {
+            "model": model,
+            "content": content,
+            "usage_metadata": json.loads(usage_metadata)
+        }
+    
+    def put(self,
+            key: str,
+            model: str,
+            content: str,
+            usage_metadata: Optional[Dict[str, Any]] = None):
+        """
+        Store a response
+        
+        Args:
+            key: Key from ``make_key``
+            model: Model that produced the response
+            content: Response text
+            usage_metadata: Token usage reported with the response (kept
+                only when JSON-serializable)
+        """
+        try:
+            usage = json.dumps(dict(usage_metadata or {}))
+        except (TypeError, ValueError):
+            usage = "{}"
+        
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, usage, now, expires_at, now)
+            )
+            self.writes += 1
+            self._evict()
+    
+    def _evict(self):
+        """Drop expired responses, then the least recently used beyond the bound"""
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),)
+        ).rowcount
+        self.expirations += max(0, expired)
+        
+        excess = self._count() - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+    
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def clear(self):
+        """Drop all responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "allow_nonzero_temperature": self.allow_nonzero_temperature,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "writes": self.writes,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
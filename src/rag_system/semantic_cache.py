@@ -0,0 +1,201 @@
+"""
+Semantic Cache Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Cache of answered queries looked up by meaning rather than by text:
+- Query embeddings live in a small preallocated matrix searched with one
+  matrix-vector product
+- A lookup hits when a cached query of the same partition (whatever the
+  answer depends on besides the query, e.g. response mode and retrieved
+  documents) lies within a cosine distance of the new one
+  and was answered against the current knowledge base version
+- Per-entry TTLs, LRU eviction of the least recently used slot
+- Hit rate and generation latency saved
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of answers keyed by query embedding
+    """
+    
+    def __init__(self,
+                 dimension: int,
+                 max_entries: int = 512,
+                 max_distance: float = 0.03):
+        """
+        Initialize semantic cache
+        
+        Args:
+            dimension: Query embedding dimension
+            max_entries: Answers kept before the least recently used is evicted
+            max_distance: Largest cosine distance (1 - similarity) between a
+                new query and a cached one that still counts as a hit
+        """
+        self.dimension = dimension
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        
+        self._vectors = np.zeros((self.max_entries, dimension), dtype='float32')
+        self._active = np.zeros(self.max_entries, dtype=bool)
+        self._versions = np.zeros(self.max_entries, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._partitions: List[Optional[Hashable]] = [None] * self.max_entries
+        self._values: List[Any] = [None] * self.max_entries
+        self._costs = np.zeros(self.max_entries, dtype=np.float64)
+        self._lock = threading.Lock()
+        
+        self.lookups = 0
+        self.hits = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+        self.lookup_time = 0.0
+        self._hit_similarity = 0.0
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """Unit-length float32 copy of an embedding"""
+        vector = np.asarray(embedding, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _release(self, mask: np.ndarray):
+        """Free the slots selected by mask"""
+        for slot in np.flatnonzero(mask):
+            self._partitions[slot] = None
+            self._values[slot] = None
+        self._active &= ~mask
+    
+    def lookup(self,
+               embedding: np.ndarray,
+               partition: Hashable,
+               version: int) -> Optional[Tuple[Any, float]]:
+        """
+        Find the cached answer of the most similar earlier query
+        
+        Args:
+            embedding: Embedding of the new query
+            partition: Settings the answer must have been produced with
+            version: Current knowledge base version
+        
+        Returns:
+            (cached value, similarity) on a hit, otherwise None
+        """
+        start_time = time.perf_counter()
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            self.lookups += 1
+            now = time.monotonic()
+            
+            # Drop entries that expired or predate the current knowledge base
+            expired = self._active & (self._expires <= now)
+            stale = self._active & ~expired & (self._versions != version)
+            self.expirations += int(expired.sum())
+            self.invalidations += int(stale.sum())
+            if expired.any() or stale.any():
+                self._release(expired | stale)
+            
+            candidates = np.array([
+                slot for slot in np.flatnonzero(self._active)
+                if self._partitions[slot] == partition
+            ], dtype=np.int64)
+            
+            hit = None
+            if candidates.size:
+                similarities = self._vectors[candidates] @ query
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if 1.0 - similarity <= self.max_distance:
+                    slot = candidates[best]
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    self.latency_saved += self._costs[slot]
+                    self._hit_similarity += similarity
+                    hit = (self._values[slot], similarity)
+            
+            self.lookup_time += time.perf_counter() - start_time
+            return hit
+    
+    def put(self,
+            embedding: np.ndarray,
+            partition: Hashable,
+            version: int,
+            value: Any,
+            ttl_seconds: float,
+            cost_seconds: float = 0.0):
+        """
+        Cache an answer
+        
+        Args:
+            embedding: Embedding of the answered query
+            partition: Settings the answer was produced with
+            version: Knowledge base version the answer was produced against
+            value: Answer to cache
+            ttl_seconds: Lifetime of the entry
+            cost_seconds: Time it took to produce the answer, credited as
+                latency saved on every hit
+        """
+        if ttl_seconds <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            free = np.flatnonzero(~self._active)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            
+            self._vectors[slot] = self._normalize(embedding)
+            self._active[slot] = True
+            self._versions[slot] = version
+            self._expires[slot] = now + ttl_seconds
+            self._last_used[slot] = now
+            self._partitions[slot] = partition
+            self._values[slot] = value
+            self._costs[slot] = cost_seconds
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._release(self._active.copy())
+    
+    def __len__(self) -> int:
+        return int(self._active.sum())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and latency saved"""
+        misses = self.lookups - self.hits
+        mean_similarity = self._hit_similarity / self.hits if self.hits else 0.0
+        lookup_ms = 1000.0 * self.lookup_time / self.lookups if self.lookups else 0.0
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": misses,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "mean_hit_similarity": mean_similarity,
+            "latency_saved_seconds": self.latency_saved,
+            "mean_lookup_ms": lookup_ms,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
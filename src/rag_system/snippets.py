@@ -0,0 +1,128 @@
+"""
+Snippet Extraction Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Linear-time snippet selection and highlighting:
+- Query-term hits come in as character spans (precomputed by the lexical
+  index, or from a single tokenization pass)
+- A two-pointer sliding window over the hits, scored with a prefix sum,
+  finds the densest ``max_length`` window in O(hits)
+- Highlights are returned as character spans into the snippet
+"""
+
+import logging
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ELLIPSIS = "..."
+
+
+def merge_spans(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sort spans and merge overlapping or touching ones
+    
+    Args:
+        starts: Span start offsets
+        ends: Span end offsets
+    
+    Returns:
+        (starts, ends) of disjoint spans in order
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts) == 0:
+        return starts, ends
+    
+    if np.any(starts[1:] < starts[:-1]):
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    
+    group_heads = np.empty(len(starts), dtype=bool)
+    group_heads[0] = True
+    group_heads[1:] = starts[1:] > reach[:-1]
+    heads = np.flatnonzero(group_heads)
+    return starts[heads], np.maximum.reduceat(ends, heads)
+
+
+def best_window(starts: np.ndarray,
+                ends: np.ndarray,
+                max_length: int) -> Tuple[int, int]:
+    """
+    Find the run of hits that fits in max_length characters with most hits
+    
+    Args:
+        starts: Sorted start offsets of disjoint hits
+        ends: Matching end offsets
+        max_length: Window length in characters
+    
+    Returns:
+        (first, last) hit indices, inclusive
+    """
+    count = len(starts)
+    
+    # For each hit j, the first hit i that can share a window with it
+    first = np.searchsorted(starts, ends - max_length, side='left')
+    first = np.minimum(first, np.arange(count))
+    
+    # Prefix sum of hit weights; each hit counts once
+    prefix = np.arange(count + 1)
+    scores = prefix[1:] - prefix[first]
+    
+    last = int(np.argmax(scores))
+    return int(first[last]), last
+
+
+def extract_snippet(content: str,
+                    starts: Sequence[int],
+                    ends: Sequence[int],
+                    max_length: int = 200) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Cut the densest snippet of content around query-term hits
+    
+    Args:
+        content: Document text
+        starts: Start offsets of query-term occurrences
+        ends: End offsets of query-term occurrences
+        max_length: Maximum snippet length in characters (excluding ellipses)
+    
+    Returns:
+        (snippet, highlight spans relative to the snippet)
+    """
+    starts, ends = merge_spans(starts, ends)
+    
+    if len(content) <= max_length:
+        return content, list(zip(starts.tolist(), ends.tolist()))
+    if len(starts) == 0:
+        return content[:max_length] + ELLIPSIS, []
+    
+    first, last = best_window(starts, ends, max_length)
+    covered_start, covered_end = int(starts[first]), int(ends[last])
+    
+    # Center the covered hits in the window, then snap to word boundaries
+    slack = max(0, max_length - (covered_end - covered_start))
+    begin = max(0, min(covered_start - slack // 2, len(content) - max_length))
+    if begin > 0 and not content[begin - 1].isspace():
+        boundary = content.find(" ", begin, covered_start)
+        if boundary != -1:
+            begin = boundary + 1
+    end = min(len(content), begin + max_length)
+    if end < len(content) and not content[end].isspace():
+        boundary = content.rfind(" ", covered_end, end)
+        if boundary != -1:
+            end = boundary
+    
+    prefix = ELLIPSIS if begin > 0 else ""
+    suffix = ELLIPSIS if end < len(content) else ""
+    offset = len(prefix) - begin
+    
+    visible = (starts < end) & (ends > begin)
+    highlight_starts = np.maximum(starts[visible], begin) + offset
+    highlight_ends = np.minimum(ends[visible], end) + offset
+    highlights = list(zip(highlight_starts.tolist(), highlight_ends.tolist()))
+    return prefix + content[begin:end] + suffix, highlights
@@ -0,0 +1,351 @@
+"""
+Knowledge Base Storage Module
+CENTAUR-013: RAG System + Gemini Integration
+
+Segment-based on-disk format for the RAG knowledge base:
+- Raw float32 vector files opened with np.memmap
+- Compact JSONL metadata table, one record per vector row
+- Append-only deletion log
+- Small JSON manifest that is the source of truth for row counts
+
+New documents are appended to the active segment; nothing already written
+is rewritten until compaction copies the live rows into fresh segments and
+a fresh deletion log, switched to by a single manifest replace. Rows beyond
+the manifest count (e.g. from an interrupted write) are ignored on load.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+DELETION_LOG_FILE = "deleted.jsonl"
+FORMAT_VERSION = 1
+
+# (record, vector) pair of a stored document
+StoredRow = Tuple[Dict[str, Any], np.ndarray]
+
+# Records are written with their id first, so it can be read without
+# decoding the rest of the line
+ID_PREFIX = '{"id":'
+
+
+class SegmentStore:
+    """
+    Append-only segment store for document vectors and metadata
+    
+    Each segment ``seg_NNNNNN`` consists of a ``.f32`` file holding raw
+    float32 rows and a ``.meta.jsonl`` file holding one metadata record per
+    row in the same order.
+    """
+    
+    def __init__(self,
+                 path: Path,
+                 dimension: int,
+                 segment_max_rows: int = 65536,
+                 compaction_threshold: float = 0.2):
+        """
+        Initialize segment store
+        
+        Args:
+            path: Knowledge base directory
+            dimension: Vector dimension
+            segment_max_rows: Rows per segment before rolling to a new one
+            compaction_threshold: Dead-row ratio above which
+                ``maybe_compact`` rewrites the store
+        """
+        self.path = Path(path)
+        self.dimension = dimension
+        self.segment_max_rows = segment_max_rows
+        self.compaction_threshold = compaction_threshold
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        self.manifest = self._read_manifest()
+    
+    @property
+    def total_rows(self) -> int:
+        """Rows appended across all segments"""
+        return sum(segment["rows"] for segment in self.manifest["segments"])
+    
+    def _read_manifest(self) -> Dict[str, Any]:
+        """Read the manifest or create an empty one"""
+        manifest_file = self.path / MANIFEST_FILE
+        if not manifest_file.exists():
+            return {
+                "format": FORMAT_VERSION,
+                "dimension": self.dimension,
+                "segments": [],
+                "next_segment": 1
+            }
+        
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        if manifest.get("dimension") != self.dimension:
+            raise ValueError(
+                f"Knowledge base at {self.path} has dimension "
+                f"{manifest.get('dimension')}, expected {self.dimension}"
+            )
+        return manifest
+    
+    def _write_manifest(self):
+        """Atomically replace the manifest"""
+        manifest_file = self.path / MANIFEST_FILE
+        tmp_file = manifest_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_file, manifest_file)
+    
+    def _vector_file(self, name: str) -> Path:
+        return self.path / f"{name}.f32"
+    
+    def _meta_file(self, name: str) -> Path:
+        return self.path / f"{name}.meta.jsonl"
+    
+    def _deletion_log(self) -> Path:
+        return self.path / self.manifest.get("deletion_log", DELETION_LOG_FILE)
+    
+    def _active_segment(self) -> Dict[str, Any]:
+        """Return the segment new rows are appended to, rolling if full"""
+        segments = self.manifest["segments"]
+        if segments and segments[-1]["rows"] < self.segment_max_rows:
+            return segments[-1]
+        
+        segment = {
+            "name": f"seg_{self.manifest['next_segment']:06d}",
+            "rows": 0,
+            "meta_bytes": 0
+        }
+        self.manifest["next_segment"] += 1
+        segments.append(segment)
+        
+        # Start from empty files in case a previous write was interrupted
+        self._vector_file(segment["name"]).write_bytes(b"")
+        self._meta_file(segment["name"]).write_text("", encoding='utf-8')
+        return segment
+    
+    def append(self, records: List[Dict[str, Any]], embeddings: np.ndarray):
+        """
+        Append documents to the store
+        
+        Args:
+            records: Serializable metadata records (must include ``id``)
+            embeddings: float32 matrix with one row per record
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        embeddings = embeddings.reshape(-1, self.dimension)
+        if len(records) != len(embeddings):
+            raise ValueError("records and embeddings must have the same length")
+        
+        # Pick up rows appended by other store instances on the same path
+        self.manifest = self._read_manifest()
+        
+        self._write_rows(
+            [
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+                for record in records
+            ],
+            embeddings
+        )
+        self._write_manifest()
+    
+    def _write_rows(self, lines: List[str], embeddings: np.ndarray):
+        """Write encoded metadata lines and their vectors to the active segments"""
+        offset = 0
+        while offset < len(lines):
+            segment = self._active_segment()
+            name = segment["name"]
+            count = min(self.segment_max_rows - segment["rows"], len(lines) - offset)
+            
+            # Truncate any partial tail left behind by an interrupted write
+            row_bytes = self.dimension * 4
+            with open(self._vector_file(name), 'r+b') as f:
+                f.truncate(segment["rows"] * row_bytes)
+                f.seek(0, os.SEEK_END)
+                f.write(embeddings[offset:offset + count].tobytes())
+            
+            payload = "".join(lines[offset:offset + count]).encode('utf-8')
+            with open(self._meta_file(name), 'r+b') as f:
+                f.truncate(segment["meta_bytes"])
+                f.seek(0, os.SEEK_END)
+                f.write(payload)
+            
+            segment["meta_bytes"] += len(payload)
+            segment["rows"] += count
+            offset += count
+    
+    def delete(self, doc_ids: List[str]):
+        """Record deletions in the append-only deletion log"""
+        if not doc_ids:
+            return
+        
+        # Rows appended by other store instances precede these deletions
+        self.manifest = self._read_manifest()
+        row = self.total_rows
+        with open(self._deletion_log(), 'a', encoding='utf-8') as f:
+            for doc_id in doc_ids:
+                entry = json.dumps({"id": doc_id, "row": row}, separators=(',', ':'))
+                f.write(entry + "\n")
+    
+    def _read_deletions(self) -> Dict[str, int]:
+        """Map document id to the store size at its latest deletion"""
+        deletions: Dict[str, int] = {}
+        log_file = self._deletion_log()
+        if not log_file.exists():
+            return deletions
+        
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    doc_id = entry["id"]
+                    deletions[doc_id] = max(deletions.get(doc_id, -1), entry["row"])
+        return deletions
+    
+    def _iter_segment(self,
+                      segment: Dict[str, Any]) -> Iterator[Tuple[str, np.ndarray]]:
+        """Yield (encoded record, vector) pairs of one segment"""
+        rows = segment["rows"]
+        if rows == 0:
+            return
+        
+        vectors = np.memmap(
+            self._vector_file(segment["name"]),
+            dtype='float32',
+            mode='r',
+            shape=(rows, self.dimension)
+        )
+        with open(self._meta_file(segment["name"]), 'r', encoding='utf-8') as f:
+            for row, line in zip(range(rows), f):
+                yield line, vectors[row]
+    
+    @staticmethod
+    def _record_id(line: str) -> str:
+        """Document id of an encoded record, decoding only the id"""
+        if line.startswith(ID_PREFIX):
+            return json.JSONDecoder().raw_decode(line, len(ID_PREFIX))[0]
+        return json.loads(line)["id"]
+    
+    def _live_rows(self) -> List[Tuple[str, np.ndarray]]:
+        """Encoded records and vectors of the live rows, in storage order"""
+        deletions = self._read_deletions()
+        live: Dict[str, Tuple[str, np.ndarray]] = {}
+        
+        global_row = 0
+        for segment in self.manifest["segments"]:
+            for line, vector in self._iter_segment(segment):
+                doc_id = self._record_id(line)
+                if deletions.get(doc_id, -1) > global_row:
+                    live.pop(doc_id, None)
+                else:
+                    live[doc_id] = (line, vector)
+                global_row += 1
+        
+        logger.debug(f"Found {len(live)} live documents in {global_row} stored rows")
+        return list(live.values())
+    
+    def load(self) -> List[StoredRow]:
+        """
+        Load live documents
+        
+        Vectors are returned as views into the memory-mapped segment files.
+        Later records for the same id supersede earlier ones, and a record is
+        dropped if it was deleted after it was appended. Only the records
+        that survive are decoded in full.
+        
+        Returns:
+            List of (record, vector) pairs
+        """
+        return [(json.loads(line), vector) for line, vector in self._live_rows()]
+    
+    def dead_ratio(self, live_rows: int) -> float:
+        """Fraction of stored rows that are superseded or deleted"""
+        total = self.total_rows
+        if total == 0:
+            return 0.0
+        return max(0, total - live_rows) / total
+    
+    def maybe_compact(self, live_rows: int) -> int:
+        """
+        Compact once the dead-row ratio passes ``compaction_threshold``
+        
+        Args:
+            live_rows: Documents the caller holds from this store
+        
+        Returns:
+            int: Number of dead rows reclaimed
+        """
+        self.manifest = self._read_manifest()
+        if self.dead_ratio(live_rows) <= self.compaction_threshold:
+            return 0
+        return self.compact()
+    
+    def compact(self) -> int:
+        """
+        Rewrite the live rows into fresh segments
+        
+        Superseded and deleted rows are dropped and a fresh deletion log is
+        started. The new segments and log take effect with one atomic
+        manifest replace, so an interrupted compaction leaves the old ones
+        in place.
+        
+        Returns:
+            int: Number of dead rows reclaimed
+        """
+        self.manifest = self._read_manifest()
+        live = self._live_rows()
+        reclaimed = self.total_rows - len(live)
+        if reclaimed == 0:
+            return 0
+        
+        old_files = [self._deletion_log()]
+        for segment in self.manifest["segments"]:
+            old_files.append(self._vector_file(segment["name"]))
+            old_files.append(self._meta_file(segment["name"]))
+        
+        compactions = self.manifest.get("compactions", 0) + 1
+        self.manifest["segments"] = []
+        self.manifest["compactions"] = compactions
+        self.manifest["deletion_log"] = f"deleted_{compactions:06d}.jsonl"
+        try:
+            self._deletion_log().write_text("", encoding='utf-8')
+            for start in range(0, len(live), self.segment_max_rows):
+                batch = live[start:start + self.segment_max_rows]
+                self._write_rows(
+                    [line for line, _ in batch],
+                    np.stack([vector for _, vector in batch])
+                )
+            self._write_manifest()
+        except Exception:
+            # The manifest on disk still describes the old segments
+            self.manifest = self._read_manifest()
+            raise
+        live.clear()
+        
+        for old_file in old_files:
+            try:
+                old_file.unlink(missing_ok=True)
+            except OSError as e:
+                # Still memory-mapped on platforms that lock open files
+                logger.warning(f"Failed to remove compacted file {old_file}: {e}")
+        
+        logger.info(f"Compacted segment store, reclaimed {reclaimed} dead rows")
+        return reclaimed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get storage statistics"""
+        return {
+            "path": str(self.path),
+            "segments": len(self.manifest["segments"]),
+            "total_rows": self.total_rows,
+            "compactions": self.manifest.get("compactions", 0),
+            "format": self.manifest.get("format", FORMAT_VERSION)
+        }
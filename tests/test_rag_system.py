@@ -12,6 +12,7 @@ Comprehensive test coverage for:
 import pytest
 import asyncio
 import json
+import os
 import numpy as np
 from datetime import datetime, timezone
 from unittest.mock import Mock, AsyncMock, patch
@@ -22,6 +23,7 @@ from src.rag_system import (
     VectorDatabase,
     EmbeddingEngine,
     Document,
+    SearchResult,
     DocumentType,
     EmbeddingModel,
     create_rag_system,
@@ -29,6 +31,8 @@ from src.rag_system import (
     ResponseMode,
     create_gemini_rag_system
 )
+from src.rag_system.core import FAISS_AVAILABLE
+from src.rag_system.indexer import FileManifest, FileRecord, IncrementalIndexer
 
 
 class TestVectorDatabase:
@@ -90,6 +94,225 @@ class TestVectorDatabase:
             assert doc_id in vector_db.documents
             assert 0.0 <= similarity <= 1.0
     
+    def test_add_documents_batch(self, vector_db):
+        """Test adding a batch of documents with one insertion"""
+        documents = [
+            Document(
+                id=f"batch_doc_{i}",
+                content=f"Batch document {i}",
+                doc_type=DocumentType.DOCUMENTATION,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=np.random.rand(384).astype('float32')
+            )
+            for i in range(5)
+        ]
+        documents.append(Document(
+            id="no_embedding",
+            content="Missing embedding",
+            doc_type=DocumentType.DOCUMENTATION,
+            metadata={},
+            timestamp=datetime.now(timezone.utc)
+        ))
+        
+        added = vector_db.add_documents(documents)
+        assert added == 5
+        assert len(vector_db.documents) == 5
+        assert "no_embedding" not in vector_db.documents
+        
+        results = vector_db.search(documents[2].embedding, k=1, threshold=0.0)
+        assert results[0][0] == "batch_doc_2"
+    
+    def test_numpy_fallback_search(self):
+        """Test matrix-based search when FAISS is unavailable"""
+        with patch("src.rag_system.core.FAISS_AVAILABLE", False):
+            fallback_db = VectorDatabase(dimension=32, metric="cosine")
+        assert fallback_db.index is None
+        
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((2000, 32)).astype('float32')
+        fallback_db.add_documents([
+            Document(
+                id=f"row_{i}",
+                content=f"Row {i}",
+                doc_type=DocumentType.DOCUMENTATION,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ])
+        
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        query = embeddings[7]
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+        
+        results = fallback_db.search(query, k=5, threshold=-1.0)
+        assert [doc_id for doc_id, _ in results] == [f"row_{i}" for i in expected]
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        
+        # Removed rows are never returned
+        fallback_db.remove_document("row_7")
+        results = fallback_db.search(query, k=5, threshold=-1.0)
+        assert "row_7" not in [doc_id for doc_id, _ in results]
+    
+    @pytest.mark.parametrize("faiss_enabled", [True, False])
+    def test_remove_and_compact(self, faiss_enabled):
+        """Test tombstoned removal and index compaction"""
+        use_faiss = faiss_enabled and FAISS_AVAILABLE
+        with patch("src.rag_system.core.FAISS_AVAILABLE", use_faiss):
+            db = VectorDatabase(dimension=16, metric="cosine", auto_compact=False)
+        
+        rng = np.random.default_rng(1)
+        embeddings = rng.standard_normal((20, 16)).astype('float32')
+        db.add_documents([
+            Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.LOG,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ])
+        labels_before = dict(db.id_to_index)
+        
+        for i in range(10):
+            assert db.remove_document(f"doc_{i}") is True
+        assert db.remove_document("doc_0") is False
+        assert db.dead_ratio() == pytest.approx(0.5)
+        
+        # Dead rows never take top-k slots
+        results = db.search(embeddings[3], k=5, threshold=-1.0)
+        assert len(results) == 5
+        assert all(int(doc_id.split("_")[1]) >= 10 for doc_id, _ in results)
+        
+        assert db.compact() == 10
+        assert db.dead_ratio() == 0.0
+        assert db.get_stats()["indexed_vectors"] == 10
+        
+        # Labels stay stable across compaction
+        assert all(
+            db.id_to_index[doc_id] == labels_before[doc_id] for doc_id in db.documents
+        )
+        results = db.search(embeddings[15], k=1, threshold=-1.0)
+        assert results[0][0] == "doc_15"
+    
+    @pytest.mark.skipif(not FAISS_AVAILABLE, reason="index rebuilds require FAISS")
+    def test_compaction_tolerates_concurrent_removal(self):
+        """Test a document removed while the index is rebuilt stays removed"""
+        db = VectorDatabase(dimension=16, metric="cosine", auto_compact=False)
+        rng = np.random.default_rng(4)
+        embeddings = rng.standard_normal((20, 16)).astype('float32')
+        db.add_documents([
+            Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.LOG,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ])
+        for i in range(10):
+            db.remove_document(f"doc_{i}")
+        
+        class ReleaseHookLock:
+            """RLock running a one-shot hook after the next release"""
+            
+            def __init__(self, lock):
+                self.lock = lock
+                self.on_release = None
+            
+            def __enter__(self):
+                return self.lock.__enter__()
+            
+            def __exit__(self, *exc_info):
+                self.lock.__exit__(*exc_info)
+                hook, self.on_release = self.on_release, None
+                if hook:
+                    hook()
+        
+        # Remove a document as soon as the rebuild snapshot is taken
+        db._lock = ReleaseHookLock(db._lock)
+        rebuild = db._rebuild_index
+        
+        def rebuild_with_removal(*args):
+            db._lock.on_release = lambda: db.remove_document("doc_12")
+            return rebuild(*args)
+        
+        with patch.object(db, "_rebuild_index", side_effect=rebuild_with_removal):
+            assert db.compact() == 10
+        assert "doc_12" not in db.documents
+        
+        results = db.search(embeddings[12], k=10, threshold=-1.0)
+        assert "doc_12" not in [doc_id for doc_id, _ in results]
+        assert len(results) == 9
+        assert db.compact() == 1
+    
+    def test_background_compaction(self):
+        """Test compaction is triggered past the dead-row threshold"""
+        db = VectorDatabase(dimension=16, compaction_threshold=0.25)
+        for i in range(8):
+            db.add_document(Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.CONVERSATION,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=np.random.rand(16).astype('float32')
+            ))
+        
+        for i in range(3):
+            db.remove_document(f"doc_{i}")
+        if db._compaction_thread is not None:
+            db._compaction_thread.join(timeout=5)
+        
+        assert db.compactions >= 1
+        assert db.dead_ratio() == 0.0
+        assert len(db.documents) == 5
+    
+    @pytest.mark.skipif(not FAISS_AVAILABLE, reason="FAISS not installed")
+    @pytest.mark.parametrize("index_type", ["ivf", "hnsw"])
+    def test_training_lifecycle(self, index_type):
+        """Test IVF/HNSW indexes buffer in flat and migrate once trained"""
+        import faiss
+        
+        db = VectorDatabase(dimension=16, index_type=index_type, training_threshold=400)
+        rng = np.random.default_rng(2)
+        embeddings = rng.standard_normal((1000, 16)).astype('float32')
+        documents = [
+            Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.DOCUMENTATION,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ]
+        
+        assert db.add_documents(documents[:300]) == 300
+        assert db.active_index_type == "flat"
+        
+        assert db.add_documents(documents[300:]) == 700
+        assert db.active_index_type == index_type
+        assert db.get_stats()["indexed_vectors"] == 1000
+        
+        if index_type == "ivf":
+            ivf = faiss.extract_index_ivf(db.index)
+            assert ivf.metric_type == faiss.METRIC_INNER_PRODUCT
+            assert db.get_stats()["nlist"] == ivf.nlist
+            results = db.search(embeddings[42], k=3, threshold=-1.0, nprobe=ivf.nlist)
+        else:
+            results = db.search(embeddings[42], k=3, threshold=-1.0, ef_search=256)
+        
+        assert results[0][0] == "doc_42"
+        assert results[0][1] == pytest.approx(1.0, abs=1e-4)
+    
     def test_get_stats(self, vector_db):
         """Test database statistics"""
         stats = vector_db.get_stats()
@@ -136,6 +359,70 @@ class TestEmbeddingEngine:
             assert embedding.shape[0] == embedding_engine.dimension
 
 
+class TestEmbeddingCache:
+    """Test cases for the content-addressed embedding cache"""
+    
+    @staticmethod
+    def _counting_model(dimension):
+        """Deterministic stand-in model that records what it was asked to encode"""
+        model = Mock()
+        model.calls = []
+        
+        def encode(texts, **kwargs):
+            model.calls.append(list(texts))
+            return np.array(
+                [[len(text) + i for i in range(dimension)] for text in texts],
+                dtype='float32'
+            )
+        
+        model.encode.side_effect = encode
+        return model
+    
+    def test_batch_only_encodes_misses(self, tmp_path):
+        """Test cached texts are never re-sent to the model"""
+        engine = EmbeddingEngine(cache_size=2, cache_dir=tmp_path)
+        engine.model = self._counting_model(engine.dimension)
+        
+        first = engine.encode_batch(["alpha", "beta", "alpha"])
+        assert engine.model.calls == [["alpha", "beta"]]
+        np.testing.assert_array_equal(first[0], first[2])
+        
+        engine.encode_batch(["beta", "gamma"])
+        assert engine.model.calls[-1] == ["gamma"]
+        
+        stats = engine.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 4
+        assert stats["evictions"] == 1
+        
+        # A fresh engine is served from the disk tier
+        restarted = EmbeddingEngine(cache_size=2, cache_dir=tmp_path)
+        restarted.model = self._counting_model(restarted.dimension)
+        again = restarted.encode_batch(["alpha", "gamma"])
+        assert restarted.model.calls == []
+        np.testing.assert_array_equal(again[0], first[0])
+        assert restarted.get_cache_stats()["disk_hits"] == 2
+    
+    def test_cache_is_keyed_by_model(self, tmp_path):
+        """Test vectors from different models never collide"""
+        from src.rag_system.embedding_cache import EmbeddingCache
+        
+        first = EmbeddingCache("model-a", 4, cache_dir=tmp_path)
+        second = EmbeddingCache("model-b", 4, cache_dir=tmp_path)
+        first.put_many(["text"], np.ones((1, 4), dtype='float32'))
+        
+        assert second.get_many(["text"]) == [None]
+        np.testing.assert_array_equal(first.get_many(["text"])[0], np.ones(4))
+    
+    @pytest.mark.asyncio
+    async def test_cache_stats_in_rag_stats(self, tmp_path):
+        """Test cache counters are exposed through RAGSystem.get_stats"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        stats = rag.get_stats()
+        assert "embedding_cache" in stats
+        assert "hits" in stats["embedding_cache"]
+
+
 class TestRAGSystem:
     """Test cases for RAG System"""
     
@@ -253,6 +540,48 @@ class TestRAGSystem:
         assert code_results[0].document.doc_type == DocumentType.CODE
 
 
+class TestBulkIngestion:
+    """Test cases for the bulk add_documents path"""
+    
+    @pytest.mark.asyncio
+    async def test_add_documents_bulk(self, tmp_path):
+        """Test bulk ingestion indexes the same documents as single adds"""
+        topics = [
+            "coordination", "embeddings", "persistence", "scheduling", "monitoring"
+        ]
+        specs = [
+            {
+                "content": (
+                    f"Bulk document {i} about {topics[i % len(topics)]} "
+                    f"number {i * 7}"
+                ),
+                "doc_type": DocumentType.DOCUMENTATION,
+                "tags": ["bulk"]
+            }
+            for i in range(10)
+        ]
+        
+        bulk = create_rag_system(knowledge_base_path=tmp_path / "bulk")
+        doc_ids = await bulk.add_documents(iter(specs), batch_size=4)
+        
+        single = create_rag_system(knowledge_base_path=tmp_path / "single")
+        single_ids = [
+            await single.add_document(
+                spec["content"], spec["doc_type"], tags=spec["tags"]
+            )
+            for spec in specs
+        ]
+        
+        assert len(set(doc_ids)) == 10
+        assert doc_ids == single_ids
+        stats = bulk.get_stats()
+        assert stats["vector_db_stats"]["total_documents"] == 10
+        assert single.get_stats()["vector_db_stats"]["total_documents"] == 10
+        assert stats["vector_db_stats"]["indexed_vectors"] == 10
+        assert stats["last_ingest"]["documents_added"] == 10
+        assert stats["last_ingest"]["documents_per_second"] > 0
+
+
 class TestGeminiRAGIntegration:
     """Test cases for Gemini RAG Integration"""
     
@@ -337,6 +666,30 @@ class TestGeminiRAGIntegration:
         for i, result in enumerate(results):
             assert result.query == queries[i]
             assert result.enhanced_answer != ""
+    
+    @pytest.mark.asyncio
+    async def test_extract_answer_from_section_headers(self, gemini_rag):
+        """Test answer headers are found behind markdown, numbering and bullets"""
+        responses = {
+            "Reasoning first.\n**Answer:** Agents share a bus": "Agents share a bus",
+            "## Analysis\nSteps.\n## Conclusion:\nAgents share a bus": (
+                "Agents share a bus"
+            ),
+            "Step 1: read context\nFinal Answer: Agents share a bus": (
+                "Agents share a bus"
+            ),
+            "1. Context Analysis\n4. Conclusion/Answer:\nAgents share a bus": (
+                "Agents share a bus"
+            ),
+            "- **Answer**: Agents share a bus": "Agents share a bus",
+            "Answer:\nAgents share a bus": "Agents share a bus",
+            # "answer:" ending a sentence is not a header
+            "I don't have enough information to answer: bus": (
+                "I don't have enough information to answer: bus"
+            )
+        }
+        for response, answer in responses.items():
+            assert gemini_rag._extract_answer_from_response(response) == answer
 
 
 class TestIntegrationScenarios:
@@ -406,6 +759,200 @@ class TestIntegrationScenarios:
         assert stats_after["vector_db_stats"]["total_documents"] >= 0
 
 
+class TestKnowledgeBaseStorage:
+    """Test cases for segment-based knowledge base persistence"""
+    
+    @pytest.mark.asyncio
+    async def test_segment_round_trip(self, tmp_path):
+        """Test documents survive a reload through memory-mapped segments"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        doc_ids = await rag.add_documents(
+            {
+                "content": f"Segment document {i}",
+                "doc_type": DocumentType.LOG,
+                "metadata": {"index": i},
+                "source": f"log_{i}.txt",
+                "tags": ["segment"]
+            }
+            for i in range(12)
+        )
+        await rag.add_document("Single appended document", DocumentType.TASK)
+        assert await rag.remove_document(doc_ids[0]) is True
+        
+        # Only append-only files are written
+        assert (tmp_path / "manifest.json").exists()
+        assert not list(tmp_path.glob("batch_*"))
+        
+        reloaded = create_rag_system(knowledge_base_path=tmp_path)
+        loaded = await reloaded.load_knowledge_base()
+        
+        assert loaded == 12
+        assert doc_ids[0] not in reloaded.vector_db.documents
+        document = reloaded.vector_db.get_document(doc_ids[5])
+        assert document.metadata == {"index": 5}
+        assert document.source == "log_5.txt"
+        assert document.doc_type == DocumentType.LOG
+        assert isinstance(document.embedding, np.memmap)
+        np.testing.assert_allclose(
+            document.embedding,
+            rag.vector_db.get_document(doc_ids[5]).embedding,
+            rtol=1e-6
+        )
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("faiss_enabled", [True, False])
+    async def test_index_snapshot_reload(self, tmp_path, faiss_enabled):
+        """Test restarts reuse the saved index instead of rebuilding it"""
+        use_faiss = faiss_enabled and FAISS_AVAILABLE
+        with patch("src.rag_system.core.FAISS_AVAILABLE", use_faiss):
+            rag = create_rag_system(knowledge_base_path=tmp_path)
+            doc_ids = await rag.add_documents(
+                {
+                    "content": f"Snapshot document {i}",
+                    "doc_type": DocumentType.DOCUMENTATION
+                }
+                for i in range(20)
+            )
+            await rag.remove_document(doc_ids[3])
+            rag.checkpoint()
+            
+            reloaded = create_rag_system(knowledge_base_path=tmp_path)
+            with patch.object(reloaded.vector_db, "add_documents") as add_documents:
+                assert await reloaded.load_knowledge_base() == 19
+                add_documents.assert_not_called()
+        
+        query = rag.vector_db.get_document(doc_ids[7]).embedding
+        assert reloaded.vector_db.search(query, k=1, threshold=0.0)[0][0] == doc_ids[7]
+        hits = reloaded.vector_db.search(query, k=20, threshold=-1.0)
+        assert doc_ids[3] not in [doc_id for doc_id, _ in hits]
+        
+        # The reloaded index still accepts writes
+        new_id = await reloaded.add_document("Added after restart", DocumentType.TASK)
+        assert reloaded.vector_db.get_stats()["total_documents"] == 20
+        assert new_id in reloaded.vector_db.documents
+    
+    @pytest.mark.asyncio
+    async def test_ingest_and_close_checkpoint_the_index(self, tmp_path):
+        """Test restarts after ingests, removals and single adds skip the rebuild"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.load_knowledge_base()
+        doc_ids = await rag.ingest_documents(
+            {
+                "content": f"Checkpointed file {i} body",
+                "doc_type": DocumentType.CODE,
+                "source": f"file_{i}.py"
+            }
+            for i in range(6)
+        )
+        await rag.remove_source("file_0.py")
+        
+        restarted = create_rag_system(knowledge_base_path=tmp_path)
+        with patch.object(restarted.vector_db, "add_documents") as add_documents:
+            assert await restarted.load_knowledge_base() == 5
+            add_documents.assert_not_called()
+        assert doc_ids[0] not in restarted.vector_db.documents
+        
+        # Single adds are saved by close()
+        await restarted.add_document("Added before shutdown", DocumentType.TASK)
+        restarted.close()
+        
+        again = create_rag_system(knowledge_base_path=tmp_path)
+        with patch.object(again.vector_db, "add_documents") as add_documents:
+            assert await again.load_knowledge_base() == 6
+            add_documents.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_stale_index_snapshot_is_rebuilt(self, tmp_path):
+        """Test a snapshot that disagrees with the document store is ignored"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document("First document", DocumentType.DOCUMENTATION)
+        rag.checkpoint()
+        await rag.add_document("Added after the checkpoint", DocumentType.DOCUMENTATION)
+        
+        reloaded = create_rag_system(knowledge_base_path=tmp_path)
+        assert await reloaded.load_knowledge_base() == 2
+        assert reloaded.vector_db.get_stats()["total_documents"] == 2
+    
+    def test_segment_rollover_and_torn_write(self, tmp_path):
+        """Test segments roll over and rows past the manifest are ignored"""
+        from src.rag_system.storage import SegmentStore
+        
+        store = SegmentStore(tmp_path, dimension=4, segment_max_rows=3)
+        records = [{"id": f"doc_{i}"} for i in range(7)]
+        store.append(records, np.arange(28, dtype='float32').reshape(7, 4))
+        assert store.get_stats()["segments"] == 3
+        
+        # Simulate a write that never reached the manifest
+        with open(tmp_path / "seg_000003.f32", "ab") as f:
+            f.write(b"\x00" * 16)
+        with open(tmp_path / "seg_000003.meta.jsonl", "a") as f:
+            f.write('{"id":"torn"}\n')
+        
+        store = SegmentStore(tmp_path, dimension=4, segment_max_rows=3)
+        store.append([{"id": "doc_7"}], np.full((1, 4), 7.0, dtype='float32'))
+        
+        loaded = {record["id"]: vector for record, vector in store.load()}
+        assert sorted(loaded) == sorted(f"doc_{i}" for i in range(8))
+        np.testing.assert_array_equal(loaded["doc_6"], [24, 25, 26, 27])
+        np.testing.assert_array_equal(loaded["doc_7"], [7, 7, 7, 7])
+    
+    def test_segment_compaction(self, tmp_path):
+        """Test compaction drops superseded and deleted rows"""
+        from src.rag_system.storage import SegmentStore
+        
+        store = SegmentStore(tmp_path, dimension=4, segment_max_rows=3)
+        records = [{"id": f"doc_{i}", "n": i} for i in range(6)]
+        store.append(records, np.arange(24, dtype='float32').reshape(6, 4))
+        store.append([{"id": "doc_0", "n": 10}], np.full((1, 4), 10.0, dtype='float32'))
+        store.delete(["doc_1", "doc_2"])
+        store.append([{"id": "doc_2", "n": 20}], np.full((1, 4), 20.0, dtype='float32'))
+        expected = {
+            record["id"]: (record, np.array(vector)) for record, vector in store.load()
+        }
+        assert sorted(expected) == ["doc_0", "doc_2", "doc_3", "doc_4", "doc_5"]
+        
+        # 3 of 8 rows are dead
+        assert store.maybe_compact(len(expected)) == 3
+        stats = store.get_stats()
+        assert (stats["total_rows"], stats["segments"]) == (5, 2)
+        assert stats["compactions"] == 1
+        assert not (tmp_path / "seg_000001.f32").exists()
+        assert not (tmp_path / "deleted.jsonl").exists()
+        
+        reopened = SegmentStore(tmp_path, dimension=4, segment_max_rows=3)
+        loaded = {record["id"]: (record, vector) for record, vector in reopened.load()}
+        assert loaded.keys() == expected.keys()
+        for doc_id, (record, vector) in expected.items():
+            assert loaded[doc_id][0] == record
+            np.testing.assert_array_equal(loaded[doc_id][1], vector)
+        
+        # Deletions are logged against the compacted rows
+        reopened.delete(["doc_2"])
+        assert "doc_2" not in [record["id"] for record, _ in reopened.load()]
+        assert reopened.maybe_compact(4) == 0
+    
+    @pytest.mark.asyncio
+    async def test_checkpoint_compacts_segment_store(self, tmp_path):
+        """Test checkpoints rewrite a store with many removed documents"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        doc_ids = await rag.add_documents(
+            {"content": f"Compacted document {i}", "doc_type": DocumentType.LOG}
+            for i in range(10)
+        )
+        for doc_id in doc_ids[:3]:
+            await rag.remove_document(doc_id)
+        rag.checkpoint()
+        
+        stats = rag.get_stats()["storage"]
+        assert (stats["total_rows"], stats["compactions"]) == (7, 1)
+        
+        reloaded = create_rag_system(knowledge_base_path=tmp_path)
+        with patch.object(reloaded.vector_db, "add_documents") as add_documents:
+            assert await reloaded.load_knowledge_base() == 7
+            add_documents.assert_not_called()
+        assert doc_ids[0] not in reloaded.vector_db.documents
+
+
 class TestPerformance:
     """Performance test cases"""
     
@@ -481,3 +1028,1531 @@ def setup_test_environment():
 if __name__ == "__main__":
     # Run tests
     pytest.main([__file__, "-v", "--asyncio-mode=auto"])
+
+
+class TestDocumentUpsert:
+    """Test cases for deterministic IDs, upserts and deduplication"""
+    
+    @pytest.mark.asyncio
+    async def test_reingest_is_idempotent(self, tmp_path):
+        """Test re-ingesting unchanged content neither re-embeds nor grows the index"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        specs = [
+            {
+                "content": f"Indexed file {i} body",
+                "doc_type": DocumentType.CODE,
+                "source": f"file_{i}.py"
+            }
+            for i in range(5)
+        ]
+        first_ids = await rag.add_documents(specs)
+        
+        with patch.object(rag.embedding_engine, "encode_batch") as encode_batch:
+            second_ids = await rag.add_documents(specs)
+            encode_batch.assert_not_called()
+        
+        assert second_ids == first_ids
+        assert rag.last_ingest_stats["documents_unchanged"] == 5
+        assert rag.vector_db.get_stats()["total_documents"] == 5
+        
+        # IDs are stable across instances
+        other = create_rag_system(knowledge_base_path=tmp_path / "other")
+        other_id = await other.add_document(
+            "Indexed file 0 body", DocumentType.CODE, source="file_0.py"
+        )
+        assert other_id == first_ids[0]
+    
+    @pytest.mark.asyncio
+    async def test_changed_content_replaces_previous_version(self, tmp_path):
+        """Test a new version from the same source supersedes the old one"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        old_id = await rag.add_document(
+            "def handler(): return 1", DocumentType.CODE, source="handler.py"
+        )
+        new_id = await rag.add_document(
+            "def handler(): return 2", DocumentType.CODE, source="handler.py"
+        )
+        
+        assert new_id != old_id
+        assert old_id not in rag.vector_db.documents
+        assert rag.vector_db.get_stats()["total_documents"] == 1
+        
+        reloaded = create_rag_system(knowledge_base_path=tmp_path)
+        assert await reloaded.load_knowledge_base() == 1
+        assert new_id in reloaded.vector_db.documents
+        newest_id = await reloaded.add_document(
+            "def handler(): return 3", DocumentType.CODE, source="handler.py"
+        )
+        assert list(reloaded.vector_db.documents) == [newest_id]
+    
+    @pytest.mark.asyncio
+    async def test_near_duplicates_resolve_to_existing_document(self, tmp_path):
+        """Test near-identical content is not indexed twice"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        dimension = rag.embedding_engine.dimension
+        rag.embedding_engine.model = TestEmbeddingCache._counting_model(dimension)
+        doc_type = DocumentType.DOCUMENTATION
+        
+        original_id = await rag.add_document("Release notes v1.0", doc_type)
+        duplicate_id = await rag.add_document("Release notes v1.1", doc_type)
+        assert duplicate_id == original_id
+        assert rag.vector_db.get_stats()["total_documents"] == 1
+        
+        rag.near_duplicate_threshold = None
+        assert await rag.add_document("Release notes v1.2", doc_type) != original_id
+        assert rag.vector_db.get_stats()["total_documents"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_near_duplicates_within_a_batch_share_one_document(self, tmp_path):
+        """Test one index search per batch and merging of in-batch duplicates"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        dimension = rag.embedding_engine.dimension
+        rag.embedding_engine.model = TestEmbeddingCache._counting_model(dimension)
+        doc_type = DocumentType.DOCUMENTATION
+        
+        doc_ids = await rag.add_documents([
+            {"content": "Release notes v1.0", "doc_type": doc_type, "source": "a.md"},
+            {"content": "Release notes v1.1", "doc_type": doc_type, "source": "b.md"}
+        ])
+        assert doc_ids[0] == doc_ids[1]
+        assert rag.last_ingest_stats["near_duplicates"] == 1
+        assert rag.vector_db.get_stats()["total_documents"] == 1
+        
+        search = rag.vector_db.search_batch
+        with patch.object(rag.vector_db, "search_batch", wraps=search) as search_batch:
+            more_ids = await rag.add_documents([
+                {"content": "Release notes v2.0", "doc_type": doc_type,
+                 "source": "c.md"},
+                {"content": "Release notes v2.1", "doc_type": doc_type,
+                 "source": "d.md"}
+            ])
+        assert search_batch.call_count == 1
+        assert more_ids == doc_ids
+        
+        # The shared document stays until every source merged into it is removed
+        assert await rag.remove_source("a.md") == 0
+        rag.close()
+        
+        restarted = create_rag_system(knowledge_base_path=tmp_path)
+        assert await restarted.load_knowledge_base() == 1
+        assert await restarted.remove_source("b.md") == 0
+        assert await restarted.remove_source("c.md") == 0
+        assert await restarted.remove_source("d.md") == 1
+        assert restarted.vector_db.get_stats()["total_documents"] == 0
+
+
+class TestChunking:
+    """Test cases for the streaming chunking pipeline"""
+    
+    def test_chunk_strategies_respect_boundaries(self):
+        """Test chunks stay within size, overlap and structural boundaries"""
+        from src.rag_system import ChunkingStrategy, DocumentChunker
+        
+        chunker = DocumentChunker(chunk_size=60, chunk_overlap=30)
+        text = " ".join(f"Sentence number {i} is here." for i in range(10))
+        chunks = list(chunker.chunk(text, ChunkingStrategy.SENTENCE))
+        assert len(chunks) > 1
+        assert all(len(chunk.content) <= 60 for chunk in chunks)
+        assert all(chunk.content == text[chunk.start:chunk.end] for chunk in chunks)
+        assert all(
+            later.start < earlier.end for earlier, later in zip(chunks, chunks[1:])
+        )
+        assert all(chunk.content.startswith("Sentence") for chunk in chunks)
+        
+        markdown = (
+            "# Intro\nShort intro.\n"
+            "## Usage\nCall the API. Then read the result.\n"
+        )
+        markdown_chunks = chunker.chunk(markdown, ChunkingStrategy.MARKDOWN)
+        sections = [chunk.section for chunk in markdown_chunks]
+        assert sections == ["Intro", "Usage"]
+        
+        code = (
+            "import os\n\n@decorator\ndef first():\n    return 1\n\n"
+            "class Second:\n    pass\n"
+        )
+        code_chunks = list(DocumentChunker(50, 10).chunk(code, ChunkingStrategy.CODE))
+        assert [chunk.content for chunk in code_chunks] == [
+            "import os\n\n@decorator\ndef first():\n    return 1\n\n",
+            "class Second:\n    pass\n"
+        ]
+        
+        # Oversized units fall back to finer boundaries
+        long_word = list(DocumentChunker(10, 3).chunk("x" * 25, ChunkingStrategy.TOKEN))
+        assert [len(chunk.content) for chunk in long_word] == [10, 10, 5]
+    
+    @pytest.mark.asyncio
+    async def test_ingest_streams_chunks_with_parent_references(self, tmp_path):
+        """Test chunked ingestion, re-ingestion and adjacent chunk merging"""
+        rag = RAGSystem(knowledge_base_path=tmp_path, chunk_size=120, chunk_overlap=30)
+        text = " ".join(
+            f"Paragraph {i} describes the coordination protocol." for i in range(12)
+        )
+        spec = {
+            "content": text,
+            "doc_type": DocumentType.DOCUMENTATION,
+            "source": "protocol.txt"
+        }
+        
+        chunk_ids = await rag.ingest_documents([spec])
+        assert len(chunk_ids) > 3
+        documents = [rag.vector_db.get_document(doc_id) for doc_id in chunk_ids]
+        parent_ids = {document.metadata["parent_id"] for document in documents}
+        assert parent_ids == {documents[0].metadata["parent_id"]}
+        chunk_indexes = [document.metadata["chunk_index"] for document in documents]
+        assert chunk_indexes == list(range(len(chunk_ids)))
+        
+        # Re-ingesting unchanged content is a no-op; a shorter version drops
+        # stale chunks
+        assert await rag.ingest_documents([spec]) == chunk_ids
+        shorter = await rag.ingest_documents([{**spec, "content": text[:200]}])
+        assert rag.vector_db.get_stats()["total_documents"] == len(shorter)
+        assert rag.last_ingest_stats["stale_chunks_removed"] > 0
+        
+        # Adjacent chunks are joined without repeating their overlap
+        results = [
+            SearchResult(rag.vector_db.get_document(doc_id), 0.9, rank, "", [])
+            for rank, doc_id in enumerate(shorter, 1)
+        ]
+        passages = rag._merge_adjacent_chunks(results)
+        assert len(passages) == 1
+        first = rag.vector_db.get_document(shorter[0])
+        last = rag.vector_db.get_document(shorter[-1])
+        start, end = first.metadata["chunk_start"], last.metadata["chunk_end"]
+        assert passages[0][1] == text[:200][start:end]
+
+
+class TestHybridRetrieval:
+    """Test cases for the BM25 index and hybrid retrieval"""
+    
+    def test_bm25_index_incremental_updates(self):
+        """Test postings follow adds, replacements, removals and compaction"""
+        from src.rag_system import BM25Index
+        
+        index = BM25Index(compaction_threshold=0.5)
+        index.add("task", "Implements CENTAUR-013 in rag_system/core.py")
+        index.add("other", "General notes about the RAG system")
+        index.add("spare", "Unrelated content")
+        
+        assert index.search("CENTAUR-013")[0][0] == "task"
+        assert index.search("core.py")[0][0] == "task"
+        matches = {doc_id for doc_id, _ in index.search("rag_system notes")}
+        assert matches == {"task", "other"}
+        terms, starts, ends = index.match_positions("task", "centaur-013")
+        assert terms == ["centaur-013", "centaur", "013"]
+        spans = list(zip(starts.tolist(), ends.tolist()))
+        assert spans == [(11, 22), (11, 18), (19, 22)]
+        
+        index.add("task", "Rewritten without the identifier")
+        assert index.search("CENTAUR-013") == []
+        
+        assert index.remove("spare") is True
+        assert index.remove("other") is True
+        assert index.remove("other") is False
+        stats = index.get_stats()
+        assert stats["documents"] == 1
+        assert stats["dead_ratio"] == 0.0  # compacted
+        assert index.search("rewritten")[0][0] == "task"
+    
+    @pytest.mark.asyncio
+    async def test_lexical_index_restored_without_retokenizing(self, tmp_path):
+        """Test restarts load the BM25 snapshot instead of re-tokenizing the corpus"""
+        from src.rag_system import BM25Index
+        
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        doc_ids = await rag.add_documents(
+            {
+                "content": f"Ticket CENTAUR-{100 + i} touches module_{i}.py",
+                "doc_type": DocumentType.TASK
+            }
+            for i in range(8)
+        )
+        await rag.remove_source("unknown")
+        await rag.remove_document(doc_ids[0])
+        rag.close()
+        
+        restarted = create_rag_system(knowledge_base_path=tmp_path)
+        with patch.object(BM25Index, "add") as add:
+            assert await restarted.load_knowledge_base() == 7
+            add.assert_not_called()
+        
+        lexical_index = restarted.lexical_index
+        assert lexical_index.get_stats() == rag.lexical_index.get_stats()
+        assert lexical_index.search("CENTAUR-103")[0][0] == doc_ids[3]
+        hits = lexical_index.search("CENTAUR-100")
+        assert doc_ids[0] not in [doc_id for doc_id, _ in hits]
+        terms, starts, _ = lexical_index.match_positions(doc_ids[5], "module_5.py")
+        assert terms[0] == "module_5.py" and starts[0] == 27
+        
+        # A snapshot that disagrees with the store is rebuilt from the documents
+        await restarted.add_document("Ticket CENTAUR-200 is new", DocumentType.TASK)
+        again = create_rag_system(knowledge_base_path=tmp_path)
+        assert await again.load_knowledge_base() == 8
+        assert again.lexical_index.search("CENTAUR-200")
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_search_finds_exact_identifiers(self, tmp_path):
+        """Test hybrid retrieval surfaces exact identifier matches"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        doc_ids = await rag.add_documents(
+            {
+                "content": f"Status update {i} for the coordination board",
+                "doc_type": DocumentType.TASK
+            }
+            for i in range(20)
+        )
+        target_id = await rag.add_document(
+            "Blocked on CENTAUR-013 review", DocumentType.TASK
+        )
+        
+        vector_results = await rag.search("CENTAUR-013", k=3, threshold=0.99)
+        assert target_id not in [result.document.id for result in vector_results]
+        
+        hybrid_results = await rag.search(
+            "CENTAUR-013", k=3, threshold=0.99, retrieval_method="hybrid"
+        )
+        assert hybrid_results[0].document.id == target_id
+        assert "centaur-013" in hybrid_results[0].highlighted_terms
+        
+        # Removals keep the lexical index in sync
+        await rag.remove_document(target_id)
+        assert await rag.search("CENTAUR-013", k=3, retrieval_method="lexical") == []
+        assert rag.get_stats()["lexical_index"]["documents"] == len(doc_ids)
+
+
+class TestFilteredSearch:
+    """Test cases for metadata pre-filtering"""
+    
+    @pytest.mark.parametrize("faiss_enabled", [True, False])
+    def test_selective_filters_return_exactly_k(self, faiss_enabled):
+        """Test filters are pushed into the search instead of over-fetching"""
+        use_faiss = faiss_enabled and FAISS_AVAILABLE
+        with patch("src.rag_system.core.FAISS_AVAILABLE", use_faiss):
+            db = VectorDatabase(dimension=16, auto_compact=False)
+            rng = np.random.default_rng(3)
+            db.add_documents([
+                Document(
+                    id=f"doc_{i}",
+                    content=f"Document {i}",
+                    doc_type=DocumentType.CODE if i % 25 == 0 else DocumentType.LOG,
+                    metadata={},
+                    timestamp=datetime.now(timezone.utc),
+                    embedding=rng.standard_normal(16).astype('float32'),
+                    tags=["rare"] if i % 50 == 0 else ["common"]
+                )
+                for i in range(500)
+            ])
+            db.remove_document("doc_0")
+            query = rng.standard_normal(16).astype('float32')
+            
+            code = db.search(query, k=10, threshold=-1.0, doc_types=[DocumentType.CODE])
+            assert len(code) == 10
+            assert all(int(doc_id.split("_")[1]) % 25 == 0 for doc_id, _ in code)
+            assert "doc_0" not in [doc_id for doc_id, _ in code]
+            
+            rare = db.search(query, k=10, threshold=-1.0, tags=["rare"])
+            expected = sorted(f"doc_{i}" for i in range(50, 500, 50))
+            assert sorted(doc_id for doc_id, _ in rare) == expected
+            
+            both = db.search(
+                query, k=10, threshold=-1.0, doc_types=[DocumentType.LOG], tags=["rare"]
+            )
+            assert both == []
+            assert db.search(query, k=5, threshold=-1.0, tags=["missing"]) == []
+    
+    @pytest.mark.asyncio
+    async def test_rag_search_filters_in_one_pass(self, tmp_path):
+        """Test RAGSystem.search returns k filtered results for every method"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_documents(
+            {
+                "content": f"Coordination note {i}",
+                "doc_type": DocumentType.TASK if i % 10 == 0 else DocumentType.LOG,
+                "tags": ["coordination"]
+            }
+            for i in range(100)
+        )
+        
+        for method in ("vector", "lexical", "hybrid"):
+            results = await rag.search(
+                "coordination note",
+                k=5,
+                doc_types=[DocumentType.TASK],
+                threshold=-1.0,
+                retrieval_method=method
+            )
+            assert len(results) == 5
+            assert all(
+                result.document.doc_type == DocumentType.TASK for result in results
+            )
+
+
+class TestSnippets:
+    """Test cases for linear-time snippet extraction"""
+    
+    def test_snippet_centers_densest_window(self):
+        """Test the snippet covers the densest cluster of hits with exact spans"""
+        from src.rag_system.lexical import tokenize
+        from src.rag_system.snippets import extract_snippet
+        
+        content = (
+            "vector " + "filler text " * 40
+            + "the CENTAUR-013 vector index and vector search. "
+            + "more filler " * 40
+        )
+        terms = {"vector", "centaur-013", "centaur", "013"}
+        hits = [(start, end) for term, start, end in tokenize(content) if term in terms]
+        starts, ends = zip(*hits)
+        
+        snippet, spans = extract_snippet(content, starts, ends, max_length=80)
+        assert snippet.startswith("...") and snippet.endswith("...")
+        assert len(snippet) <= 86
+        highlighted = [snippet[start:end] for start, end in spans]
+        assert highlighted == ["CENTAUR-013", "vector", "vector"]
+        
+        assert extract_snippet("short text", [0], [5]) == ("short text", [(0, 5)])
+        truncated = extract_snippet("x" * 300, [], [], max_length=10)
+        assert truncated == ("x" * 10 + "...", [])
+    
+    @pytest.mark.asyncio
+    async def test_search_results_carry_highlight_spans(self, tmp_path):
+        """Test search results expose highlight spans into their snippets"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        content = (
+            "Background. " * 50
+            + "Digital twin sync runs hourly. "
+            + "Other notes. " * 50
+        )
+        await rag.add_document(content, DocumentType.DOCUMENTATION)
+        
+        results = await rag.search("digital twin", k=1, threshold=-1.0)
+        result = results[0]
+        assert result.highlighted_terms == ["digital", "twin"]
+        snippet = result.context_snippet
+        highlighted = [snippet[start:end] for start, end in result.highlight_spans]
+        assert highlighted == ["Digital", "twin"]
+        assert "Digital twin sync runs hourly." in result.context_snippet
+
+
+class TestContextPacking:
+    """Test cases for tokenizer-accurate context packing"""
+    
+    def test_knapsack_beats_greedy_prefix(self):
+        """Test the packer fills the budget with the most relevant subset"""
+        from src.rag_system.packing import ContextPacker, PackItem
+        
+        items = [
+            PackItem("a", value=0.9, tokens=60),
+            PackItem("b", value=0.8, tokens=50),
+            PackItem("c", value=0.7, tokens=50),
+            PackItem("d", value=0.1, tokens=5)
+        ]
+        # Greedy-in-order would take only "a" (+ "d"); b + c is worth more
+        assert ContextPacker().select(items, budget=100) == [1, 2]
+        assert ContextPacker().select(items, budget=0) == []
+        
+        # Coarse buckets never overflow the budget
+        large = [PackItem(str(i), value=1.0, tokens=999) for i in range(10)]
+        chosen = ContextPacker(resolution=16).select(large, budget=5000)
+        assert sum(large[i].tokens for i in chosen) <= 5000
+    
+    def test_token_counters_and_cache(self):
+        """Test the regex counter, tokenizer adapter and count cache"""
+        from src.rag_system.packing import (
+            CachedTokenCounter, RegexTokenCounter, TokenizerCounter, trim_to_tokens
+        )
+        
+        regex = RegexTokenCounter()
+        assert regex.count("Hello, world!") == 6
+        assert regex.count("internationalization") == 5
+        
+        tokenizer = Mock()
+        tokenizer.encode.side_effect = lambda text: text.split()
+        cached = CachedTokenCounter(TokenizerCounter(tokenizer))
+        assert cached.count("one two three") == 3
+        assert cached.count("one two three") == 3
+        assert tokenizer.encode.call_count == 1
+        assert cached.get_stats()["hits"] == 1
+        
+        text = "First sentence. Second sentence is longer. Third."
+        assert trim_to_tokens(text, 5, regex) == "First sentence."
+        assert trim_to_tokens(text, 4, regex) == "First sentence"
+        assert trim_to_tokens("internationalization", 2, regex) == "internat"
+        assert trim_to_tokens(text, 0, regex) == ""
+    
+    @pytest.mark.asyncio
+    async def test_get_context_respects_token_budget(self, tmp_path):
+        """Test context windows never exceed max_tokens as counted by the tokenizer"""
+        # The padded sections are near-duplicates by design
+        rag = RAGSystem(knowledge_base_path=tmp_path, near_duplicate_threshold=None)
+        for i in range(6):
+            await rag.add_document(
+                f"Coordination protocol section {i}. "
+                + "Agents exchange state updates. " * (5 + 10 * i),
+                DocumentType.DOCUMENTATION,
+                source=f"protocol_{i}.md"
+            )
+        
+        context = await rag.get_context(
+            "coordination protocol", max_tokens=300, retrieval_method="lexical"
+        )
+        assert 0 < context.total_tokens <= 300
+        assert context.total_tokens == rag.token_counter.count(context.context_window)
+        assert not context.context_window.endswith("...")
+        assert len(context.retrieved_documents) >= 2
+        
+        # A single oversized passage is trimmed at a sentence boundary
+        tiny = await rag.get_context(
+            "coordination protocol", max_tokens=20, retrieval_method="lexical"
+        )
+        assert 0 < tiny.total_tokens <= 20
+        assert tiny.context_window.endswith(".")
+    
+    @pytest.mark.asyncio
+    async def test_unpunctuated_passage_is_cut_to_fit(self, tmp_path):
+        """Test a top passage without sentence boundaries is cut, not dropped"""
+        rag = RAGSystem(knowledge_base_path=tmp_path)
+        content = "telemetry " + " ".join(
+            f"agent{i} reports heartbeat" for i in range(200)
+        )
+        await rag.add_document(content, DocumentType.LOG, source="heartbeat.log")
+        
+        context = await rag.get_context(
+            "telemetry heartbeat", max_tokens=50, retrieval_method="lexical"
+        )
+        assert len(context.retrieved_documents) == 1
+        assert 0 < context.total_tokens <= 50
+        header = "[Source: heartbeat.log]\ntelemetry agent0"
+        assert context.context_window.startswith(header)
+        assert content.startswith(context.context_window.split("\n", 1)[1])
+
+
+class TestDiversification:
+    """Test cases for MMR diversification of retrieval results"""
+    
+    def test_mmr_trades_relevance_for_novelty(self):
+        """Test MMR skips near-duplicates and honours per-group caps"""
+        from src.rag_system import maximal_marginal_relevance
+        
+        embeddings = np.array(
+            [[1.0, 0.0], [0.995, 0.0998], [0.0, 1.0]], dtype='float32'
+        )
+        relevance = [0.9, 0.89, 0.8]
+        
+        assert maximal_marginal_relevance(
+            embeddings, relevance, k=3, lambda_mult=1.0
+        ) == [0, 1, 2]
+        assert maximal_marginal_relevance(
+            embeddings, relevance, k=3, lambda_mult=0.5
+        ) == [0, 2, 1]
+        assert maximal_marginal_relevance(
+            embeddings, relevance, k=3, lambda_mult=1.0,
+            groups=["a", "a", "b"], max_per_group=1
+        ) == [0, 2]
+        assert maximal_marginal_relevance(embeddings, relevance, k=0) == []
+    
+    @pytest.mark.asyncio
+    async def test_get_context_caps_results_per_source(self, tmp_path):
+        """Test per-source caps let other sources into the context"""
+        rag = RAGSystem(knowledge_base_path=tmp_path, chunk_size=120, chunk_overlap=0)
+        await rag.ingest_documents([{
+            "content": " ".join(
+                f"Agent coordination detail number {i}." for i in range(30)
+            ),
+            "doc_type": DocumentType.DOCUMENTATION,
+            "source": "coordination.md"
+        }])
+        await rag.add_document(
+            "Agent coordination relies on a shared message bus.",
+            DocumentType.DOCUMENTATION,
+            source="bus.md"
+        )
+        
+        context = await rag.get_context(
+            "agent coordination", retrieval_method="lexical",
+            diversity=0.7, max_per_source=2
+        )
+        sources = [result.document.source for result in context.retrieved_documents]
+        assert sources.count("coordination.md") <= 2
+        assert "bus.md" in sources
+        ranks = [result.relevance_rank for result in context.retrieved_documents]
+        assert ranks == sorted(ranks)
+
+
+@pytest.mark.skipif(not FAISS_AVAILABLE, reason="quantized storage requires FAISS")
+class TestQuantizedStorage:
+    """Test cases for fp16/SQ8/PQ vector storage"""
+    
+    @staticmethod
+    def _documents(embeddings):
+        return [
+            Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.DOCUMENTATION,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ]
+    
+    @pytest.mark.parametrize("storage", ["fp16", "sq8", "pq"])
+    def test_quantized_index_with_exact_rerank(self, storage, tmp_path):
+        """Test quantized storage trains, releases embeddings and re-ranks exactly"""
+        rng = np.random.default_rng(2)
+        embeddings = rng.standard_normal((400, 32)).astype('float32')
+        db = VectorDatabase(
+            dimension=32, storage=storage, training_threshold=300, pq_m=8
+        )
+        db.add_documents(self._documents(embeddings))
+        
+        assert db.get_stats()["active_storage"] == storage
+        assert all(document.embedding is None for document in db.documents.values())
+        
+        results = db.search(embeddings[11], k=3, threshold=-1.0)
+        assert results[0][0] == "doc_11"
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        
+        # Compaction rebuilds from the full-precision rows
+        for i in range(200):
+            db.remove_document(f"doc_{i}")
+        db.compact()
+        assert db.search(embeddings[250], k=1, threshold=-1.0)[0][0] == "doc_250"
+        
+        # Snapshots memory-map the full-precision rows
+        db.save(tmp_path)
+        restored = VectorDatabase(
+            dimension=32, storage=storage, training_threshold=300, pq_m=8
+        )
+        documents = {doc_id: document for doc_id, document in db.documents.items()}
+        assert restored.load(tmp_path, documents) is True
+        assert restored.get_stats()["full_precision_mapped"] is True
+        assert restored.search(embeddings[321], k=1, threshold=-1.0)[0][0] == "doc_321"
+    
+    def test_evaluate_quantization_reports_recall_and_memory(self):
+        """Test the recall@k versus memory report"""
+        from src.rag_system import evaluate_quantization
+        
+        rng = np.random.default_rng(3)
+        embeddings = rng.standard_normal((1000, 32)).astype('float32')
+        report = evaluate_quantization(embeddings, k=5, rerank_factors=(1, 4), pq_m=8)
+        rows = {(row["storage"], row["rerank_factor"]): row for row in report}
+        
+        assert rows[("float32", 1)]["recall_at_k"] == pytest.approx(1.0)
+        assert rows[("sq8", 4)]["recall_at_k"] >= 0.95
+        assert rows[("pq", 4)]["recall_at_k"] >= rows[("pq", 1)]["recall_at_k"]
+        code_bytes = [
+            rows[(storage, 1)]["code_bytes_per_vector"]
+            for storage in ("float32", "fp16", "sq8", "pq")
+        ]
+        assert code_bytes == [128, 64, 32, 8]
+        assert rows[("sq8", 1)]["compression"] > rows[("fp16", 1)]["compression"] > 1.0
+
+
+class TestAsyncEmbedding:
+    """Test cases for embedding inference off the event loop"""
+    
+    @pytest.mark.asyncio
+    async def test_aencode_keeps_event_loop_responsive(self):
+        """Test a slow model does not stall concurrent coroutines"""
+        import time
+        
+        engine = EmbeddingEngine(cache_size=0, max_workers=2)
+        engine.model = Mock()
+        engine.model.encode.side_effect = lambda texts, **kwargs: (
+            time.sleep(0.3) or np.ones((len(texts), engine.dimension), dtype='float32')
+        )
+        
+        gaps = []
+        
+        async def ticker():
+            last = time.perf_counter()
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+        
+        embeddings, single, _ = await asyncio.gather(
+            engine.aencode_batch(["a", "b", "c"]),
+            engine.aencode("d"),
+            ticker()
+        )
+        engine.close()
+        
+        assert embeddings.shape == (3, engine.dimension)
+        assert single.shape == (engine.dimension,)
+        assert max(gaps) < 0.15
+        assert engine.get_executor_stats()["started"] is False
+    
+    def test_unknown_executor_rejected(self):
+        """Test executor names are validated"""
+        with pytest.raises(ValueError):
+            EmbeddingEngine(executor="gpu")
+    
+    @pytest.mark.asyncio
+    async def test_process_executor_loads_model_only_in_workers(self, tmp_path):
+        """Test the parent never loads the model and encodes skip the thread pool"""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.rag_system import core
+        
+        with patch.object(core, "SENTENCE_TRANSFORMERS_AVAILABLE", True), \
+                patch.object(core, "SentenceTransformer", create=True) as model_class:
+            model = model_class.return_value
+            model.get_sentence_embedding_dimension.return_value = 8
+            model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 8))
+            
+            # Worker threads stand in for worker processes, sharing the patched
+            # model class
+            workers = ThreadPoolExecutor(
+                max_workers=2,
+                initializer=core._load_worker_model,
+                initargs=("all-MiniLM-L6-v2",)
+            )
+            with patch.object(
+                EmbeddingEngine, "_get_process_pool", return_value=workers
+            ):
+                engine = EmbeddingEngine(
+                    cache_dir=tmp_path, executor="process", max_workers=2
+                )
+                assert engine.model is None and engine.dimension == 8
+                
+                embeddings = await engine.aencode_batch(["a", "b", "a"], batch_size=1)
+                assert embeddings.shape == (3, 8) and np.all(embeddings == 1.0)
+                assert engine._thread_pool is None
+                
+                # Cached texts are not sent to the workers again
+                calls = model_class.return_value.encode.call_count
+                await engine.aencode_batch(["a", "b"])
+                assert model_class.return_value.encode.call_count == calls
+                assert engine.get_executor_stats()["model_in_workers"]
+            
+            workers.shutdown()
+
+
+class TestEmbeddingBatcher:
+    """Test cases for micro-batching of concurrent embedding requests"""
+    
+    @staticmethod
+    def _engine():
+        engine = EmbeddingEngine(cache_size=0)
+        engine.model = Mock()
+        engine.model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[float(len(text))] * engine.dimension for text in texts], dtype='float32'
+        )
+        return engine
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_batches(self):
+        """Test concurrent encodes are coalesced and each caller gets its own row"""
+        from src.rag_system import EmbeddingBatcher
+        
+        engine = self._engine()
+        batcher = EmbeddingBatcher(engine, max_batch_size=32, max_wait_ms=20)
+        texts = ["x" * (i + 1) for i in range(50)]
+        
+        embeddings = await asyncio.gather(*(batcher.encode(text) for text in texts))
+        engine.close()
+        
+        firsts = [embedding[0] for embedding in embeddings]
+        assert firsts == [float(len(text)) for text in texts]
+        
+        # The first request is dispatched alone, the rest queue behind it
+        assert engine.model.encode.call_count == 3
+        stats = batcher.get_stats()
+        assert stats["batches"] == 3
+        assert stats["batch_size"]["buckets"]["<=1"] == 1
+        assert stats["batch_size"]["max"] == 32
+        assert stats["queue_depth"]["max"] == 32
+        assert stats["pending"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_uncontended_request_is_not_delayed(self):
+        """Test a lone request is embedded without waiting for max_wait_ms"""
+        from src.rag_system import EmbeddingBatcher
+        
+        engine = self._engine()
+        batcher = EmbeddingBatcher(engine, max_wait_ms=60_000)
+        embedding = await asyncio.wait_for(batcher.encode("abc"), timeout=5)
+        engine.close()
+        
+        assert embedding[0] == 3.0
+        assert batcher.get_stats()["batches"] == 1
+    
+    def test_batcher_serves_successive_event_loops(self):
+        """Test requests abandoned with one event loop do not stall the next"""
+        from src.rag_system import EmbeddingBatcher
+        
+        engine = self._engine()
+        batcher = EmbeddingBatcher(engine, max_wait_ms=60_000)
+        
+        async def hang(texts):
+            await asyncio.sleep(3600)
+        
+        async def abandon():
+            await asyncio.gather(
+                *(asyncio.wait_for(batcher.encode(text), timeout=0.05)
+                  for text in ["a", "b", "c"]),
+                return_exceptions=True
+            )
+        
+        async def encode():
+            return await asyncio.wait_for(batcher.encode("abcd"), timeout=5)
+        
+        engine.aencode_batch = hang
+        asyncio.run(abandon())
+        del engine.aencode_batch
+        
+        embedding = asyncio.run(encode())
+        engine.close()
+        assert embedding[0] == 4.0
+        assert batcher.get_stats()["pending"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_failures_reach_every_caller(self):
+        """Test a failed batch raises in every waiting caller"""
+        from src.rag_system import EmbeddingBatcher
+        
+        engine = self._engine()
+        batcher = EmbeddingBatcher(engine, max_wait_ms=5)
+        engine.aencode_batch = AsyncMock(side_effect=RuntimeError("model crashed"))
+        
+        results = await asyncio.gather(
+            batcher.encode("a"), batcher.encode("b"), batcher.encode("c"),
+            return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        
+        # "a" is dispatched alone, "b" and "c" share the next batch
+        assert batcher.get_stats()["failures"] == 2
+
+
+class TestBatchedSearch:
+    """Test cases for multi-query search"""
+    
+    @pytest.mark.parametrize("faiss_enabled", [True, False])
+    def test_search_batch_matches_single_queries(self, faiss_enabled):
+        """Test one batched search returns the same results as per-query searches"""
+        use_faiss = faiss_enabled and FAISS_AVAILABLE
+        with patch("src.rag_system.core.FAISS_AVAILABLE", use_faiss):
+            db = VectorDatabase(dimension=16, metric="cosine")
+        
+        rng = np.random.default_rng(4)
+        embeddings = rng.standard_normal((200, 16)).astype('float32')
+        db.add_documents([
+            Document(
+                id=f"doc_{i}",
+                content=f"Document {i}",
+                doc_type=DocumentType.CODE if i % 2 else DocumentType.LOG,
+                metadata={},
+                timestamp=datetime.now(timezone.utc),
+                embedding=embedding
+            )
+            for i, embedding in enumerate(embeddings)
+        ])
+        db.remove_document("doc_3")
+        
+        queries = rng.standard_normal((7, 16)).astype('float32')
+        for doc_types in (None, [DocumentType.CODE]):
+            batched = db.search_batch(queries, k=5, threshold=-1.0, doc_types=doc_types)
+            assert len(batched) == 7
+            for query, results in zip(queries, batched):
+                single = db.search(query, k=5, threshold=-1.0, doc_types=doc_types)
+                assert [doc_id for doc_id, _ in results] == [
+                    doc_id for doc_id, _ in single
+                ]
+                assert [score for _, score in results] == pytest.approx(
+                    [score for _, score in single], abs=1e-5
+                )
+                assert "doc_3" not in dict(results)
+        
+        assert db.search_batch(np.zeros((0, 16), dtype='float32'), k=5) == []
+    
+    @pytest.mark.asyncio
+    async def test_search_many_embeds_queries_once(self, tmp_path):
+        """Test search_many embeds all queries in one model call"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        dimension = rag.embedding_engine.dimension
+        model = Mock()
+        model.encode.side_effect = lambda texts, **kwargs: np.array([
+            np.random.default_rng(sum(map(ord, text))).standard_normal(dimension)
+            for text in texts
+        ], dtype='float32')
+        rag.embedding_engine.model = model
+        
+        for i in range(5):
+            await rag.add_document(
+                f"Protocol note {i}", DocumentType.DOCUMENTATION, source=f"note_{i}.md"
+            )
+        
+        queries = ["Protocol note 1", "Protocol note 4", "unrelated"]
+        model.encode.reset_mock()
+        batches = await rag.search_many(queries, k=2, threshold=-1.0)
+        assert model.encode.call_count == 1
+        assert [len(results) for results in batches] == [2, 2, 2]
+        assert batches[0][0].document.content == "Protocol note 1"
+        assert batches[1][0].document.content == "Protocol note 4"
+        
+        contexts = await rag.get_contexts(queries[:2], max_tokens=200)
+        assert [context.query for context in contexts] == queries[:2]
+        assert all(context.retrieved_documents for context in contexts)
+
+
+class TestIncrementalIndexer:
+    """Test manifest-driven incremental indexing"""
+    
+    @pytest.mark.asyncio
+    async def test_only_changed_files_are_reindexed(self, tmp_path):
+        """Test new, modified, touched and removed files across runs"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for name in ("alpha", "beta", "gamma"):
+            (docs / f"{name}.md").write_text(
+                f"# {name.title()}\n\nNotes about the {name} agent protocol.\n"
+            )
+        
+        rag = create_rag_system(knowledge_base_path=tmp_path / "kb")
+        indexer = IncrementalIndexer(rag, max_workers=2, window_size=2)
+        
+        stats = await indexer.index([docs], include=["*.md"])
+        assert (stats["added"], stats["modified"], stats["removed"]) == (3, 0, 0)
+        assert len(indexer.manifest) == 3
+        
+        stats = await indexer.index([docs], include=["*.md"])
+        assert stats["unchanged"] == 3
+        assert (stats["added"], stats["modified"], stats["chunks"]) == (0, 0, 0)
+        
+        alpha, beta, gamma = (
+            str(docs / f"{name}.md") for name in ("alpha", "beta", "gamma")
+        )
+        (docs / "alpha.md").write_text("# Alpha\n\nRewritten alpha routing notes.\n")
+        os.utime(beta, ns=(0, 0))
+        os.remove(gamma)
+        
+        stats = await indexer.index([docs], include=["*.md"])
+        assert (stats["modified"], stats["touched"], stats["removed"]) == (1, 1, 1)
+        
+        sources = {document.source for document in rag.vector_db.documents.values()}
+        assert sources == {alpha, beta}
+        contents = [
+            document.content for document in rag.vector_db.documents.values()
+            if document.source == alpha
+        ]
+        assert all("Rewritten" in content for content in contents)
+        
+        # A fresh indexer resumes from the persisted manifest
+        resumed = IncrementalIndexer(rag)
+        stats = await resumed.index([docs], include=["*.md"])
+        assert stats["unchanged"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_fresh_process_removes_stale_chunks(self, tmp_path):
+        """Test the indexer loads the knowledge base before removing deleted files"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for name in ("alpha", "beta"):
+            (docs / f"{name}.md").write_text(
+                f"# {name.title()}\n\nNotes about the {name} agent protocol.\n"
+            )
+        
+        first_run = create_rag_system(knowledge_base_path=tmp_path / "kb")
+        await IncrementalIndexer(first_run).index([docs], include=["*.md"])
+        first_run.close()
+        os.remove(docs / "beta.md")
+        
+        # A new process that never called load_knowledge_base itself
+        second_run = create_rag_system(knowledge_base_path=tmp_path / "kb")
+        assert not second_run.knowledge_base_loaded
+        stats = await IncrementalIndexer(second_run).index([docs], include=["*.md"])
+        assert stats["removed"] == 1
+        assert second_run.knowledge_base_loaded
+        second_run.close()
+        
+        reloaded = create_rag_system(knowledge_base_path=tmp_path / "kb")
+        await reloaded.load_knowledge_base()
+        documents = reloaded.vector_db.documents.values()
+        sources = {document.source for document in documents}
+        assert sources == {str(docs / "alpha.md")}
+    
+    def test_manifest_round_trip(self, tmp_path):
+        """Test manifest persistence and stat-based diffing"""
+        tracked = tmp_path / "tracked.txt"
+        tracked.write_text("content")
+        manifest = FileManifest(tmp_path / "manifest.json")
+        
+        candidates, removed, unchanged = manifest.diff([str(tracked)])
+        assert (candidates, removed, unchanged) == ([str(tracked)], [], 0)
+        
+        stat = tracked.stat()
+        record = FileRecord(stat.st_size, stat.st_mtime_ns, "hash", 1)
+        manifest.set(str(tracked), record)
+        manifest.set(str(tmp_path / "gone.txt"), FileRecord(1, 1, "hash"))
+        manifest.save()
+        
+        reloaded = FileManifest(tmp_path / "manifest.json")
+        assert reloaded.get(str(tracked)) == record
+        assert reloaded.diff([str(tracked)]) == ([], [str(tmp_path / "gone.txt")], 1)
+
+
+class TestHashingEmbedder:
+    """Test the deterministic feature-hashing embedder"""
+    
+    def test_embeddings_are_deterministic_and_lexical(self):
+        """Test batch/single agreement, determinism and term-overlap similarity"""
+        from src.rag_system import HashingEmbedder
+        
+        texts = [
+            "Digital twin cognitive modeling for AI agents",
+            "FastAPI REST API implementation guide",
+            "cognitive modeling",
+            ""
+        ]
+        embedder = HashingEmbedder(dimension=256)
+        batch = embedder.encode(texts)
+        assert batch.shape == (4, 256) and batch.dtype == np.float32
+        np.testing.assert_allclose(batch[1], embedder.encode([texts[1]])[0], atol=1e-6)
+        fresh = HashingEmbedder(dimension=256).encode(texts)
+        np.testing.assert_array_equal(batch, fresh)
+        
+        np.testing.assert_allclose(np.linalg.norm(batch[:3], axis=1), 1.0, atol=1e-5)
+        assert not np.any(batch[3])
+        threshold = HashingEmbedder.default_threshold
+        assert batch[2] @ batch[0] > threshold > batch[2] @ batch[1]
+        
+        # Character n-grams relate inflections and identifiers
+        api = embedder.encode(["APIs", "api_function", "weather"])
+        assert api[0] @ api[1] > api[0] @ api[2]
+        
+        fitted = HashingEmbedder(dimension=256).fit(texts)
+        assert fitted.idf.shape == (256,)
+        assert not np.allclose(fitted.encode([texts[0]]), batch[0])
+    
+    @pytest.mark.asyncio
+    async def test_hashing_engine_is_reproducible(self, tmp_path):
+        """Test hashing ranks identically across engines and skips the cache"""
+        engine = EmbeddingEngine(
+            EmbeddingModel.HASHING.value, cache_dir=tmp_path / "cache"
+        )
+        assert engine.default_threshold == 0.15
+        first = engine.encode_batch(["agent coordination", "agent coordination"])
+        assert engine.get_cache_stats()["misses"] == 0
+        
+        other = EmbeddingEngine(EmbeddingModel.HASHING.value)
+        second = other.encode_batch(["agent coordination"] * 2)
+        np.testing.assert_array_equal(first, second)
+        
+        rag = RAGSystem(
+            embedding_model=EmbeddingModel.HASHING.value,
+            knowledge_base_path=tmp_path / "kb"
+        )
+        relevant = "Agents coordinate through a shared message bus"
+        await rag.add_document(relevant, DocumentType.DOCUMENTATION)
+        await rag.add_document(
+            "Quarterly revenue grew in the northern region", DocumentType.DOCUMENTATION
+        )
+        results = await rag.search("how do agents coordinate", k=2)
+        assert [result.document.content for result in results] == [relevant]
+    
+    def test_hashing_fallback_can_be_disabled(self, tmp_path, monkeypatch):
+        """Test unavailable models fall back to hashing unless it is disabled"""
+        from src.rag_system import HashingEmbedder
+        
+        monkeypatch.delenv("RAG_ALLOW_HASHING_FALLBACK", raising=False)
+        engine = EmbeddingEngine(EmbeddingModel.GEMINI_EMBEDDING.value)
+        assert engine.hashing_fallback and engine.dimension == 768
+        
+        with pytest.raises(RuntimeError):
+            EmbeddingEngine(
+                EmbeddingModel.OPENAI_ADA.value, allow_hashing_fallback=False
+            )
+        monkeypatch.setenv("RAG_ALLOW_HASHING_FALLBACK", "false")
+        with pytest.raises(RuntimeError):
+            EmbeddingEngine(EmbeddingModel.GEMINI_EMBEDDING.value)
+        
+        rag = RAGSystem(
+            embedding_model=EmbeddingModel.OPENAI_ADA.value,
+            knowledge_base_path=tmp_path,
+            allow_hashing_fallback=True
+        )
+        stats = rag.get_stats()
+        assert stats["hashing_fallback"] is True
+        assert stats["default_threshold"] == HashingEmbedder.default_threshold
+        assert stats["embedding_dimension"] == 1536
+        
+        hashing = RAGSystem(
+            embedding_model=EmbeddingModel.HASHING.value,
+            knowledge_base_path=tmp_path / "kb"
+        )
+        assert hashing.get_stats()["hashing_fallback"] is False
+
+
+class TestQueryCache:
+    """Test the version-invalidated query result cache"""
+    
+    def test_lru_ttl_and_version_invalidation(self):
+        """Test eviction, expiry and version mismatches"""
+        from src.rag_system import QueryResultCache
+        
+        cache = QueryResultCache(max_entries=2, ttl_seconds=60.0)
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        assert cache.get("a", 1) == "A"
+        cache.put("c", 1, "C")
+        assert cache.get("b", 1) is None  # Least recently used
+        assert cache.get("a", 2) is None  # Computed against an older version
+        
+        clock = "src.rag_system.query_cache.time.monotonic"
+        with patch(clock, return_value=float(10 ** 9)):
+            assert cache.get("c", 1) is None
+        
+        stats = cache.get_stats()
+        assert (
+            stats["hits"], stats["evictions"],
+            stats["invalidations"], stats["expirations"]
+        ) == (1, 1, 1, 1)
+        assert len(cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_search_and_context_are_cached_until_kb_changes(self, tmp_path):
+        """Test repeated queries skip embedding and edits invalidate results"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document(
+            "Agents coordinate through a shared message bus", DocumentType.DOCUMENTATION
+        )
+        
+        first = await rag.search("agents coordinate", k=3)
+        requests = rag.query_batcher.requests
+        
+        # Callers may re-rank results without corrupting the cache
+        first[0].relevance_rank = 99
+        again = await rag.search("  Agents   COORDINATE ", k=3)
+        assert rag.query_batcher.requests == requests
+        assert [result.document.id for result in again] == [
+            result.document.id for result in first
+        ]
+        assert again[0].relevance_rank == 1
+        
+        context = await rag.get_context("agents coordinate", max_tokens=200)
+        cached_context = await rag.get_context("Agents coordinate", max_tokens=200)
+        assert cached_context.query == "Agents coordinate"
+        assert cached_context.context_window == context.context_window
+        batched = await rag.get_contexts(["agents coordinate"], max_tokens=200)
+        assert batched[0].context_window == context.context_window
+        
+        requests = rag.query_batcher.requests
+        version = rag.kb_version
+        await rag.add_document(
+            "Agents coordinate deployments with the orchestrator",
+            DocumentType.DOCUMENTATION
+        )
+        assert rag.kb_version == version + 1
+        refreshed = await rag.search("agents coordinate", k=3)
+        assert rag.query_batcher.requests == requests + 1
+        assert len(refreshed) == 2
+        
+        stats = rag.get_stats()["query_cache"]
+        assert stats["kb_version"] == rag.kb_version
+        assert stats["hits"] >= 3 and stats["invalidations"] >= 1
+
+
+class TestSemanticCache:
+    """Test reuse of answers to paraphrased queries"""
+    
+    def test_lookup_respects_distance_partition_version_and_ttl(self):
+        """Test hits only for close queries answered with the same settings"""
+        from src.rag_system import SemanticCache
+        
+        cache = SemanticCache(dimension=3, max_entries=2, max_distance=0.05)
+        cache.put(
+            np.array([1.0, 0.0, 0.0]), "direct", 1, "answer",
+            ttl_seconds=60.0, cost_seconds=2.0
+        )
+        
+        value, similarity = cache.lookup(np.array([2.0, 0.1, 0.0]), "direct", 1)
+        assert value == "answer" and similarity > 0.95
+        assert cache.lookup(np.array([0.0, 1.0, 0.0]), "direct", 1) is None
+        assert cache.lookup(np.array([1.0, 0.0, 0.0]), "reasoning", 1) is None
+        
+        cache.put(np.array([0.0, 1.0, 0.0]), "direct", 1, "other", ttl_seconds=0.0)
+        assert len(cache) == 1  # TTL 0 disables caching
+        
+        clock = "src.rag_system.semantic_cache.time.monotonic"
+        with patch(clock, return_value=float(10 ** 9)):
+            assert cache.lookup(np.array([1.0, 0.0, 0.0]), "direct", 1) is None
+        
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["lookups"], stats["expirations"]) == (1, 4, 1)
+        assert stats["latency_saved_seconds"] == pytest.approx(2.0)
+    
+    @pytest.mark.asyncio
+    async def test_enhanced_query_reuses_answers_until_kb_changes(self, tmp_path):
+        """Test paraphrases skip Gemini and knowledge base edits invalidate answers"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document(
+            "AI agents coordinate tasks through a shared bus",
+            DocumentType.DOCUMENTATION
+        )
+        
+        gemini = GeminiRAGIntegration(
+            rag, semantic_cache_size=512, semantic_cache_distance=0.3
+        )
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = AsyncMock(
+            return_value=Mock(text="Answer: through a shared bus", usage_metadata={})
+        )
+        
+        question = "How do AI agents coordinate tasks?"
+        paraphrase = "how do the AI agents coordinate tasks"
+        first = await gemini.enhanced_query(question, ResponseMode.DIRECT)
+        second = await gemini.enhanced_query(paraphrase, ResponseMode.DIRECT)
+        assert gemini.gemini_client.generate_content_async.await_count == 1
+        assert second.query == paraphrase
+        assert second.enhanced_answer == first.enhanced_answer
+        
+        # Other response modes and creative answers are never served from the cache
+        await gemini.enhanced_query(question, ResponseMode.REASONING)
+        await gemini.enhanced_query(question, ResponseMode.CREATIVE)
+        await gemini.enhanced_query(question, ResponseMode.CREATIVE)
+        assert gemini.gemini_client.generate_content_async.await_count == 4
+        
+        await rag.add_document(
+            "Agents also coordinate through direct messages", DocumentType.DOCUMENTATION
+        )
+        await gemini.enhanced_query(question, ResponseMode.DIRECT)
+        assert gemini.gemini_client.generate_content_async.await_count == 5
+        
+        stats = gemini.get_stats()["semantic_cache"]
+        assert stats["hits"] == 1 and stats["invalidations"] >= 1
+        assert stats["latency_saved_seconds"] > 0.0
+    
+    @pytest.mark.asyncio
+    async def test_identifier_and_negation_variants_miss(self, tmp_path):
+        """Test queries differing only in an identifier or a negation never hit"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_documents([
+            {"content": "Status of CENTAUR-013: blocked on review",
+             "doc_type": DocumentType.TASK},
+            {"content": "Status of CENTAUR-014: deployed to production",
+             "doc_type": DocumentType.TASK}
+        ])
+        assert GeminiRAGIntegration(rag).semantic_cache is None  # Opt-in
+        
+        # Even a loose distance does not merge these queries
+        gemini = GeminiRAGIntegration(
+            rag, semantic_cache_size=512, semantic_cache_distance=0.5
+        )
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = AsyncMock(
+            return_value=Mock(text="Answer: see the ticket", usage_metadata={})
+        )
+        
+        queries = [
+            "status of CENTAUR-013",
+            "status of CENTAUR-014",
+            "status of CENTAUR-099",
+            "is the review blocked",
+            "is the review not blocked"
+        ]
+        for query in queries:
+            await gemini.enhanced_query(query, ResponseMode.DIRECT)
+        assert gemini.gemini_client.generate_content_async.await_count == len(queries)
+        assert gemini.get_stats()["semantic_cache"]["hits"] == 0
+        
+        # The exact question again is still served from the cache
+        await gemini.enhanced_query("Status of CENTAUR-013?", ResponseMode.DIRECT)
+        assert gemini.gemini_client.generate_content_async.await_count == len(queries)
+
+
+class TestConcurrentBatch:
+    """Test concurrent batch processing with rate limiting"""
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_throttles_over_budget(self):
+        """Test requests wait once the token budget is spent"""
+        from src.rag_system.rate_limit import TokenBucketRateLimiter
+        
+        limiter = TokenBucketRateLimiter(
+            requests_per_minute=1000, tokens_per_minute=6000
+        )
+        start = asyncio.get_running_loop().time()
+        await limiter.acquire(6000)
+        await limiter.acquire(10)
+        elapsed = asyncio.get_running_loop().time() - start
+        
+        assert 0.08 <= elapsed < 1.0
+        stats = limiter.get_stats()
+        counts = (stats["acquired"], stats["tokens_acquired"], stats["throttled"])
+        assert counts == (2, 6010, 1)
+        
+        unlimited = TokenBucketRateLimiter()
+        await asyncio.wait_for(
+            asyncio.gather(*(unlimited.acquire(10 ** 6) for _ in range(100))), 1.0
+        )
+    
+    @pytest.mark.asyncio
+    async def test_batch_runs_concurrently_with_timeouts(self, tmp_path):
+        """Test bounded concurrency, ordered results and partial-failure reporting"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document(
+            "AI agents coordinate tasks through a shared bus",
+            DocumentType.DOCUMENTATION
+        )
+        gemini = GeminiRAGIntegration(rag, semantic_cache_size=0)
+        
+        in_flight = 0
+        peak = 0
+        
+        async def generate(prompt, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(2.0 if "query 3" in prompt else 0.1)
+            in_flight -= 1
+            return Mock(text=f"Answer:\n{prompt.splitlines()[2]}", usage_metadata={})
+        
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = generate
+        
+        queries = [f"agents coordinate query {i}" for i in range(6)]
+        start = asyncio.get_running_loop().time()
+        results = await gemini.batch_process_queries(
+            queries, ResponseMode.DIRECT, max_concurrency=3, timeout=0.5
+        )
+        elapsed = asyncio.get_running_loop().time() - start
+        
+        assert [result.query for result in results] == queries
+        assert results[0].enhanced_answer.endswith("query 0")
+        assert peak == 3
+        assert elapsed < 1.2  # Sequential calls would take over 1 second
+        
+        report = gemini.last_batch_report
+        assert (report["succeeded"], report["failed"], report["timed_out"]) == (5, 1, 1)
+        assert report["failures"][0]["index"] == 3
+        assert "timed out" in results[3].enhanced_answer
+
+
+class TestStreamingQuery:
+    """Test streamed enhanced queries"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_yields_retrieval_before_chunks(self, tmp_path):
+        """Test retrieval metadata and first chunk arrive before generation ends"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document(
+            "AI agents coordinate tasks through a shared bus",
+            DocumentType.DOCUMENTATION
+        )
+        gemini = GeminiRAGIntegration(rag, semantic_cache_size=0)
+        
+        class Chunk:
+            def __init__(self, text):
+                self.text = text
+        
+        generation_done = asyncio.Event()
+        
+        async def stream():
+            for text in ["Answer:\n", "Agents coordinate ", "through a shared bus"]:
+                await asyncio.sleep(0.05)
+                yield Chunk(text)
+            generation_done.set()
+        
+        async def generate(prompt, **kwargs):
+            assert kwargs["stream"] is True
+            return stream()
+        
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = generate
+        
+        events = []
+        first_chunk_before_done = None
+        event_stream = gemini.enhanced_query_stream(
+            "How do agents coordinate?", ResponseMode.DIRECT
+        )
+        async for event in event_stream:
+            if event["event"] == "chunk" and first_chunk_before_done is None:
+                first_chunk_before_done = not generation_done.is_set()
+            events.append(event)
+        
+        assert [event["event"] for event in events] == [
+            "retrieval", "chunk", "chunk", "chunk", "done"
+        ]
+        assert first_chunk_before_done
+        sources = events[0]["sources"]
+        assert sources and sources[0]["type"] == "documentation"
+        
+        done = events[-1]
+        assert done["answer"] == "Agents coordinate through a shared bus"
+        assert done["model"] == gemini.model_name
+        assert done["time_to_first_chunk_seconds"] < done["total_seconds"]
+        json.dumps(events)
+    
+    @pytest.mark.asyncio
+    async def test_stream_falls_back_and_replays_cache(self, tmp_path):
+        """Test fallback streaming without a client and cached replays"""
+        rag = create_rag_system(knowledge_base_path=tmp_path)
+        await rag.add_document(
+            "AI agents coordinate tasks through a shared bus",
+            DocumentType.DOCUMENTATION
+        )
+        gemini = GeminiRAGIntegration(rag, semantic_cache_size=512)
+        
+        event_stream = gemini.enhanced_query_stream("How do agents coordinate?")
+        events = [event async for event in event_stream]
+        assert [event["event"] for event in events] == ["retrieval", "chunk", "done"]
+        assert events[-1]["model"] == "fallback"
+        
+        async def generate(prompt, **kwargs):
+            raise AssertionError("cached answers must not be regenerated")
+        
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = generate
+        
+        async def stream():
+            yield Mock(text="Answer:\nAgents share a bus", usage_metadata={})
+        
+        async def generate_once(prompt, **kwargs):
+            gemini.gemini_client.generate_content_async = generate
+            return stream()
+        
+        gemini.gemini_client.generate_content_async = generate_once
+        event_stream = gemini.enhanced_query_stream("How do agents coordinate?")
+        first = [event async for event in event_stream]
+        event_stream = gemini.enhanced_query_stream("how do agents coordinate?")
+        replay = [event async for event in event_stream]
+        
+        assert first[-1]["answer"] == "Agents share a bus" and not first[-1]["cached"]
+        assert [event["event"] for event in replay] == ["retrieval", "chunk", "done"]
+        assert replay[-1]["cached"] and replay[-1]["answer"] == "Agents share a bus"
+    
+    def test_format_sse_frames_events(self):
+        """Test events become named SSE messages with a JSON payload"""
+        from src.rag_system import format_sse
+        
+        message = format_sse(
+            {"event": "chunk", "text": "line one\nline two", "at": datetime(2024, 1, 1)}
+        )
+        assert message.startswith("event: chunk\ndata: ")
+        assert message.endswith("\n\n") and message.count("\n") == 3
+        payload = json.loads(message.split("data: ", 1)[1])
+        assert payload == {
+            "event": "chunk", "text": "line one\nline two", "at": "2024-01-01 00:00:00"
+        }
+    
+    @pytest.mark.asyncio
+    async def test_stream_sse_relays_integration_events(self):
+        """Test the SSE stream forwards options and frames each event as it arrives"""
+        from src.rag_system import stream_sse
+        
+        class StubIntegration:
+            def __init__(self):
+                self.calls = []
+            
+            async def enhanced_query_stream(self, query, **options):
+                self.calls.append((query, options))
+                yield {"event": "retrieval", "sources": []}
+                yield {"event": "chunk", "text": "Agents coordinate"}
+                yield {"event": "done", "answer": "Agents coordinate"}
+        
+        integration = StubIntegration()
+        messages = [
+            message async for message in stream_sse(
+                integration, "How?", response_mode=ResponseMode.DIRECT, max_sources=2
+            )
+        ]
+        
+        assert integration.calls == [
+            ("How?", {"response_mode": ResponseMode.DIRECT, "max_sources": 2})
+        ]
+        assert [message.split("\n", 1)[0] for message in messages] == [
+            "event: retrieval", "event: chunk", "event: done"
+        ]
+        chunk = json.loads(messages[1].split("data: ", 1)[1])
+        assert chunk["text"] == "Agents coordinate"
+
+
+class TestResponseCache:
+    """Test the persistent LLM response cache"""
+    
+    def test_ttl_eviction_and_persistence(self, tmp_path):
+        """Test expiry, LRU eviction and reuse across cache instances"""
+        from src.rag_system.response_cache import ResponseCache
+        
+        path = tmp_path / "responses.sqlite"
+        config = {"temperature": 0.0, "top_p": 0.9}
+        keys = [
+            ResponseCache.make_key("gemini-pro", config, f"prompt {i}")
+            for i in range(3)
+        ]
+        reordered = {"top_p": 0.9, "temperature": 0.0}
+        assert ResponseCache.make_key("gemini-pro", reordered, "prompt 0") == keys[0]
+        assert ResponseCache.make_key("gemini-ultra", config, "prompt 0") != keys[0]
+        
+        cache = ResponseCache(path, max_entries=2)
+        cache.put(keys[0], "gemini-pro", "zero", {"total_token_count": 5})
+        cache.put(keys[1], "gemini-pro", "one")
+        # keys[1] becomes the least recently used
+        assert cache.get(keys[0])["content"] == "zero"
+        cache.put(keys[2], "gemini-pro", "two")
+        assert cache.get(keys[1]) is None
+        assert cache.get_stats()["evictions"] == 1
+        cache.close()
+        
+        reopened = ResponseCache(path, max_entries=2, ttl_seconds=0.0)
+        assert reopened.get(keys[0]) == {
+            "model": "gemini-pro",
+            "content": "zero",
+            "usage_metadata": {"total_token_count": 5}
+        }
+        reopened.put(keys[0], "gemini-pro", "zero")
+        assert reopened.get(keys[0]) is None
+        assert reopened.get_stats()["expirations"] >= 1
+        
+        assert not reopened.cacheable({"temperature": 0.7})
+        assert reopened.get_stats()["bypassed"] == 0
+        sampled = ResponseCache(path, allow_nonzero_temperature=True)
+        assert sampled.cacheable({"temperature": 0.7})
+    
+    @pytest.mark.asyncio
+    async def test_identical_prompts_replay_cached_response(self, tmp_path):
+        """Test Gemini is called once per prompt and sampled calls bypass the cache"""
+        rag = create_rag_system(knowledge_base_path=tmp_path / "kb")
+        await rag.add_document(
+            "AI agents coordinate tasks through a shared bus",
+            DocumentType.DOCUMENTATION
+        )
+        gemini = GeminiRAGIntegration(
+            rag,
+            semantic_cache_size=0,
+            response_cache_path=tmp_path / "responses.sqlite"
+        )
+        
+        calls = 0
+        
+        async def generate(prompt, **kwargs):
+            nonlocal calls
+            calls += 1
+            return Mock(text="Answer:\nAgents share a bus", usage_metadata={})
+        
+        gemini.gemini_client = Mock()
+        gemini.gemini_client.generate_content_async = generate
+        
+        # Sampled responses are not replayed by default
+        await gemini.enhanced_query("How do agents coordinate?", ResponseMode.DIRECT)
+        await gemini.enhanced_query("How do agents coordinate?", ResponseMode.DIRECT)
+        assert calls == 2
+        
+        gemini.temperature = 0.0
+        question = "How do agents coordinate?"
+        first = await gemini.enhanced_query(question, ResponseMode.DIRECT)
+        second = await gemini.enhanced_query(question, ResponseMode.DIRECT)
+        assert calls == 3
+        assert second.enhanced_answer == first.enhanced_answer == "Agents share a bus"
+        
+        # The streaming path shares the cache
+        event_stream = gemini.enhanced_query_stream(question, ResponseMode.DIRECT)
+        events = [event async for event in event_stream]
+        assert calls == 3 and events[-1]["answer"] == "Agents share a bus"
+        
+        stats = gemini.get_stats()["response_cache"]
+        assert (stats["hits"], stats["bypassed"], stats["entries"]) == (2, 2, 1)